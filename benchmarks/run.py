@@ -0,0 +1,222 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_transactions, write_transactions
+from src.currency import RateHistory
+from src.file_readers import load_transactions
+from src.reports import calculate_expenses_by_category, filter_transactions, get_top_expenses
+from src.schema import normalize_transactions
+from src.services import calculate_cashback, calculate_rounding_savings
+from src.views import save_to_json
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(value: str) -> int:
+    """
+    Разбирает размер вида "10k", "1M" или "2500".
+    """
+    value = value.strip().lower()
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def format_size(n_rows: int) -> str:
+    for suffix, factor in (("M", 1_000_000), ("k", 1_000)):
+        if n_rows >= factor and n_rows % factor == 0:
+            return f"{n_rows // factor}{suffix}"
+    return str(n_rows)
+
+
+def fingerprint(result: Any) -> Any:
+    """
+    Короткий отпечаток результата, чтобы заметить, что функция стала считать по-другому.
+    """
+    if isinstance(result, pd.DataFrame):
+        total = result["Сумма операции"].sum() if "Сумма операции" in result.columns else 0
+        return [len(result), round(float(total), 2)]
+    if isinstance(result, dict):
+        total = sum(value for value in result.values() if isinstance(value, (int, float)))
+        return [len(result), round(float(total), 2)]
+    if isinstance(result, (int, float)):
+        return round(float(result), 2)
+    return None
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Лучшее время из `repeat` запусков и пиковая память (tracemalloc) отдельного запуска.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": round(best, 6), "peak_mb": round(peak / 2**20, 2), "result": fingerprint(result)}
+
+
+def run_main(typed: pd.DataFrame, folder: str) -> None:
+    """
+    Полный запуск src.main.main на сгенерированных данных: без сети и без вывода в консоль.
+    """
+    from src.main import main
+
+    def fetch_market_data(stocks, currency_list=None):
+        return {"USD": 1.0, "EUR": 0.9}, {stock: 100.0 for stock in stocks}
+
+    def fetch_rates(currency, start, end):
+        return pd.DataFrame({"date": pd.date_range(start, end), "rate": 50.0})
+
+    # src.main импортирует зависимости внутри функций, поэтому подменяются исходные модули
+    with patch("src.file_readers.load_transactions", lambda *args, **kwargs: typed), \
+         patch("src.utils.fetch_market_data", fetch_market_data), \
+         patch("src.currency.get_rate_history", lambda: RateHistory(None, fetch_rates)), \
+         patch("src.utils.configure_market_cache", lambda *args, **kwargs: None), \
+         patch("src.utils.load_json", lambda *args, **kwargs: {"user_stocks": ["AAPL", "TSLA"]}), \
+         patch("src.views.save_to_json", partial(save_to_json, folder=folder)), \
+         contextlib.redirect_stdout(io.StringIO()):
+        main("2021-12-20 12:00:00")
+
+
+def benchmark_size(n_rows: int, repeat: int, max_excel_rows: int, folder: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Запускает все замеры для одного размера данных.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    raw = generate_transactions(n_rows)
+
+    if n_rows <= max_excel_rows:
+        path = write_transactions(raw, os.path.join(folder, f"operations_{n_rows}.xlsx"))
+        results["load_transactions[excel]"] = measure(
+            lambda: load_transactions(path, use_cache=False, typed=True), repeat=1
+        )
+        load_transactions(path, typed=True)
+        results["load_transactions[cache]"] = measure(lambda: load_transactions(path, typed=True), repeat)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["normalize_transactions"] = measure(lambda: normalize_transactions(raw), repeat)
+        typed = normalize_transactions(raw)
+
+    results["filter_transactions"] = measure(
+        lambda: filter_transactions(typed, start_date="2020-01-01", end_date="2020-12-31", category="Супермаркеты",
+                                    max_amount=-100),
+        repeat
+    )
+    results["get_top_expenses"] = measure(lambda: get_top_expenses(typed), repeat)
+    results["calculate_cashback"] = measure(lambda: calculate_cashback(typed, 2021, 6), repeat)
+    results["calculate_rounding_savings"] = measure(lambda: calculate_rounding_savings(typed, 2021, 6, 50), repeat)
+    results["calculate_expenses_by_category"] = measure(lambda: calculate_expenses_by_category(typed), repeat)
+    results["main"] = measure(lambda: run_main(typed, folder), repeat)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Dict[str, Any]]], baseline: Dict[str, Any], tolerance: float,
+            min_delta: float) -> List[str]:
+    """
+    Сравнивает замеры с сохранённым эталоном.
+
+    :return: Список найденных регрессий (время, память или изменившийся результат)
+    """
+    problems = []
+    for size, operations in results.items():
+        for name, current in operations.items():
+            reference = baseline.get("results", {}).get(size, {}).get(name)
+            if reference is None:
+                continue
+            if current["seconds"] > reference["seconds"] * (1 + tolerance) and \
+                    current["seconds"] - reference["seconds"] > min_delta:
+                problems.append(
+                    f"{size} {name}: время {current['seconds']:.4f} с, эталон {reference['seconds']:.4f} с"
+                )
+            if current["peak_mb"] > reference["peak_mb"] * (1 + tolerance) and \
+                    current["peak_mb"] - reference["peak_mb"] > 1:
+                problems.append(f"{size} {name}: память {current['peak_mb']} МБ, эталон {reference['peak_mb']} МБ")
+            if reference.get("result") is not None and current["result"] != reference["result"]:
+                problems.append(f"{size} {name}: результат {current['result']}, эталон {reference['result']}")
+    return problems
+
+
+def print_results(results: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    for size, operations in results.items():
+        print(f"\n{size} строк")
+        for name, current in operations.items():
+            print(f"  {name:<34} {current['seconds'] * 1000:>10.2f} мс {current['peak_mb']:>10.2f} МБ")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Замеры времени и памяти аналитических функций на синтетических данных."
+    )
+    parser.add_argument("--sizes", default="10k,100k", help="Размеры данных через запятую: 10k,100k,1M,10M")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов (берётся лучшее время)")
+    parser.add_argument("--max-excel-rows", type=int, default=10_000,
+                        help="До какого размера замерять чтение Excel (запись больших книг очень долгая)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Файл с эталонными замерами")
+    parser.add_argument("--save-baseline", action="store_true", help="Сохранить результаты как новый эталон")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Допустимое замедление (0.5 = на 50%%)")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="Разница во времени (с), меньше которой замедление не считается регрессией")
+    parser.add_argument("--output", help="Сохранить результаты в JSON-файл")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for n_rows in map(parse_size, args.sizes.split(",")):
+            results[format_size(n_rows)] = benchmark_size(n_rows, args.repeat, args.max_excel_rows, folder)
+
+    print_results(results)
+    report = {"python": platform.python_version(), "pandas": pd.__version__, "results": results}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"\nЭталон сохранён: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nЭталон {args.baseline} не найден, сравнение пропущено")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    problems = compare(results, baseline, args.tolerance, args.min_delta)
+    if problems:
+        print("\nРегрессии относительно эталона:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("\nРегрессий относительно эталона нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
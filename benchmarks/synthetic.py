@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# Категория -> (MCC, типичные описания, знак суммы, средняя сумма)
+CATEGORIES = {
+    "Супермаркеты": ("5411", ["Колхоз", "Магнит", "SPAR", "Перекресток"], -1, 450),
+    "Фастфуд": ("5814", ["McDonald's", "Rumyanyj Khleb", "KFC"], -1, 250),
+    "Транспорт": ("4121", ["Яндекс Такси", "Метро Санкт-Петербург", "Стрелка"], -1, 200),
+    "Переводы": ("6012", ["Перевод на карту", "Перевод Кредитная карта. ТП 10.2 RUR"], -1, 3000),
+    "Ж/д билеты": ("4111", ["РЖД", "Метро Санкт-Петербург"], -1, 900),
+    "Различные товары": ("5331", ["Ozon.ru", "Улыбка радуги", "WILDBERRIES"], -1, 800),
+    "Связь": ("4814", ["МТС", "REG.RU"], -1, 400),
+    "Пополнения": ("6012", ["Перевод с карты", "Внесение наличных через банкомат Тинькофф"], 1, 10000),
+    "Аптеки": ("5912", ["Apteka 7", "Аптека Вита"], -1, 600),
+    "Каршеринг": ("7512", ["Ситидрайв"], -1, 700),
+    "Рестораны": ("5812", ["Kebab 24 Mm", "Fethiye Restoran"], -1, 1500),
+    "Бонусы": (None, ["Вознаграждение за операции покупок", "Проценты на остаток по счету"], 1, 150),
+    "Наличные": ("6011", ["Снятие в банкомате Сбербанк", "Снятие в банкомате Тинькофф"], -1, 5000),
+    "Дом и ремонт": ("5211", ["Строитель", "Леруа Мерлен"], -1, 2500),
+    "ЖКХ": (None, ["ЖКУ Квартира", "Электричество"], -1, 4000),
+    "Топливо": ("5541", ["Circle K", "ЛУКОЙЛ"], -1, 2000),
+    "Одежда и обувь": ("5641", ["WILDBERRIES", "Детки"], -1, 2500),
+    "Зарплата": (None, ['Пополнение. ООО "ФОРТУНА". Зарплата'], 1, 60000),
+}
+CATEGORY_WEIGHTS = np.array([34, 19, 6, 5, 4, 3, 3, 3, 2, 2, 2, 2, 2, 2, 1, 1, 1, 0.5])
+CARDS = ["*7197", "*4556", "*5091", "*5441", "*1112"]
+CARD_WEIGHTS = np.array([0.65, 0.2, 0.05, 0.05, 0.05])
+CURRENCIES = ["RUB", "TRY", "EUR", "CNY", "USD"]
+CURRENCY_WEIGHTS = np.array([0.975, 0.01, 0.007, 0.005, 0.003])
+
+COLUMNS = [
+    "Дата операции", "Дата платежа", "Номер карты", "Статус", "Сумма операции", "Валюта операции",
+    "Сумма платежа", "Валюта платежа", "Кэшбэк", "Категория", "MCC", "Описание",
+    "Бонусы (включая кэшбэк)", "Округление на инвесткопилку", "Сумма операции с округлением",
+]
+
+
+def _pick(rng: np.random.Generator, values: list, weights: np.ndarray, size: int) -> np.ndarray:
+    return rng.choice(len(values), size=size, p=weights / weights.sum())
+
+
+def generate_transactions(n_rows: int, seed: int = 42, start: str = "2018-01-01",
+                          end: str = "2021-12-31") -> pd.DataFrame:
+    """
+    Детерминированно генерирует транзакции со схемой data/operations.xlsx.
+
+    Значения — строки в формате выгрузки банка, как после pd.read_excel(dtype=str).
+
+    :param n_rows: Количество строк
+    :param seed: Зерно генератора случайных чисел (одинаковое зерно — одинаковые данные)
+    :param start: Начало периода
+    :param end: Конец периода
+    :return: DataFrame с транзакциями
+    """
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+
+    start_ts = pd.Timestamp(start).value // 10**9
+    end_ts = pd.Timestamp(end).value // 10**9
+    seconds = np.sort(rng.integers(start_ts, end_ts, size=n_rows))[::-1]
+    # strftime по каждой строке медленный: форматируем уникальные дни и секунды суток отдельно
+    unique_days, day_codes = np.unique(seconds // 86400, return_inverse=True)
+    day_strings = pd.to_datetime(unique_days, unit="D").strftime("%d.%m.%Y").to_numpy(dtype=object)
+    time_strings = pd.to_datetime(np.arange(86400), unit="s").strftime(" %H:%M:%S").to_numpy(dtype=object)
+    payment_dates = day_strings[day_codes]
+    operation_dates = payment_dates + time_strings[seconds % 86400]
+
+    category_codes = _pick(rng, names, CATEGORY_WEIGHTS, n_rows)
+    signs = np.array([CATEGORIES[name][2] for name in names])[category_codes]
+    means = np.array([CATEGORIES[name][3] for name in names], dtype=float)[category_codes]
+    amounts = np.round(signs * rng.lognormal(np.log(means), 0.8), 2)
+    # Примерно треть сумм — целые рубли, как в реальной выгрузке
+    whole = rng.random(n_rows) < 0.33
+    amounts[whole] = np.round(amounts[whole])
+
+    descriptions = np.empty(n_rows, dtype=object)
+    mcc = np.empty(n_rows, dtype=object)
+    choice = rng.integers(0, 1 << 16, size=n_rows)
+    for code, name in enumerate(names):
+        mask = category_codes == code
+        code_mcc, variants, _, _ = CATEGORIES[name]
+        descriptions[mask] = np.array(variants, dtype=object)[choice[mask] % len(variants)]
+        mcc[mask] = code_mcc if code_mcc is not None else np.nan
+
+    cards = np.array(CARDS, dtype=object)[_pick(rng, CARDS, CARD_WEIGHTS, n_rows)]
+    cards[rng.random(n_rows) < 0.1] = np.nan
+    currencies = np.array(CURRENCIES, dtype=object)[_pick(rng, CURRENCIES, CURRENCY_WEIGHTS, n_rows)]
+    statuses = np.where(rng.random(n_rows) < 0.006, "FAILED", "OK")
+    cashback = np.where(rng.random(n_rows) < 0.09, np.abs(np.round(amounts * 0.05)), np.nan)
+    bonuses = np.floor(np.abs(amounts) / 100).astype(int)
+
+    amount_strings = pd.Series(amounts).map(lambda value: f"{value:g}" if value == int(value) else f"{value:.2f}")
+    category_strings = np.array(names, dtype=object)[category_codes]
+
+    return pd.DataFrame({
+        "Дата операции": operation_dates,
+        "Дата платежа": payment_dates,
+        "Номер карты": cards,
+        "Статус": statuses,
+        "Сумма операции": amount_strings,
+        "Валюта операции": currencies,
+        "Сумма платежа": amount_strings,
+        "Валюта платежа": "RUB",
+        "Кэшбэк": pd.Series(cashback).map(lambda value: np.nan if np.isnan(value) else f"{value:g}"),
+        "Категория": category_strings,
+        "MCC": mcc,
+        "Описание": descriptions,
+        "Бонусы (включая кэшбэк)": bonuses.astype(str),
+        "Округление на инвесткопилку": "0",
+        "Сумма операции с округлением": amount_strings.str.lstrip("-"),
+    }, columns=COLUMNS)
+
+
+def write_transactions(transactions: pd.DataFrame, path: str) -> str:
+    """
+    Записывает сгенерированные транзакции в .xlsx или .csv (по расширению файла).
+    """
+    if path.lower().endswith(".csv"):
+        transactions.to_csv(path, index=False, encoding="utf-8")
+    else:
+        transactions.to_excel(path, index=False)
+    return path
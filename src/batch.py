@@ -0,0 +1,287 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.categorizer import categorize_transactions
+from src.currency import convert_transactions
+from src.file_readers import load_transactions
+from src.index import TransactionIndex
+from src.money import amount_kopecks, apply_rate, rounding_remainder, to_rubles
+from src.profiling import span, traced
+from src.reports import TOP_COLUMNS, RecurringPayments
+from src.topn import top_n_positions
+from src.utils import (collect_market_data, configure_market_cache, fetch_market_data_timed, get_greeting,
+                       load_json, wait_for_market_cache)
+from src.views import recurring_payments_json, save_to_json
+
+
+def parse_snapshot_dates(value: str) -> List[datetime]:
+    """
+    Разбирает даты снимков: список через запятую или диапазон "начало..конец" (по дням).
+
+    Дата может быть с временем ('YYYY-MM-DD HH:MM:SS') или без него (полночь), как в main.
+
+    :param value: Например "2021-12-01..2021-12-31" или "2021-11-30,2021-12-31 23:59:59"
+    :return: Отсортированный список дат без повторов
+    """
+    dates = []
+    for part in filter(None, (part.strip() for part in value.split(","))):
+        if ".." in part:
+            start, end = part.split("..", 1)
+            dates.extend(pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq="D").to_pydatetime())
+        else:
+            dates.append(pd.Timestamp(part).to_pydatetime())
+    if not dates:
+        raise ValueError("Не указано ни одной даты")
+    return sorted(set(dates))
+
+
+class _PrefixSums:
+    """
+    Суммы по группам для окон отсортированной таблицы.
+
+    Строки делятся на отрезки точками-границами окон; по каждому отрезку и группе
+    сумма считается одним `bincount`, а накопленная сумма по отрезкам даёт сумму
+    любого окна [lo, hi) как разность двух строк — для всех дат сразу.
+    """
+
+    def __init__(self, bounds: np.ndarray, n_rows: int):
+        """
+        :param bounds: Массив пар (lo, hi) границ окон
+        :param n_rows: Количество строк в таблице
+        """
+        self.points, inverse = np.unique(bounds.ravel(), return_inverse=True)
+        self.bounds = inverse.reshape(bounds.shape)
+        marks = np.zeros(n_rows + 1, dtype=np.intp)
+        marks[self.points] = 1
+        # Номер отрезка строки = количество границ, не больших её позиции
+        self._segment = np.cumsum(marks[:n_rows])
+
+    def window_sums(self, codes: np.ndarray, n_groups: int, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        :param codes: Номер группы каждой строки (-1 — строка не учитывается)
+        :param n_groups: Количество групп
+        :param weights: Целые веса строк, например копейки (None — считать количество строк)
+        :return: Массив int64 (окна × группы) с суммами весов
+        """
+        valid = codes >= 0
+        flat = self._segment[valid] * n_groups + codes[valid]
+        size = (len(self.points) + 1) * n_groups
+        if weights is None:
+            totals = np.bincount(flat, minlength=size)
+        else:
+            # Копейки складываются в int64: bincount с весами считает во float64 и теряет точность
+            totals = np.zeros(size, dtype=np.int64)
+            np.add.at(totals, flat, weights[valid].astype(np.int64, copy=False))
+        prefix = np.cumsum(totals.reshape(-1, n_groups), axis=0)
+        # prefix[j] — сумма строк с позицией меньше points[j]
+        return prefix[self.bounds[:, 1]] - prefix[self.bounds[:, 0]]
+
+
+def _top_expense_positions(amounts: np.ndarray, bounds: np.ndarray, top_n: int = 5) -> List[np.ndarray]:
+    """
+    Позиции топ-N расходов в каждом окне, в том же порядке, что и `get_top_expenses`
+    (частичный отбор по сумме среди расходов окна, при равенстве — более ранняя строка).
+    """
+    expense_positions = np.flatnonzero(amounts < 0)
+    starts = np.searchsorted(expense_positions, bounds[:, 0], side="left")
+    ends = np.searchsorted(expense_positions, bounds[:, 1], side="left")
+    result = []
+    for start, end in zip(starts, ends):
+        positions = expense_positions[start:end]
+        result.append(positions[top_n_positions(amounts[positions], top_n)])
+    return result
+
+
+@traced()
+def build_snapshots(
+        transactions: Union[pd.DataFrame, TransactionIndex],
+        dates: Sequence[datetime],
+        currency_rates: Dict[str, float],
+        stock_prices: Dict[str, float],
+        rounding_step: int = 50,
+        cashback_rate: float = 0.01,
+        recurring: Optional[RecurringPayments] = None
+) -> Dict[datetime, dict]:
+    """
+    Данные главной страницы (как в main) на каждую дату из списка.
+
+    Суммы по картам, кешбэк по категориям и "Инвесткопилка" за месяц по дату
+    считаются сразу для всех дат (см. `_PrefixSums`) в копейках, поэтому
+    не зависят от порядка сложения. Топ расходов выбирается по каждому окну в numpy,
+    а в записи превращается одним вызовом на все даты.
+
+    :param transactions: Типизированные транзакции или готовый индекс
+    :param dates: Даты снимков
+    :param currency_rates: Курсы валют
+    :param stock_prices: Цены акций
+    :param rounding_step: Шаг округления для "Инвесткопилки"
+    :param cashback_rate: Процент кешбэка
+    :param recurring: Регулярные платежи, найденные один раз по всей истории (как `main --recurring`);
+        на каждую дату они только обрезаются по дате, история заново не просматривается
+    :return: Словарь {дата: данные главной страницы}
+    """
+    index = transactions if isinstance(transactions, TransactionIndex) else TransactionIndex(transactions)
+    frame = index.frame
+    dates = list(dates)
+    if not dates:
+        return {}
+
+    bounds = np.array([index.date_bounds(date.replace(day=1), date) for date in dates], dtype=np.intp)
+    sums = _PrefixSums(bounds, len(frame))
+
+    amounts = frame["Сумма операции"].to_numpy(dtype="float64")
+    kopecks = amount_kopecks(frame)
+    expense = amounts < 0
+
+    cards = frame["last_digits"].cat
+    card_codes = cards.codes.to_numpy().astype(np.intp)
+    card_count = sums.window_sums(card_codes, len(cards.categories))
+    card_total = sums.window_sums(card_codes, len(cards.categories), kopecks)
+
+    categories = frame["Категория"].cat
+    category_codes = np.where(expense, categories.codes.to_numpy(), -1).astype(np.intp)
+    category_count = sums.window_sums(category_codes, len(categories.categories))
+    category_total = sums.window_sums(category_codes, len(categories.categories), kopecks)
+
+    savings = np.where(expense, rounding_remainder(kopecks, rounding_step), 0)
+    savings_total = sums.window_sums(np.where(expense, 0, -1).astype(np.intp), 1, savings)[:, 0]
+
+    top_positions = _top_expense_positions(amounts, bounds)
+    top_records = frame[TOP_COLUMNS].take(np.concatenate(top_positions)).to_dict(orient="records")
+    top_offsets = np.cumsum([0] + [len(positions) for positions in top_positions])
+
+    greeting = get_greeting()
+    rates = [{"currency": k, "rate": v} for k, v in currency_rates.items()]
+    prices = [{"stock": k, "price": v} for k, v in stock_prices.items()]
+
+    snapshots = {}
+    for i, date in enumerate(dates):
+        cards_info = []
+        for code in np.flatnonzero(card_count[i]):
+            total = int(card_total[i, code])
+            cards_info.append({
+                "last_digits": cards.categories[code],
+                "Сумма операции": to_rubles(total),
+                "cashback": to_rubles(apply_rate(total, cashback_rate)),
+            })
+        cashback = {}
+        for code in np.flatnonzero(category_count[i]):
+            total = int(category_total[i, code])
+            cashback[categories.categories[code]] = to_rubles(apply_rate(total, cashback_rate))
+        top_transactions = top_records[top_offsets[i]:top_offsets[i + 1]]
+
+        snapshots[date] = {
+            "greeting": greeting,
+            "cards": cards_info if cards_info else "Нет данных",
+            "top_transactions": top_transactions if top_transactions else "Нет транзакций",
+            "currency_rates": rates,
+            "stock_prices": prices,
+            "cashback": cashback,
+            "investment_savings": to_rubles(int(savings_total[i]))
+        }
+        if recurring is not None:
+            payments = recurring_payments_json(recurring, date)
+            snapshots[date]["recurring_payments"] = payments if payments else "Нет регулярных платежей"
+    return snapshots
+
+
+def _job_name(file_path: str, settings_file: str) -> str:
+    file_stem = os.path.splitext(os.path.basename(file_path))[0]
+    settings_stem = os.path.splitext(os.path.basename(settings_file))[0]
+    return f"{file_stem}_{settings_stem}"
+
+
+def run_batch(
+        dates: Sequence[datetime],
+        files: Iterable[str] = (os.path.join("data", "operations.xlsx"),),
+        settings_files: Iterable[str] = ("user_settings.json",),
+        folder: str = os.path.join("export", "batch"),
+        recurring: bool = False
+) -> List[str]:
+    """
+    Формирует JSON главной страницы на каждую дату для каждого файла и каждого набора настроек.
+
+    Каждый файл загружается один раз, рыночные данные запрашиваются один раз на все
+    настройки (параллельно с загрузкой), а все снимки считаются векторно.
+    Файлы сохраняются в `folder/<файл>_<настройки>/main_page_YYYY-MM-DD.json`.
+
+    :param dates: Даты снимков
+    :param files: Файлы с транзакциями
+    :param settings_files: Файлы с настройками пользователей
+    :param folder: Папка для результатов
+    :param recurring: Добавить регулярные платежи (ищутся один раз на файл)
+    :return: Пути к сохранённым файлам
+    """
+    configure_market_cache()
+    settings = {path: load_json(path) for path in settings_files}
+    user_stocks = {path: data.get("user_stocks", ["AAPL", "TSLA", "GOOGL"]) for path, data in settings.items()}
+    all_stocks = list(dict.fromkeys(stock for stocks in user_stocks.values() for stock in stocks))
+
+    saved = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        market_future = executor.submit(fetch_market_data_timed, all_stocks)
+
+        indexes = {}
+        for file_path in files:
+            with span("Загрузка транзакций", file=file_path) as info:
+                transactions = load_transactions(file_path, typed=True)
+                info["rows"] = len(transactions)
+            if transactions.empty:
+                print(f"Ошибка: не удалось загрузить транзакции из {file_path}")
+                continue
+            indexes[file_path] = TransactionIndex(categorize_transactions(convert_transactions(transactions)))
+
+        currency_rates, stock_prices = collect_market_data(market_future, all_stocks)
+
+    for file_path, index in indexes.items():
+        recurring_payments = RecurringPayments(index.frame) if recurring else None
+        for settings_file, stocks in user_stocks.items():
+            prices = {stock: stock_prices.get(stock, "Ошибка при запросе") for stock in stocks}
+            snapshots = build_snapshots(index, dates, currency_rates, prices, recurring=recurring_payments)
+
+            job_folder = os.path.join(folder, _job_name(file_path, settings_file))
+            with span("Сохранение JSON", files=len(snapshots)):
+                for date, data in snapshots.items():
+                    filename = f"main_page_{date.strftime('%Y-%m-%d')}.json"
+                    save_to_json(data, filename, folder=job_folder)
+                    saved.append(os.path.join(job_folder, filename))
+
+    print(f"Сохранено {len(saved)} файлов в {folder}")
+    wait_for_market_cache()
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="Формирует JSON главной страницы сразу на много дат, файлов и пользователей."
+    )
+    parser.add_argument("dates", help="Даты через запятую или диапазон 'YYYY-MM-DD..YYYY-MM-DD'")
+    parser.add_argument("--file", action="append", dest="files",
+                        help="Файл с транзакциями (можно указать несколько раз)")
+    parser.add_argument("--settings", action="append", dest="settings_files",
+                        help="Файл с настройками пользователя (можно указать несколько раз)")
+    parser.add_argument("--output", default=os.path.join("export", "batch"), help="Папка для результатов")
+    parser.add_argument("--recurring", action="store_true",
+                        help="Добавить регулярные платежи и подписки, найденные по всей истории")
+    args = parser.parse_args(sys.argv[1:])
+
+    try:
+        snapshot_dates = parse_snapshot_dates(args.dates)
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
+    run_batch(
+        snapshot_dates,
+        files=args.files or [os.path.join("data", "operations.xlsx")],
+        settings_files=args.settings_files or ["user_settings.json"],
+        folder=args.output,
+        recurring=args.recurring
+    )
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR_NAME = ".cache"
+CACHE_VERSION = 2
+META_FILE = "meta.json"
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Считает SHA-256 содержимого файла, читая его блоками.
+
+    :param path: Путь к файлу
+    :param block_size: Размер блока чтения в байтах
+    :return: Хеш в шестнадцатеричном виде
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_signature(path: str) -> Dict[str, object]:
+    """
+    Возвращает ключ кеша для исходного файла: путь, размер и время изменения.
+    Хеш содержимого считается отдельно и только при необходимости.
+    """
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cache_dir_for(source_path: str, variant: str = "raw") -> str:
+    """
+    Путь к каталогу кеша для файла: рядом с исходником, в папке `.cache`.
+
+    :param source_path: Путь к исходному файлу (например, data/operations.xlsx)
+    :param variant: Вариант представления данных (например, "raw" или "typed")
+    :return: Путь к каталогу кеша
+    """
+    source_path = os.path.abspath(source_path)
+    folder, name = os.path.split(source_path)
+    return os.path.join(folder, CACHE_DIR_NAME, f"{name}.{variant}")
+
+
+def _read_meta(cache_dir: str) -> Optional[dict]:
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return meta
+
+
+def _write_meta(cache_dir: str, meta: dict) -> None:
+    tmp_path = os.path.join(cache_dir, f"{META_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(meta, file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, META_FILE))
+
+
+def _save_column(series: pd.Series, folder: str, position: int) -> dict:
+    """
+    Сохраняет одну колонку в .npy-файлы и возвращает её описание для meta.json.
+
+    Числа и даты пишутся как есть, строки и категории — как коды (int32)
+    плюс словарь уникальных значений, чтобы их можно было отобразить в память.
+    """
+    prefix = os.path.join(folder, f"col_{position}")
+    column = {"name": series.name, "file": f"col_{position}"}
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(np.int32)
+        categories = np.asarray(series.cat.categories.astype(str), dtype=str)
+        column.update(kind="category")
+        np.save(f"{prefix}.codes.npy", codes)
+        np.save(f"{prefix}.values.npy", categories)
+    elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy(dtype="datetime64[ns]")
+        column.update(kind="datetime")
+        np.save(f"{prefix}.npy", values.view(np.int64))
+    elif pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy()
+        column.update(kind="numeric", dtype=str(values.dtype))
+        np.save(f"{prefix}.npy", values)
+    else:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        values = np.asarray([str(value) for value in uniques], dtype=str)
+        column.update(kind="string")
+        np.save(f"{prefix}.codes.npy", codes.astype(np.int32))
+        np.save(f"{prefix}.values.npy", values)
+
+    return column
+
+
+def _load_column(column: dict, folder: str, mmap_mode: Optional[str], rows: Optional[np.ndarray] = None):
+    """
+    Читает колонку из кеша; с `rows` — только указанные строки (из отображённого
+    в память файла читаются лишь нужные страницы, строки декодируются только выбранные).
+    """
+    prefix = os.path.join(folder, column["file"])
+    kind = column["kind"]
+
+    if kind in ("numeric", "datetime"):
+        values = np.load(f"{prefix}.npy", mmap_mode=mmap_mode)
+        if rows is not None:
+            values = values[rows]
+        return values.view("datetime64[ns]") if kind == "datetime" else values
+
+    codes = np.load(f"{prefix}.codes.npy", mmap_mode=mmap_mode)
+    if rows is not None:
+        codes = codes[rows]
+    values = np.load(f"{prefix}.values.npy")
+    if kind == "category":
+        return pd.Categorical.from_codes(codes, categories=values)
+
+    # Строковые колонки восстанавливаем в object-массив, пустые значения — NaN
+    result = np.empty(len(codes), dtype=object)
+    present = codes >= 0
+    result[present] = values.astype(object)[codes[present]]
+    result[~present] = np.nan
+    return result
+
+
+def _select_columns(meta: dict, columns: Optional[Sequence[str]]) -> List[dict]:
+    if columns is None:
+        return meta["columns"]
+    by_name = {column["name"]: column for column in meta["columns"]}
+    missing = [name for name in columns if name not in by_name]
+    if missing:
+        raise ValueError(f"В кеше нет колонок: {', '.join(missing)}")
+    return [by_name[name] for name in columns]
+
+
+def save_frame(df: pd.DataFrame, cache_dir: str, meta: dict) -> None:
+    """
+    Атомарно записывает DataFrame в колоночный кеш.
+
+    :param df: Таблица для сохранения
+    :param cache_dir: Каталог кеша (будет перезаписан)
+    :param meta: Ключ кеша (сигнатура и хеш исходного файла)
+    """
+    parent = os.path.dirname(cache_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = f"{cache_dir}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_dir)
+
+    try:
+        columns = [_save_column(df[name], tmp_dir, position) for position, name in enumerate(df.columns)]
+        _write_meta(tmp_dir, {**meta, "version": CACHE_VERSION, "rows": len(df), "columns": columns})
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.replace(tmp_dir, cache_dir)
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_frame(cache_dir: str, mmap_mode: Optional[str] = "c", columns: Optional[Sequence[str]] = None,
+               rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Читает DataFrame из колоночного кеша.
+
+    По умолчанию массивы отображаются в память в режиме copy-on-write ("c"):
+    данные подгружаются с диска по мере обращения, а запись в них не трогает файл.
+    Файлы колонок, не вошедших в `columns`, не открываются вовсе.
+
+    :param cache_dir: Каталог кеша
+    :param mmap_mode: Режим np.load (None — прочитать в память целиком)
+    :param columns: Какие колонки читать (по умолчанию — все)
+    :param rows: Позиции строк, которые нужно прочитать (по умолчанию — все)
+    :return: DataFrame
+    """
+    meta = _read_meta(cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"Кеш {cache_dir} не найден или устарел")
+
+    selected = _select_columns(meta, columns)
+    data = {column["name"]: _load_column(column, cache_dir, mmap_mode, rows) for column in selected}
+    return pd.DataFrame(data, columns=[column["name"] for column in selected], copy=False)
+
+
+class LazyFrame:
+    """
+    Таблица из колоночного кеша, колонки которой читаются при первом обращении.
+
+    Подходит, когда заранее неизвестно, какие колонки понадобятся: `frame["Описание"]`
+    читает и декодирует только эту колонку, остальные остаются на диске.
+    """
+
+    def __init__(self, cache_dir: str, mmap_mode: Optional[str] = "c"):
+        """
+        :param cache_dir: Каталог кеша
+        :param mmap_mode: Режим np.load (None — читать колонки в память целиком)
+        """
+        meta = _read_meta(cache_dir)
+        if meta is None:
+            raise FileNotFoundError(f"Кеш {cache_dir} не найден или устарел")
+        self.cache_dir = cache_dir
+        self.mmap_mode = mmap_mode
+        self.columns = [column["name"] for column in meta["columns"]]
+        self._meta_columns = {column["name"]: column for column in meta["columns"]}
+        self._rows = meta["rows"]
+        self._loaded: Dict[str, pd.Series] = {}
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._meta_columns
+
+    def __getitem__(self, key):
+        """
+        :param key: Имя колонки (вернётся Series) или список имён (вернётся DataFrame)
+        """
+        if isinstance(key, list):
+            return self.to_frame(key)
+        if key not in self._loaded:
+            if key not in self._meta_columns:
+                raise KeyError(key)
+            values = _load_column(self._meta_columns[key], self.cache_dir, self.mmap_mode)
+            self._loaded[key] = pd.Series(values, name=key, copy=False)
+        return self._loaded[key]
+
+    @property
+    def loaded(self) -> List[str]:
+        """
+        Колонки, которые уже прочитаны.
+        """
+        return list(self._loaded)
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Собирает DataFrame из указанных колонок (по умолчанию — из всех).
+        """
+        columns = list(self.columns if columns is None else columns)
+        return pd.DataFrame({name: self[name] for name in columns}, columns=columns, copy=False)
+
+
+def is_fresh(source_path: str, cache_dir: str) -> bool:
+    """
+    Проверяет, соответствует ли кеш текущему содержимому исходного файла.
+
+    Сначала сравниваются размер и время изменения; если они разошлись, но размер
+    тот же, сверяется хеш содержимого (файл могли просто «потрогать» или скопировать).
+    """
+    meta = _read_meta(cache_dir)
+    if meta is None:
+        return False
+
+    signature = source_signature(source_path)
+    if meta.get("source") != signature["source"] or meta.get("size") != signature["size"]:
+        return False
+    if meta.get("mtime_ns") == signature["mtime_ns"]:
+        return True
+
+    if meta.get("sha256") != file_sha256(source_path):
+        return False
+
+    # Содержимое не изменилось — обновляем время, чтобы не считать хеш в следующий раз
+    _write_meta(cache_dir, {**meta, "mtime_ns": signature["mtime_ns"]})
+    return True
+
+
+RowFilter = Tuple[str, Callable[[pd.Series], Any]]
+
+
+def project_frame(df: pd.DataFrame, columns: Optional[Sequence[str]], where: Optional[RowFilter]) -> pd.DataFrame:
+    """
+    Оставляет в уже прочитанной таблице нужные строки и колонки (как при чтении из кеша).
+    """
+    if where is not None:
+        name, predicate = where
+        df = df[np.asarray(predicate(df[name]), dtype=bool)].reset_index(drop=True)
+    if columns is not None:
+        missing = [name for name in columns if name not in df.columns]
+        if missing:
+            raise ValueError(f"В таблице нет колонок: {', '.join(missing)}")
+        df = df[list(columns)]
+    return df
+
+
+def _load_projected(cache_dir: str, columns: Optional[Sequence[str]], where: Optional[RowFilter]) -> pd.DataFrame:
+    rows = None
+    if where is not None:
+        # Сначала читается только колонка условия, остальные колонки — только по подходящим строкам
+        name, predicate = where
+        key = load_frame(cache_dir, columns=[name])[name]
+        rows = np.flatnonzero(np.asarray(predicate(key), dtype=bool))
+    return load_frame(cache_dir, columns=columns, rows=rows)
+
+
+def load_cached(source_path: str, builder: Callable[[str], pd.DataFrame], variant: str = "raw",
+                columns: Optional[Sequence[str]] = None, where: Optional[RowFilter] = None) -> pd.DataFrame:
+    """
+    Возвращает таблицу из кеша, а при его отсутствии или устаревании —
+    строит её через `builder` и сохраняет в кеш.
+
+    :param source_path: Путь к исходному файлу
+    :param builder: Функция, которая читает исходный файл в DataFrame
+    :param variant: Вариант представления данных в кеше
+    :param columns: Какие колонки вернуть (по умолчанию — все)
+    :param where: Условие на строки: (колонка, функция от колонки, возвращающая маску)
+    :return: DataFrame
+    """
+    cache_dir = cache_dir_for(source_path, variant)
+
+    try:
+        fresh = is_fresh(source_path, cache_dir)
+    except Exception as e:
+        print(f"Не удалось прочитать кеш {cache_dir}: {e}")
+        fresh = False
+
+    if fresh:
+        # Неизвестная колонка — ошибка вызова, а не повод перестраивать кеш
+        requested = [*(columns or []), *([where[0]] if where is not None else [])]
+        _select_columns(_read_meta(cache_dir), requested)
+        try:
+            return _load_projected(cache_dir, columns, where)
+        except Exception as e:
+            print(f"Не удалось прочитать кеш {cache_dir}: {e}")
+
+    df = builder(source_path)
+    if df.empty:
+        return df
+
+    try:
+        meta = {**source_signature(source_path), "sha256": file_sha256(source_path)}
+        save_frame(df, cache_dir, meta)
+    except Exception as e:
+        print(f"Не удалось сохранить кеш {cache_dir}: {e}")
+
+    return project_frame(df, columns, where)
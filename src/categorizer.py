@@ -0,0 +1,195 @@
+import re
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import traced
+
+# Правило: (вид, шаблон, категория). Виды: "keyword" — подстрока, "prefix" — начало описания,
+# "regex" — регулярное выражение (как re.search). Регистр не учитывается, срабатывает первое подходящее правило.
+Rule = Tuple[str, str, str]
+RULE_KINDS = ("keyword", "prefix", "regex")
+
+DEFAULT_RULES: Tuple[Rule, ...] = (
+    ("prefix", "Снятие в банкомате", "Наличные"),
+    ("prefix", "Снятие наличных", "Наличные"),
+    ("keyword", "брокерского счета", "Переводы"),
+    ("keyword", "торгового счета", "Переводы"),
+    ("prefix", "Перевод с карты", "Пополнения"),
+    ("prefix", "Перевод", "Переводы"),
+    ("prefix", "Пополнение", "Пополнения"),
+    # Переводы людям: "Дмитрий Л."
+    ("regex", r"^[А-ЯЁ][а-яё]+ [А-ЯЁ]\.$", "Переводы"),
+    ("keyword", "аптек", "Аптеки"),
+    ("keyword", "apteka", "Аптеки"),
+    ("keyword", "столовая", "Фастфуд"),
+    ("keyword", "stolovaya", "Фастфуд"),
+    ("keyword", "bufet", "Фастфуд"),
+    ("keyword", "такси", "Такси"),
+    ("keyword", "taxi", "Такси"),
+    ("keyword", "метрополитен", "Транспорт"),
+    ("keyword", "Детский мир", "Детские товары"),
+    ("keyword", "Улыбка радуги", "Косметика"),
+    ("keyword", "МаксидоМ", "Дом и ремонт"),
+    ("keyword", "Магнит", "Супермаркеты"),
+    ("keyword", "Пятерочка", "Супермаркеты"),
+    ("keyword", "Перекресток", "Супермаркеты"),
+)
+# Категории, которые ничего не говорят о трате: их, как и пропуски, заменяют правила
+GENERIC_CATEGORIES = ("Другое", "Различные товары")
+# Сколько различных описаний помнит один `Categorizer` (общий экземпляр живёт, пока работает сервер)
+MEMO_SIZE = 100_000
+
+
+def _literal_alternation(rules: Sequence[Tuple[int, str]], template: str) -> Optional["re.Pattern"]:
+    """
+    Одно выражение из всех подстрок: альтернативы в порядке приоритета, у каждой — именованная
+    группа с номером правила. Одинаковые подстроки нескольких правил записываются один раз.
+    """
+    branches, seen = [], set()
+    for position, pattern in rules:
+        key = pattern.casefold()
+        if key not in seen:
+            seen.add(key)
+            branches.append(f"(?P<r{position}>{re.escape(pattern)})")
+    if not branches:
+        return None
+    return re.compile(template.format("|".join(branches)), re.IGNORECASE | re.DOTALL)
+
+
+def _check_rules(rules: Sequence[Rule]) -> None:
+    for position, (kind, pattern, _) in enumerate(rules):
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Неизвестный вид правила: {kind}. Допустимо: {', '.join(RULE_KINDS)}")
+        if kind == "regex":
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Некорректное регулярное выражение в правиле {position}: {e}") from e
+
+
+class Categorizer:
+    """
+    Категоризация транзакций по описанию на основе правил.
+
+    Подстроки и начала описаний собраны в два выражения-альтернативы: описание
+    просматривается один раз, в каждой позиции находится самое приоритетное из совпадающих
+    правил, из найденных берётся правило с наименьшим номером. Регулярные выражения
+    проверяются по отдельности и только те, что выше по приоритету уже найденного правила.
+
+    Результат запоминается для описания (до `MEMO_SIZE` последних различных описаний):
+    различных описаний намного меньше, чем строк, а строки получают категории по кодам `pd.factorize`.
+    """
+
+    def __init__(self, rules: Sequence[Rule] = DEFAULT_RULES):
+        """
+        :param rules: Правила (вид, шаблон, категория) в порядке приоритета
+        :raises ValueError: Неизвестный вид правила или некорректное регулярное выражение
+        """
+        _check_rules(rules)
+        self.rules = list(rules)
+        self._categories = [category for _, _, category in self.rules]
+        # Подстроки ищутся во всех позициях: опережающая проверка не поглощает символы, поэтому
+        # перекрывающиеся совпадения ("Перевод" и "Перевод с карты") тоже находятся
+        self._keywords = _literal_alternation(
+            [(i, pattern) for i, (kind, pattern, _) in enumerate(self.rules) if kind == "keyword"], "(?=(?:{}))")
+        self._prefixes = _literal_alternation(
+            [(i, pattern) for i, (kind, pattern, _) in enumerate(self.rules) if kind == "prefix"], "(?:{})")
+        self._regexes = [(i, re.compile(pattern, re.IGNORECASE | re.DOTALL))
+                         for i, (kind, pattern, _) in enumerate(self.rules) if kind == "regex"]
+        self._lookup = lru_cache(maxsize=MEMO_SIZE)(self._match)
+
+    def _match(self, description: str) -> Optional[str]:
+        best = len(self.rules)
+        if self._prefixes is not None:
+            match = self._prefixes.match(description)
+            if match:
+                best = int(match.lastgroup[1:])
+        if self._keywords is not None:
+            for match in self._keywords.finditer(description):
+                best = min(best, int(match.lastgroup[1:]))
+        for position, pattern in self._regexes:
+            if position >= best:
+                break
+            if pattern.search(description):
+                best = position
+                break
+        return self._categories[best] if best < len(self.rules) else None
+
+    def categorize_one(self, description) -> Optional[str]:
+        """
+        Категория для одного описания (None — ни одно правило не подошло).
+        """
+        if not isinstance(description, str):
+            return None
+        return self._lookup(description)
+
+    def categorize(self, descriptions: pd.Series) -> pd.Categorical:
+        """
+        Категории для колонки описаний.
+
+        :param descriptions: Колонка "Описание"
+        :return: Categorical той же длины; пропуск — ни одно правило не подошло
+        """
+        if isinstance(descriptions.dtype, pd.CategoricalDtype):
+            codes, uniques = descriptions.cat.codes.to_numpy(), descriptions.cat.categories
+        else:
+            codes, uniques = pd.factorize(descriptions)
+        labels = np.array([self.categorize_one(description) for description in uniques] + [None], dtype=object)
+        # Категории кодируются по различным описаниям, строки получают их коды индексированием;
+        # код описания -1 (пропуск) указывает на последний элемент — None
+        label_codes, label_values = pd.factorize(labels)
+        return pd.Categorical.from_codes(label_codes[codes], categories=label_values)
+
+
+_default_categorizer: Optional[Categorizer] = None
+
+
+@traced()
+def categorize_transactions(transactions: pd.DataFrame, categorizer: Optional[Categorizer] = None,
+                            generic: Sequence[str] = GENERIC_CATEGORIES) -> pd.DataFrame:
+    """
+    Заполняет пустые и общие категории по описанию операции (этап перед агрегацией).
+
+    Категории, которые уже указал банк, сохраняются; правило применяется, только если
+    категория пустая или входит в `generic`, и только если какое-то правило подошло.
+
+    :param transactions: DataFrame с транзакциями
+    :param categorizer: Набор правил (по умолчанию — `DEFAULT_RULES`)
+    :param generic: Категории, которые можно заменить
+    :return: Новый DataFrame; без колонки "Описание" или без подходящих строк — исходный
+    """
+    global _default_categorizer
+    if "Описание" not in transactions.columns or transactions.empty:
+        return transactions
+    if categorizer is None:
+        if _default_categorizer is None:
+            _default_categorizer = Categorizer()
+        categorizer = _default_categorizer
+
+    if "Категория" in transactions.columns:
+        current = transactions["Категория"]
+    else:
+        current = pd.Series(np.nan, index=transactions.index, dtype=object)
+    if not isinstance(current.dtype, pd.CategoricalDtype):
+        current = current.astype("category")
+    replaceable = (current.isna() | current.isin(generic)).to_numpy()
+    if not replaceable.any():
+        return transactions
+
+    found = categorizer.categorize(transactions["Описание"])
+    update = replaceable & (found.codes >= 0)
+    if not update.any():
+        return transactions
+
+    # Объединяем категории и переносим коды найденных категорий — без поэлементного присваивания
+    combined = current.cat.categories.append(found.categories.difference(current.cat.categories))
+    codes = current.cat.codes.to_numpy().copy()
+    codes[update] = combined.get_indexer(found.categories)[found.codes[update]]
+
+    # Меняется одна колонка, остальные данные с исходной таблицей общие
+    df = transactions.copy(deep=False)
+    df["Категория"] = pd.Categorical.from_codes(codes, categories=combined)
+    return df
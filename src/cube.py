@@ -0,0 +1,131 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.money import amount_kopecks, apply_rate, rounding_remainder, to_rubles
+from src.schema import coerce_amounts, coerce_dates
+
+ROUNDING_STEPS = (10, 50, 100)
+KEY_COLUMNS = ["Категория", "Номер карты"]
+
+
+def _month_key(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+class MonthlyCube:
+    """
+    Куб расходов (месяц × категория × карта), собранный за один проход по транзакциям.
+
+    Для каждой ячейки хранятся сумма расходов, количество операций и остатки
+    округления до шагов 10/50/100 для "Инвесткопилки" (суммы и остатки — в целых
+    копейках, поэтому складываются без ошибок округления). Запрос за месяц — это
+    поиск в словаре по ключу месяца, без просмотра всех транзакций.
+    """
+
+    def __init__(self, transactions: Optional[pd.DataFrame] = None, rounding_steps: Tuple[int, ...] = ROUNDING_STEPS):
+        """
+        :param transactions: DataFrame с транзакциями (можно добавить позже через `append`)
+        :param rounding_steps: Шаги округления, для которых считаются остатки
+        """
+        self.rounding_steps = tuple(rounding_steps)
+        self._months: Dict[int, pd.DataFrame] = {}
+        if transactions is not None:
+            self.append(transactions)
+
+    def _aggregate(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        coerce_dates(transactions)
+        coerce_amounts(transactions)
+
+        dates = transactions["Дата операции"]
+        expenses = transactions[(transactions["Сумма операции"] < 0) & dates.notna()]
+        dates = expenses["Дата операции"]
+        spend = amount_kopecks(expenses)
+
+        columns = {"month": (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()}
+        for column in KEY_COLUMNS:
+            columns[column] = expenses[column].to_numpy() if column in expenses.columns else np.nan
+        columns["spend"] = spend
+        columns["count"] = 1
+        for step in self.rounding_steps:
+            columns[f"round_{step}"] = rounding_remainder(spend, step)
+
+        cells = (
+            pd.DataFrame(columns)
+            .groupby(["month", *KEY_COLUMNS], observed=True, dropna=False, sort=False)
+            .sum()
+            .reset_index()
+        )
+        # Категории разных частей не совпадают, поэтому ключи храним как обычные значения
+        for column in KEY_COLUMNS:
+            cells[column] = cells[column].astype(object)
+        return cells.set_index(["month", *KEY_COLUMNS])
+
+    def append(self, transactions: pd.DataFrame) -> "MonthlyCube":
+        """
+        Добавляет новые транзакции в куб: пересчитываются только затронутые месяцы.
+
+        :param transactions: DataFrame с новыми транзакциями
+        :return: Этот же куб
+        """
+        cells = self._aggregate(transactions)
+        for month, part in cells.groupby(level="month", sort=False):
+            part = part.droplevel("month")
+            current = self._months.get(month)
+            self._months[month] = part if current is None else current.add(part, fill_value=0).astype(np.int64)
+        return self
+
+    def months(self) -> List[Tuple[int, int]]:
+        """
+        Месяцы, по которым в кубе есть расходы, в виде пар (год, месяц).
+        """
+        return [(key // 12, key % 12 + 1) for key in sorted(self._months)]
+
+    def month(self, year: int, month: int) -> pd.DataFrame:
+        """
+        Ячейки куба за месяц: индекс (категория, карта), колонки spend, count, round_* (суммы в копейках).
+        """
+        part = self._months.get(_month_key(year, month))
+        if part is None:
+            columns = ["spend", "count", *[f"round_{step}" for step in self.rounding_steps]]
+            index = pd.MultiIndex.from_tuples([], names=KEY_COLUMNS)
+            return pd.DataFrame(0, columns=columns, index=index, dtype=np.int64)
+        return part
+
+    def _spend_kopecks(self, level: str, year: Optional[int] = None, month: Optional[int] = None) -> pd.Series:
+        if year is not None and month is not None:
+            parts = [self.month(year, month)]
+        else:
+            parts = list(self._months.values())
+        if not parts:
+            return pd.Series(dtype=np.int64)
+        spend = pd.concat([part["spend"] for part in parts])
+        return spend.groupby(level=level, sort=True).sum()
+
+    def spend_by(self, level: str, year: Optional[int] = None, month: Optional[int] = None) -> pd.Series:
+        """
+        Сумма расходов в рублях (отрицательная) по категории или карте за месяц или за всё время.
+        """
+        return self._spend_kopecks(level, year, month) / 100
+
+    def cashback(self, year: int, month: int, cashback_rate: float = 0.01) -> dict:
+        """
+        Кешбэк по категориям за месяц, как в `calculate_cashback`.
+        """
+        spend = self._spend_kopecks("Категория", year, month)
+        return {category: to_rubles(apply_rate(total, cashback_rate)) for category, total in spend.items()}
+
+    def rounding_savings(self, year: int, month: int, rounding_step: int = 50) -> float:
+        """
+        Сумма для "Инвесткопилки" за месяц, как в `calculate_rounding_savings`.
+        """
+        if rounding_step not in self.rounding_steps:
+            raise ValueError(f"Шаг округления {rounding_step} не посчитан в кубе: {self.rounding_steps}")
+        return to_rubles(self.month(year, month)[f"round_{rounding_step}"].sum())
+
+    def expenses_by_category(self, year: Optional[int] = None, month: Optional[int] = None) -> dict:
+        """
+        Расходы по категориям за месяц или за всё время, как в `calculate_expenses_by_category`.
+        """
+        return self.spend_by("Категория", year, month).abs().to_dict()
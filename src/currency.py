@@ -0,0 +1,330 @@
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.json_export import atomic_write
+from src.money import KOPECKS_COLUMN, to_kopecks
+from src.profiling import span, traced
+
+BASE_CURRENCY = "RUB"
+CURRENCY_COLUMN = "Валюта операции"
+# Сумма в исходной валюте операции — сохраняется при пересчёте "Сумма операции" в базовую валюту
+ORIGINAL_AMOUNT_COLUMN = "Сумма в валюте операции"
+RATE_COLUMNS = ["date", "currency", "rate"]
+
+CBR_DYNAMIC_URL = os.getenv("CBR_DYNAMIC_URL", "https://www.cbr.ru/scripts/XML_dynamic.asp")
+CURRENCY_RATES_PATH = os.getenv(
+    "CURRENCY_RATES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "currency_rates.csv")
+)
+# Внутренние коды валют ЦБ РФ для запроса динамики курса
+CBR_CODES = {
+    "USD": "R01235", "EUR": "R01239", "CNY": "R01375", "TRY": "R01700J", "GBP": "R01035", "KZT": "R01335",
+    "BYN": "R01090B", "CHF": "R01775", "JPY": "R01820", "AED": "R01230", "AMD": "R01060", "GEL": "R01210",
+}
+# ЦБ не публикует курсы в выходные и праздники: период запроса расширяется назад,
+# чтобы на первую дату всегда был предыдущий курс
+LOOKBACK_DAYS = 10
+# После ошибки запроса валюта не запрашивается повторно в течение этого времени (секунды)
+RETRY_AFTER = 3600
+
+RateFetcher = Callable[[str, date, date], pd.DataFrame]
+
+
+def fetch_cbr_rates(currency: str, start: date, end: date, timeout: float = 10) -> pd.DataFrame:
+    """
+    Запрашивает у ЦБ РФ официальный курс валюты к рублю за каждый день периода.
+
+    :param currency: Код валюты (ISO 4217), например "USD"
+    :param start: Первая дата периода
+    :param end: Последняя дата периода
+    :param timeout: Таймаут запроса, секунды
+    :return: DataFrame с колонками date, rate (рублей за единицу валюты); пустой для неизвестной валюты
+    """
+    from src.utils import get_session
+
+    code = CBR_CODES.get(currency)
+    if code is None:
+        return pd.DataFrame(columns=["date", "rate"])
+
+    params = {"date_req1": start.strftime("%d/%m/%Y"), "date_req2": end.strftime("%d/%m/%Y"), "VAL_NM_RQ": code}
+    with span("HTTP GET", url=CBR_DYNAMIC_URL, currency=currency) as info:
+        response = get_session().get(CBR_DYNAMIC_URL, params=params, timeout=timeout)
+        info["status"] = response.status_code
+    response.raise_for_status()
+
+    records = []
+    for record in ElementTree.fromstring(response.content).iter("Record"):
+        value = float(record.findtext("Value").replace(",", "."))
+        nominal = int(record.findtext("Nominal") or 1)
+        records.append((pd.to_datetime(record.get("Date"), format="%d.%m.%Y"), value / nominal))
+    return pd.DataFrame(records, columns=["date", "rate"])
+
+
+class RateHistory:
+    """
+    Таблица дневных курсов валют к рублю с хранением в CSV-файле.
+
+    Для каждой валюты запоминается уже проверенный период (рядом с таблицей, в `<path>.checked.json`),
+    в том числе дни, за которые ЦБ ничего не опубликовал (выходные и праздники): при расширении
+    периода дозапрашиваются только непроверенные начало и конец. После ошибки запроса валюта
+    не запрашивается повторно `RETRY_AFTER` секунд.
+    """
+
+    def __init__(self, path: Optional[str] = CURRENCY_RATES_PATH, fetcher: RateFetcher = fetch_cbr_rates):
+        """
+        :param path: Путь к CSV-файлу с курсами (None — только в памяти)
+        :param fetcher: Функция (валюта, начало, конец) -> DataFrame[date, rate]
+        """
+        self.path = path
+        self._fetcher = fetcher
+        self._lock = threading.Lock()
+        self._table = self._read()
+        self._checked = self._read_checked()
+
+    def _read(self) -> pd.DataFrame:
+        if self.path and os.path.exists(self.path):
+            try:
+                table = pd.read_csv(self.path, parse_dates=["date"])
+                if list(table.columns) == RATE_COLUMNS:
+                    return table
+            except (ValueError, OSError) as e:
+                print(f"Ошибка чтения курсов валют {self.path}: {e}")
+        return pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "currency": pd.Series(dtype=object),
+                             "rate": pd.Series(dtype="float64")})
+
+    def _checked_path(self) -> Optional[str]:
+        return f"{self.path}.checked.json" if self.path else None
+
+    def _read_checked(self) -> Dict[str, dict]:
+        """
+        Проверенные периоды по валютам: {"first": дата, "last": дата, "failed_at": время ошибки}.
+        Без файла периоды берутся по датам уже сохранённых курсов.
+        """
+        path = self._checked_path()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as file:
+                    return json.load(file)
+            except (ValueError, OSError) as e:
+                print(f"Ошибка чтения {path}: {e}")
+        return {
+            currency: {"first": dates.min().date().isoformat(), "last": dates.max().date().isoformat()}
+            for currency, dates in self._table.groupby("currency")["date"]
+        }
+
+    def _save(self, table_changed: bool) -> None:
+        if not self.path:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        if table_changed:
+            with atomic_write(self.path) as file:
+                self._table.to_csv(file, index=False, date_format="%Y-%m-%d", encoding="utf-8")
+        with atomic_write(self._checked_path()) as file:
+            file.write(json.dumps(self._checked, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    def _missing_ranges(self, currency: str, start: date, end: date) -> List[tuple]:
+        checked = self._checked.get(currency, {})
+        if "first" not in checked:
+            return [(start - timedelta(days=LOOKBACK_DAYS), end)]
+        first, last = date.fromisoformat(checked["first"]), date.fromisoformat(checked["last"])
+        ranges = []
+        if first > start:
+            ranges.append((start - timedelta(days=LOOKBACK_DAYS), first - timedelta(days=1)))
+        if last < end:
+            ranges.append((last + timedelta(days=1), end))
+        return ranges
+
+    def _mark_checked(self, currency: str, range_start: date, range_end: date) -> None:
+        checked = self._checked.setdefault(currency, {})
+        first = date.fromisoformat(checked["first"]) if "first" in checked else range_start
+        last = date.fromisoformat(checked["last"]) if "last" in checked else range_end
+        checked["first"] = min(first, range_start).isoformat()
+        checked["last"] = max(last, range_end).isoformat()
+        checked.pop("failed_at", None)
+
+    def _recently_failed(self, currency: str) -> bool:
+        failed_at = self._checked.get(currency, {}).get("failed_at")
+        return failed_at is not None and time.time() - failed_at < RETRY_AFTER
+
+    def rates(self, currencies: Iterable[str], start: date, end: date) -> pd.DataFrame:
+        """
+        Курсы валют за период; непроверенные дни сначала дозапрашиваются и сохраняются.
+
+        Если источник недоступен, возвращаются уже сохранённые курсы.
+
+        :param currencies: Коды валют (рубль не запрашивается — его курс всегда 1)
+        :param start: Первая дата периода
+        :param end: Последняя дата периода (будущие дни не запрашиваются)
+        :return: DataFrame с колонками date, currency, rate, отсортированный по дате
+        """
+        end = min(end, date.today())
+        currencies = sorted({currency for currency in currencies if currency != BASE_CURRENCY})
+        with self._lock:
+            fetched = []
+            checked_changed = False
+            for currency in currencies:
+                if currency not in CBR_CODES or self._recently_failed(currency):
+                    continue
+                for range_start, range_end in self._missing_ranges(currency, start, end):
+                    if range_start > range_end:
+                        continue
+                    try:
+                        rates = self._fetcher(currency, range_start, range_end)
+                    except Exception as e:
+                        print(f"Ошибка получения курсов {currency} за {range_start}..{range_end}: {e}")
+                        self._checked.setdefault(currency, {})["failed_at"] = time.time()
+                        checked_changed = True
+                        break
+                    # Пустой ответ (выходные, праздники) тоже запоминается: эти дни больше не запрашиваются
+                    self._mark_checked(currency, range_start, range_end)
+                    checked_changed = True
+                    if not rates.empty:
+                        fetched.append(rates.assign(currency=currency)[RATE_COLUMNS])
+
+            if fetched:
+                table = pd.concat([self._table, *fetched], ignore_index=True)
+                table["date"] = pd.to_datetime(table["date"])
+                self._table = table.drop_duplicates(["date", "currency"], keep="last").sort_values(
+                    ["currency", "date"], ignore_index=True)
+            if checked_changed:
+                self._save(table_changed=bool(fetched))
+
+            selected = self._table[self._table["currency"].isin(currencies)]
+        return selected.sort_values("date", kind="stable", ignore_index=True)
+
+
+_history: Optional[RateHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_rate_history() -> RateHistory:
+    """
+    Общая таблица курсов с хранением в CURRENCY_RATES_PATH (создаётся при первом обращении).
+    """
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = RateHistory()
+        return _history
+
+
+def _rub_factors(dates: pd.Series, currencies: np.ndarray, rates: pd.DataFrame) -> np.ndarray:
+    """
+    Курс к рублю на дату каждой строки — одним слиянием as-of (последний курс не позже даты).
+    Для строк раньше первого известного курса берётся первый курс; неизвестная валюта — NaN.
+    """
+    factors = np.ones(len(currencies), dtype="float64")
+    foreign = np.flatnonzero(currencies != BASE_CURRENCY)
+    if not len(foreign):
+        return factors
+
+    left = pd.DataFrame({"date": dates.to_numpy(dtype="datetime64[ns]")[foreign], "currency": currencies[foreign],
+                         "position": foreign})
+    left = left.dropna(subset=["date"]).sort_values("date", kind="stable")
+    right = rates.astype({"date": "datetime64[ns]", "currency": object}).sort_values("date", kind="stable")
+    merged = pd.merge_asof(left, right, on="date", by="currency", direction="backward")
+    missing = merged["rate"].isna().to_numpy()
+    if missing.any() and not right.empty:
+        nearest = pd.merge_asof(left[missing], right, on="date", by="currency", direction="forward")
+        merged.loc[missing, "rate"] = nearest["rate"].to_numpy()
+
+    factors[foreign] = np.nan
+    factors[merged["position"].to_numpy()] = merged["rate"].to_numpy()
+    return factors
+
+
+def conversion_factors(dates: pd.Series, currencies: pd.Series, rates: pd.DataFrame,
+                       base: str = BASE_CURRENCY) -> np.ndarray:
+    """
+    Множители для пересчёта сумм в базовую валюту на дату операции.
+
+    :param dates: Даты операций (datetime64)
+    :param currencies: Валюты операций (пропуск — базовая валюта)
+    :param rates: Курсы к рублю (колонки date, currency, rate), см. `RateHistory.rates`
+    :param base: Базовая валюта
+    :return: Массив множителей; NaN — для валюты нет ни одного курса
+    """
+    codes = currencies.astype(object).fillna(base).to_numpy()
+    factors = _rub_factors(dates, codes, rates)
+    if base != BASE_CURRENCY:
+        # Кросс-курс через рубль: (рублей за единицу валюты) / (рублей за единицу базовой валюты)
+        factors = factors / _rub_factors(dates, np.full(len(codes), base, dtype=object), rates)
+        factors[codes == base] = 1.0
+    return factors
+
+
+def _needed_rates(transactions: pd.DataFrame, base: str, history: Optional[RateHistory]):
+    """
+    Валюты, даты и курсы для пересчёта таблицы; None — пересчитывать нечего.
+    """
+    if CURRENCY_COLUMN not in transactions.columns or ORIGINAL_AMOUNT_COLUMN in transactions.columns:
+        return None
+    currencies = transactions[CURRENCY_COLUMN].astype(object).fillna(base)
+    dates = transactions["Дата операции"]
+    if (currencies == base).all() or dates.isna().all():
+        return None
+
+    history = history or get_rate_history()
+    rates = history.rates(set(currencies.unique()) | {base}, dates.min().date(), dates.max().date())
+    return currencies, dates, rates
+
+
+def prefetch_rates(transactions: pd.DataFrame, base: str = BASE_CURRENCY,
+                   history: Optional[RateHistory] = None) -> None:
+    """
+    Заранее дозапрашивает курсы, которые понадобятся `convert_transactions` для этой таблицы,
+    чтобы запрос к ЦБ шёл в фоне, пока считается остальное.
+
+    :param transactions: Типизированный DataFrame с транзакциями
+    :param base: Базовая валюта
+    :param history: Таблица курсов (по умолчанию — общая, см. `get_rate_history`)
+    """
+    _needed_rates(transactions, base, history)
+
+
+@traced()
+def convert_transactions(transactions: pd.DataFrame, base: str = BASE_CURRENCY,
+                         history: Optional[RateHistory] = None) -> pd.DataFrame:
+    """
+    Пересчитывает "Сумма операции" в базовую валюту по курсу на дату операции.
+
+    Исходная сумма сохраняется в колонке "Сумма в валюте операции", копейки
+    (`amount_kopecks`) пересчитываются, поэтому кешбэк, расходы по категориям и
+    сводка по картам дальше считаются уже в базовой валюте. Если для валюты нет
+    ни одного курса, её суммы остаются как есть (с предупреждением).
+
+    :param transactions: Типизированный DataFrame с транзакциями
+    :param base: Базовая валюта
+    :param history: Таблица курсов (по умолчанию — общая, см. `get_rate_history`)
+    :return: Новый DataFrame; без колонки "Валюта операции", без валютных операций
+        или уже пересчитанный (есть "Сумма в валюте операции") — исходный
+    """
+    needed = _needed_rates(transactions, base, history)
+    if needed is None:
+        return transactions
+    currencies, dates, rates = needed
+    factors = conversion_factors(dates, currencies, rates, base)
+
+    unknown = np.isnan(factors)
+    if unknown.any():
+        print(f"Нет курсов для валют: {', '.join(sorted(set(currencies[unknown])))} — суммы не пересчитаны")
+        factors[unknown] = 1.0
+
+    df = transactions.copy()
+    amounts = df["Сумма операции"].to_numpy(dtype="float64", copy=True)
+    converted = factors != 1.0
+    amounts[converted] = np.round(amounts[converted] * factors[converted], 2)
+    df[ORIGINAL_AMOUNT_COLUMN] = df["Сумма операции"]
+    df["Сумма операции"] = amounts
+    df[KOPECKS_COLUMN] = to_kopecks(amounts)
+    return df
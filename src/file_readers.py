@@ -1,16 +1,88 @@
 import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+import numpy as np
 import pandas as pd
+from src.cache import LazyFrame, RowFilter, cache_dir_for, load_cached, project_frame
+from src.index import DateLike
+from src.profiling import traced
+from src.schema import DERIVED_COLUMNS, REQUIRED_COLUMNS, normalize_transactions
 
-def load_transactions(file_path: str) -> pd.DataFrame:
+DateRange = Tuple[Optional[DateLike], Optional[DateLike]]
+
+
+def _read_excel(path: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    return pd.read_excel(path, dtype=str, usecols=usecols)  # Загружаем всё как строки
+
+
+def _read_excel_typed(path: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    return normalize_transactions(_read_excel(path, usecols))
+
+
+def _source_columns(columns: Sequence[str], typed: bool) -> List[str]:
+    """
+    Колонки файла, которые нужно прочитать, чтобы получить `columns`
+    (вычисляемые колонки схемы заменяются исходными, для схемы нужны дата и сумма).
+    """
+    needed = [DERIVED_COLUMNS.get(name, name) for name in columns]
+    if typed:
+        needed += REQUIRED_COLUMNS
+    return list(dict.fromkeys(needed))
+
+
+def _date_filter(date_range: DateRange) -> RowFilter:
+    """
+    Условие на строки для `load_cached`: дата операции в границах `date_range` (включительно).
+    """
+    start, end = (None if value is None else pd.Timestamp(value) for value in date_range)
+
+    def predicate(dates: pd.Series) -> pd.Series:
+        mask = dates.notna()
+        if start is not None:
+            mask &= dates >= start
+        if end is not None:
+            mask &= dates <= end
+        return mask
+
+    return "Дата операции", predicate
+
+
+@traced()
+def load_transactions(
+        file_path: str,
+        use_cache: bool = True,
+        typed: bool = False,
+        columns: Optional[Sequence[str]] = None,
+        date_range: Optional[DateRange] = None
+) -> pd.DataFrame:
     """
     Загружает транзакции из Excel-файла в DataFrame.
+
+    При первом чтении книга сохраняется в колоночный кеш (`.cache` рядом с файлом),
+    следующие загрузки отображают кеш в память и не разбирают Excel заново.
+    Кеш перестраивается сам, если исходный файл изменился.
+
+    С `typed=True` возвращается типизированная таблица (см. `src.schema.normalize_transactions`):
+    даты и суммы уже разобраны, и аналитические функции не приводят типы повторно.
+
+    С `columns` читаются только нужные колонки: из кеша открываются только их файлы,
+    без кеша Excel разбирается с `usecols`. С `date_range` из кеша сначала читается
+    колонка дат, а остальные колонки — только по строкам периода.
+
     :param file_path: Путь к файлу .xlsx
+    :param use_cache: Использовать колоночный кеш (по умолчанию True)
+    :param typed: Вернуть типизированную таблицу вместо строковой
+    :param columns: Какие колонки вернуть (по умолчанию — все), например `src.schema.ANALYTICS_COLUMNS`
+    :param date_range: Период (начало, конец) по "Дата операции", включительно; None — без границы.
+        Только для `typed=True`.
     :return: DataFrame с транзакциями
     """
+    if date_range is not None and not typed:
+        raise ValueError("Фильтр по датам доступен только для типизированной таблицы (typed=True)")
+    where = _date_filter(date_range) if date_range is not None else None
+
     try:
         # Получаем абсолютный путь до файла, относительно корня проекта
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Переходим на уровень выше папки src
-        absolute_path = os.path.join(base_dir, file_path)  # Соединяем с папкой data
+        absolute_path = _resolve_path(file_path)
         print(f"Загружаем файл: {absolute_path}")  # Для отладки
 
         # Проверяем, существует ли файл
@@ -18,12 +90,107 @@ def load_transactions(file_path: str) -> pd.DataFrame:
             print(f"Файл {absolute_path} не найден!")
             return pd.DataFrame()  # Возвращаем пустой DataFrame, если файл не найден
 
-        df = pd.read_excel(absolute_path, dtype=str)  # Загружаем всё как строки
-        return df
+        builder = _read_excel_typed if typed else _read_excel
+        if use_cache:
+            return load_cached(absolute_path, builder, variant="typed" if typed else "raw", columns=columns,
+                               where=where)
+        usecols = _source_columns(columns, typed) if columns is not None else None
+        return project_frame(builder(absolute_path, usecols), columns, where)
     except Exception as e:
         print(f"Ошибка при загрузке файла: {e}")
         return pd.DataFrame()  # Возвращаем пустой DataFrame, если произошла ошибка
 
-# Пример вызова функции
-file_path = 'data/operations.xlsx'  # Путь относительно корня проекта
-load_transactions(file_path)
+
+def open_transactions(file_path: str, typed: bool = True) -> Optional[LazyFrame]:
+    """
+    Открывает транзакции из колоночного кеша без чтения колонок: каждая колонка
+    читается при первом обращении (см. `src.cache.LazyFrame`). Если кеша нет или он
+    устарел, он сначала строится.
+
+    :param file_path: Путь к файлу .xlsx
+    :param typed: Открыть типизированную таблицу вместо строковой
+    :return: LazyFrame или None, если файл не удалось загрузить
+    """
+    absolute_path = _resolve_path(file_path)
+    if not os.path.exists(absolute_path):
+        print(f"Файл {absolute_path} не найден!")
+        return None
+
+    variant = "typed" if typed else "raw"
+    builder = _read_excel_typed if typed else _read_excel
+    try:
+        # Проверяет свежесть кеша и при необходимости строит его; колонки не читаются
+        load_cached(absolute_path, builder, variant=variant, columns=[])
+        return LazyFrame(cache_dir_for(absolute_path, variant))
+    except Exception as e:
+        print(f"Ошибка при загрузке файла: {e}")
+        return None
+
+
+def _resolve_path(file_path: str) -> str:
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, file_path)
+
+
+def _cell_to_str(value):
+    # pd.read_excel(dtype=str) записывает целые числа без ".0" — делаем так же
+    if value is None:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _rows_to_frame(rows: List[tuple], header: List[str]) -> pd.DataFrame:
+    """
+    Собирает строки листа в DataFrame со строковыми значениями,
+    как это делает pd.read_excel(dtype=str).
+    """
+    return pd.DataFrame([[_cell_to_str(value) for value in row] for row in rows], columns=header, dtype=object)
+
+
+def _iter_excel_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value) for value in next(rows, ())]
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row[:len(header)])
+            if len(batch) >= chunk_size:
+                yield _rows_to_frame(batch, header)
+                batch = []
+        if batch:
+            yield _rows_to_frame(batch, header)
+    finally:
+        workbook.close()
+
+
+def iter_transactions(file_path: str, chunk_size: int = 100_000, typed: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Читает транзакции по частям, не загружая весь файл в память.
+
+    Excel-файлы читаются построчно через openpyxl в режиме read_only,
+    CSV — через pd.read_csv(chunksize=...).
+
+    :param file_path: Путь к файлу .xlsx или .csv
+    :param chunk_size: Количество строк в одной части
+    :param typed: Приводить каждую часть к типизированной схеме
+    :return: Итератор по DataFrame с частями транзакций
+    """
+    absolute_path = _resolve_path(file_path)
+    if not os.path.exists(absolute_path):
+        print(f"Файл {absolute_path} не найден!")
+        return
+
+    if absolute_path.lower().endswith(".csv"):
+        chunks = pd.read_csv(absolute_path, dtype=str, chunksize=chunk_size)
+    else:
+        chunks = _iter_excel_chunks(absolute_path, chunk_size)
+
+    for chunk in chunks:
+        yield normalize_transactions(chunk) if typed else chunk
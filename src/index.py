@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.schema import is_typed, normalize_transactions
+
+DateLike = Union[str, datetime, pd.Timestamp, None]
+
+GROUP_COLUMNS = ["Категория", "Номер карты", "last_digits"]
+
+
+class TransactionIndex:
+    """
+    Индекс по транзакциям, который строится один раз после загрузки.
+
+    Строки отсортированы по "Дата операции", поэтому диапазон дат находится
+    бинарным поиском (`searchsorted`) и возвращается срезом без копирования.
+    Для категорий и карт хранятся отсортированные массивы позиций строк,
+    так что запрос по категории/карте за период стоит O(log n + k), а не O(n).
+    """
+
+    def __init__(self, transactions: pd.DataFrame):
+        """
+        :param transactions: DataFrame с транзакциями (строковый или типизированный)
+        """
+        if not is_typed(transactions):
+            transactions = normalize_transactions(transactions)
+
+        dates = transactions["Дата операции"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        order = np.argsort(dates, kind="stable")
+
+        self.frame = transactions.iloc[order].reset_index(drop=True)
+        self._dates = dates[order]
+        # NaT хранится как минимальное int64 и после сортировки оказывается в начале
+        self._first_valid = int(np.searchsorted(self._dates, np.iinfo(np.int64).min, side="right"))
+        self._positions: Dict[str, Dict[str, np.ndarray]] = {
+            column: self.frame.groupby(column, observed=True, sort=False).indices
+            for column in GROUP_COLUMNS
+            if column in self.frame.columns
+        }
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @staticmethod
+    def _to_int(value: DateLike) -> int:
+        return pd.Timestamp(value).as_unit("ns").value
+
+    def date_bounds(self, start_date: DateLike = None, end_date: DateLike = None) -> Tuple[int, int]:
+        """
+        Границы диапазона дат в отсортированной таблице.
+
+        :param start_date: Начало периода (включительно)
+        :param end_date: Конец периода (включительно)
+        :return: Пара (lo, hi) — строки self.frame.iloc[lo:hi]
+        """
+        lo = self._first_valid
+        hi = len(self._dates)
+        if start_date is not None:
+            lo = max(lo, int(np.searchsorted(self._dates, self._to_int(start_date), side="left")))
+        if end_date is not None:
+            hi = int(np.searchsorted(self._dates, self._to_int(end_date), side="right"))
+        return lo, max(lo, hi)
+
+    def group_positions(self, column: str, value) -> np.ndarray:
+        """
+        Позиции строк с заданным значением колонки (в порядке дат).
+        """
+        return self._positions.get(column, {}).get(value, np.empty(0, dtype=np.intp))
+
+    def positions(
+            self,
+            start_date: DateLike = None,
+            end_date: DateLike = None,
+            category: Optional[str] = None,
+            card: Optional[str] = None
+    ) -> Union[slice, np.ndarray]:
+        """
+        Позиции строк, подходящих под период, категорию и карту.
+
+        :param card: Номер карты целиком ("*7197") или последние четыре цифры ("7197")
+        :return: slice, если фильтр только по датам, иначе массив позиций
+        """
+        lo, hi = self.date_bounds(start_date, end_date)
+        if category is None and card is None:
+            return slice(lo, hi)
+
+        result = None
+        if category is not None:
+            result = self.group_positions("Категория", category)
+        if card is not None:
+            card_positions = self.group_positions("Номер карты", card)
+            if not len(card_positions):
+                card_positions = self.group_positions("last_digits", card)
+            result = card_positions if result is None else np.intersect1d(result, card_positions, assume_unique=True)
+
+        # Позиции отсортированы, поэтому период внутри группы — тоже бинарный поиск
+        return result[np.searchsorted(result, lo, side="left"):np.searchsorted(result, hi, side="left")]
+
+    def query(
+            self,
+            start_date: DateLike = None,
+            end_date: DateLike = None,
+            category: Optional[str] = None,
+            card: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Возвращает транзакции за период (границы включительно) с фильтром по категории и карте.
+        """
+        positions = self.positions(start_date, end_date, category, card)
+        if isinstance(positions, slice):
+            return self.frame.iloc[positions]
+        return self.frame.take(positions)
@@ -0,0 +1,149 @@
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterator
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен: без него используется стандартный json
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+CHUNK_SIZE = 10_000
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _records(frame: pd.DataFrame) -> list:
+    """
+    Строки таблицы в виде списка словарей. Даты переводятся в строки сразу для всей
+    колонки, а не через `default` для каждого значения.
+    """
+    frame = frame.copy(deep=False)
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column].dtype):
+            frame[column] = frame[column].dt.strftime(DATE_FORMAT).fillna("NaT")
+    return frame.to_dict(orient="records")
+
+
+def _default(value: Any) -> Any:
+    """
+    Значения, которые кодировщик не умеет записывать сам: даты — строкой
+    (как `str(дата)`), числа numpy — обычными числами, таблицы — списком записей.
+    """
+    if isinstance(value, pd.DataFrame):
+        return _records(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _without_nan(value: Any) -> Any:
+    """
+    Заменяет NaN и бесконечности на None (в JSON — null), как это делает orjson.
+    """
+    if isinstance(value, float):
+        return value if np.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _without_nan(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_without_nan(item) for item in value]
+    return value
+
+
+def _default_without_nan(value: Any) -> Any:
+    return _without_nan(_default(value))
+
+
+def dumps(data: Any, pretty: bool = False) -> bytes:
+    """
+    Кодирует данные в JSON (UTF-8) за один проход: через orjson, если он установлен, иначе через json.
+
+    :param data: Словарь, список или DataFrame; даты записываются как 'YYYY-MM-DD HH:MM:SS'
+    :param pretty: Записать с отступами (по умолчанию — компактно)
+    :return: JSON в байтах; NaN записывается как null при любом кодировщике
+    """
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=options)
+    data = _without_nan(data)
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, default=_default_without_nan, allow_nan=False,
+                          indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, default=_default_without_nan, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _has_frames(data: Any) -> bool:
+    if isinstance(data, pd.DataFrame):
+        return True
+    return isinstance(data, dict) and any(_has_frames(value) for value in data.values())
+
+
+def iter_json(data: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Кодирует данные в компактный JSON по частям.
+
+    Таблицы (DataFrame) внутри словаря пишутся блоками по `chunk_size` строк,
+    поэтому полный список транзакций не превращается в словари целиком.
+
+    :param data: Словарь, список или DataFrame
+    :param chunk_size: Количество строк таблицы в одном блоке
+    :return: Итератор по частям JSON в байтах
+    """
+    if isinstance(data, pd.DataFrame):
+        yield b"["
+        for start in range(0, len(data), chunk_size):
+            body = dumps(_records(data.iloc[start:start + chunk_size]))[1:-1]
+            yield (b"," + body) if start else body
+        yield b"]"
+    elif _has_frames(data):
+        yield b"{"
+        for position, (key, value) in enumerate(data.items()):
+            yield (b"," if position else b"") + dumps(str(key)) + b":"
+            yield from iter_json(value, chunk_size)
+        yield b"}"
+    else:
+        yield dumps(data)
+
+
+@contextmanager
+def atomic_write(path: str) -> Iterator[BinaryIO]:
+    """
+    Открывает временный файл рядом с `path` на запись (в двоичном режиме) и после
+    успешного выхода из блока заменяет им `path`. При ошибке временный файл удаляется,
+    а старый файл остаётся как был — читатель никогда не увидит наполовину записанный файл.
+
+    :param path: Путь к итоговому файлу
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            yield file
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(data: Any, path: str, pretty: bool = False, chunk_size: int = CHUNK_SIZE) -> None:
+    """
+    Записывает JSON в файл атомарно (см. `atomic_write`).
+
+    :param data: Словарь, список или DataFrame
+    :param path: Путь к файлу
+    :param pretty: Записать с отступами (таблицы тогда кодируются целиком, без блоков)
+    :param chunk_size: Количество строк таблицы в одном блоке
+    """
+    with atomic_write(path) as file:
+        if pretty:
+            file.write(dumps(data, pretty=True))
+        else:
+            for part in iter_json(data, chunk_size):
+                file.write(part)
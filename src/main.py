@@ -1,94 +1,124 @@
 import os
 import sys
-import json
-import pandas as pd
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
-from src.file_readers import load_transactions
-from src.reports import get_top_expenses
-from src.services import calculate_cashback, calculate_rounding_savings
-from src.utils import get_currency_rates, get_stock_prices, load_json, get_greeting
-from src.views import save_to_json
+from typing import Dict, List, Optional
+from src.profiling import profiled, span, tracing
 
+# pandas, requests и модули аналитики импортируются внутри функций: `--help` и `--cached`
+# не должны платить за их загрузку (см. tests/test_main.py::test_import_is_lightweight)
 
-def main(input_date: str):
-    print("Запуск программы...")
+# Этапы, время которых печатается в конце запуска
+STAGES = ("Запросы к API", "Загрузка транзакций", "Фильтрация", "Категоризация", "Конвертация валют",
+          "Аналитика", "Регулярные платежи", "Ожидание рыночных данных", "Сохранение JSON")
+# Куда `save_to_json` сохраняет главную страницу
+CACHED_PAGE_PATH = os.path.join("export", "main_page.json")
 
-    # Загружаем транзакции
-    transactions_file = os.path.join("data", "operations.xlsx")
-    print(f"Загружаем файл: {transactions_file}")
-    transactions = load_transactions(transactions_file)
 
-    if transactions.empty:
-        print("Ошибка: не удалось загрузить транзакции.")
-        return
+def _print_timings(timings: Dict[str, float], total: float) -> None:
+    print("Время этапов:")
+    for name, seconds in timings.items():
+        print(f"  {name}: {seconds * 1000:.1f} мс")
+    print(f"  Всего: {total * 1000:.1f} мс")
+
+
+def _build_main_page(current_date: datetime, stock_symbols: List[str], pipelined: bool,
+                     recurring: bool = False) -> Optional[dict]:
+    """
+    Загружает транзакции, считает аналитику и собирает данные главной страницы.
+
+    Регулярные платежи (`recurring`) ищутся по всей истории до даты, пересчитанной в рубли,
+    поэтому включаются только по запросу.
+
+    :return: Данные для JSON или None, если транзакции не загрузились
+    """
+    from src.categorizer import categorize_transactions
+    from src.currency import convert_transactions, prefetch_rates
+    from src.file_readers import load_transactions
+    from src.index import TransactionIndex
+    from src.reports import get_top_expenses
+    from src.schema import ANALYTICS_COLUMNS
+    from src.services import calculate_cashback, calculate_rounding_savings, summarize_cards
+    from src.utils import collect_market_data, fetch_market_data_timed, get_greeting
+    from src.views import recurring_payments_json
 
-    print(f"Успешно загружено {len(transactions)} транзакций.")
+    # Второй поток — для курсов ЦБ: они нужны только после фильтрации и не должны ждать рыночных данных
+    executor = ThreadPoolExecutor(max_workers=2)
+    market_future = executor.submit(fetch_market_data_timed, stock_symbols) if pipelined else None
 
     try:
-        current_date = datetime.strptime(input_date, "%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        print("Ошибка: Некорректный формат даты. Используйте YYYY-MM-DD HH:MM:SS.")
-        return
+        # Загружаем транзакции
+        transactions_file = os.path.join("data", "operations.xlsx")
+        print(f"Загружаем файл: {transactions_file}")
+        with span("Загрузка транзакций") as info:
+            transactions = load_transactions(transactions_file, typed=True, columns=ANALYTICS_COLUMNS)
+            info["rows"] = len(transactions)
 
-    year, month = current_date.year, current_date.month
-    start_date = current_date.replace(day=1)
-    print(f"Фильтр данных с {start_date.strftime('%Y-%m-%d')} по {current_date.strftime('%Y-%m-%d')}")
+        if transactions.empty:
+            print("Ошибка: не удалось загрузить транзакции.")
+            return None
 
-    transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], dayfirst=True, errors="coerce")
+        print(f"Успешно загружено {len(transactions)} транзакций.")
 
-    print(f"Диапазон дат в файле: {transactions['Дата операции'].min()} - {transactions['Дата операции'].max()}")
+        year, month = current_date.year, current_date.month
+        start_date = current_date.replace(day=1)
+        print(f"Фильтр данных с {start_date.strftime('%Y-%m-%d')} по {current_date.strftime('%Y-%m-%d')}")
 
-    filtered_transactions = transactions[
-        (transactions["Дата операции"] >= start_date) & (transactions["Дата операции"] <= current_date)
-    ].copy()
+        print(f"Диапазон дат в файле: {transactions['Дата операции'].min()} - {transactions['Дата операции'].max()}")
 
-    print(f"Количество транзакций после фильтрации: {len(filtered_transactions)}")
+        with span("Фильтрация") as info:
+            index = TransactionIndex(transactions)
+            filtered_transactions = index.query(start_date, current_date).copy()
+            info["rows"] = len(filtered_transactions)
 
-    greeting = get_greeting()
-    filtered_transactions["Номер карты"] = filtered_transactions["Номер карты"].fillna("").astype(str)
-    filtered_transactions["last_digits"] = filtered_transactions["Номер карты"].apply(lambda x: x[-4:])
-    filtered_transactions["Сумма операции"] = pd.to_numeric(filtered_transactions["Сумма операции"], errors="coerce")
+        print(f"Количество транзакций после фильтрации: {len(filtered_transactions)}")
 
-    cards_summary = (
-        filtered_transactions.groupby("last_digits")["Сумма операции"]
-        .sum()
-        .reset_index()
-    )
-    cards_summary["cashback"] = (cards_summary["Сумма операции"].abs() * 0.01).round(2)
+        # Курсы ЦБ за период запрашиваются в фоне, пока заполняются категории
+        history = index.query(None, current_date) if recurring else None
+        rates_future = None
+        if pipelined:
+            rates_future = executor.submit(prefetch_rates, filtered_transactions if history is None else history)
 
-    cards_info = cards_summary.to_dict(orient="records")
+        # Пустые и общие категории заполняются по описанию до подсчёта кешбэка и расходов
+        with span("Категоризация", rows=len(filtered_transactions)):
+            filtered_transactions = categorize_transactions(filtered_transactions)
 
-    top_transactions = get_top_expenses(filtered_transactions).to_dict(orient="records")
+        # Суммы в иностранной валюте пересчитываются в рубли по курсу ЦБ на дату операции
+        with span("Конвертация валют", rows=len(filtered_transactions)):
+            if rates_future is not None:
+                try:
+                    rates_future.result()
+                except Exception as e:
+                    print(f"Ошибка получения курсов ЦБ: {e}")
+            filtered_transactions = convert_transactions(filtered_transactions)
 
-    # Получаем курсы валют
-    try:
-        currency_rates = get_currency_rates()
-        if not isinstance(currency_rates, dict):
-            raise ValueError("Некорректный формат данных валют")
-    except Exception as e:
-        print(f"Ошибка получения курсов валют: {e}")
-        currency_rates = {"USD": 1, "EUR": 0.96842}
+        greeting = get_greeting()
 
-    # Загружаем настройки пользователя
-    settings = load_json("user_settings.json")
-    stock_symbols = settings.get("user_stocks", ["AAPL", "TSLA", "GOOGL"])
+        with span("Аналитика", rows=len(filtered_transactions)):
+            cards_info = summarize_cards(filtered_transactions)
 
-    # Получаем цены акций
-    try:
-        stock_prices = get_stock_prices(stock_symbols)
-        if not isinstance(stock_prices, dict):
-            raise ValueError("Некорректный формат данных акций")
-        print(f"Ответ API: {stock_prices}")
-    except Exception as e:
-        print(f"Ошибка получения цен на акции: {e}")
-        stock_prices = {symbol: "Ошибка при запросе" for symbol in stock_symbols}
+            top_transactions = get_top_expenses(filtered_transactions).to_dict(orient="records")
+
+            #  Добавляем вызов сервисов
+            cashback_data = calculate_cashback(filtered_transactions, year, month)
+            investment_savings = calculate_rounding_savings(filtered_transactions, year, month, 50)
+
+        recurring_payments = None
+        if recurring:
+            with span("Регулярные платежи", rows=len(history)):
+                recurring_payments = recurring_payments_json(convert_transactions(history), current_date)
 
-    #  Добавляем вызов сервисов
-    cashback_data = calculate_cashback(filtered_transactions, year, month)
-    print(f" Кешбэк по категориям: {cashback_data}")
+        print(f" Кешбэк по категориям: {cashback_data}")
+        print(f" Сумма, отложенная в инвесткопилку: {investment_savings}")
 
-    investment_savings = round(calculate_rounding_savings(filtered_transactions, year, month, 50), 2)
-    print(f" Сумма, отложенная в инвесткопилку: {investment_savings}")
+        # Курсы валют и цены акций: в конвейерном режиме они уже запрошены в фоне
+        with span("Ожидание рыночных данных"):
+            currency_rates, stock_prices = collect_market_data(market_future, stock_symbols)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
     # Вернул правильный `main_page_data`
     main_page_data = {
@@ -100,17 +130,128 @@ def main(input_date: str):
         "cashback": cashback_data,
         "investment_savings": investment_savings
     }
+    if recurring_payments is not None:
+        main_page_data["recurring_payments"] = recurring_payments if recurring_payments else "Нет регулярных платежей"
+    return main_page_data
+
+
+def main(input_date: str, pipelined: bool = True, pretty: bool = False, recurring: bool = False):
+    """
+    Формирует JSON для главной страницы за месяц по указанную дату.
+
+    В конвейерном режиме (по умолчанию) запросы курсов валют и цен акций стартуют
+    сразу и выполняются параллельно с загрузкой Excel и расчётами; результаты
+    собираются прямо перед формированием JSON. Время этапов замеряется через
+    src.profiling и печатается в конце; подробные замеры пишутся в лог и трассу (см. --trace).
+    JSON кодируется один раз прямо из собранных данных (см. `src.json_export`).
+
+    :param input_date: Дата в формате 'YYYY-MM-DD HH:MM:SS'
+    :param pipelined: Запрашивать рыночные данные параллельно с расчётами
+    :param pretty: Сохранить JSON с отступами и напечатать его в консоль
+    :param recurring: Добавить регулярные платежи по всей истории ("recurring_payments")
+    """
+    from src.json_export import dumps
+    from src.utils import configure_market_cache, load_json, wait_for_market_cache
+    from src.views import save_to_json
+
+    print("Запуск программы...")
+
+    try:
+        current_date = datetime.strptime(input_date, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        print("Ошибка: Некорректный формат даты. Используйте YYYY-MM-DD HH:MM:SS.")
+        return
+
+    configure_market_cache()
+
+    # Загружаем настройки пользователя
+    settings = load_json("user_settings.json")
+    stock_symbols = settings.get("user_stocks", ["AAPL", "TSLA", "GOOGL"])
+
+    try:
+        with tracing() as trace:
+            main_page_data = _build_main_page(current_date, stock_symbols, pipelined, recurring)
+            if main_page_data is None:
+                return
+
+            with span("Сохранение JSON"):
+                if pretty:
+                    print(dumps(main_page_data, pretty=True).decode("utf-8"))
+
+                save_to_json(main_page_data, "main_page.json", pretty=pretty)
+            print("JSON успешно сохранен: main_page.json")
+
+            _print_timings(trace.timings(STAGES), time.perf_counter() - trace.started)
+    finally:
+        # Устаревшие курсы и котировки обновляются в фоне: даём им сохраниться до выхода
+        wait_for_market_cache()
+
+
+def show_cached(path: Optional[str] = None) -> bool:
+    """
+    Печатает сохранённый `main_page.json` без загрузки транзакций и запросов к API.
+
+    :param path: Путь к сохранённому JSON (по умолчанию — CACHED_PAGE_PATH)
+    :return: True, если файл найден
+    """
+    path = path or CACHED_PAGE_PATH
+    if not os.path.exists(path):
+        print(f"Файл {path} не найден. Сначала сформируйте его: python -m src.main \"YYYY-MM-DD HH:MM:SS\"")
+        return False
+    with open(path, encoding="utf-8") as file:
+        print(file.read())
+    return True
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main",
+        description="Формирует JSON для главной страницы за месяц по указанную дату."
+    )
+    parser.add_argument("date", nargs="?", help="Дата в формате 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument("--cached", action="store_true",
+                        help="Напечатать последний сохранённый main_page.json, ничего не пересчитывая")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Не запрашивать рыночные данные параллельно с загрузкой и расчётами")
+    parser.add_argument("--pretty", action="store_true",
+                        help="Сохранить JSON с отступами и напечатать его в консоль")
+    parser.add_argument("--recurring", action="store_true",
+                        help="Добавить регулярные платежи и подписки, найденные по всей истории")
+    parser.add_argument("--trace", metavar="PATH", help="Сохранить замеры этапов в JSON-файл")
+    parser.add_argument("--chrome-trace", action="store_true",
+                        help="Сохранить трассу в формате Chrome Trace Event (chrome://tracing, Perfetto)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Замерять изменение памяти в этапах (tracemalloc, замедляет запуск)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="PATH",
+                        help="Запустить под cProfile; с путём — сохранить статистику в файл .prof")
+    return parser
+
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    """
+    Точка входа `python -m src.main`.
 
-    json_data = json.loads(json.dumps(main_page_data, default=str))
+    :param argv: Аргументы командной строки (по умолчанию — sys.argv[1:])
+    :return: Код возврата
+    """
+    parser = build_parser()
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if args.cached:
+        return 0 if show_cached() else 1
+    if args.date is None:
+        parser.error("укажите дату или --cached")
 
-    print(json.dumps(json_data, indent=4, ensure_ascii=False))
+    from src.utils import setup_logging
 
-    save_to_json(json_data, "main_page.json")
-    print("JSON успешно сохранен: main_page.json")
+    setup_logging()
+    profile_context = profiled(args.profile or None) if args.profile is not None else nullcontext()
+    with profile_context, tracing(memory=args.trace_memory) as run_trace:
+        main(args.date, pipelined=not args.sequential, pretty=args.pretty, recurring=args.recurring)
+    if args.trace:
+        run_trace.write(args.trace, chrome=args.chrome_trace)
+        print(f"Трасса сохранена: {args.trace}")
+    return 0
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Использование: python -m src.main 'YYYY-MM-DD HH:MM:SS'")
-    else:
-        main(sys.argv[1])
+    sys.exit(cli())
@@ -0,0 +1,95 @@
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+KOPECKS_PER_RUBLE = 100
+# Ставки хранятся в миллионных долях: 1% = 10 000, шаг — 0,0001%
+RATE_SCALE = 1_000_000
+# Колонка типизированной таблицы с суммой операции в копейках (int64)
+KOPECKS_COLUMN = "amount_kopecks"
+
+IntLike = Union[int, np.integer, np.ndarray, pd.Series]
+
+
+def to_kopecks(amounts) -> np.ndarray:
+    """
+    Переводит суммы в рублях в целые копейки (int64) с округлением до ближайшей копейки.
+
+    :param amounts: Суммы в рублях (число, массив или колонка); пропуски считаются нулём
+    :return: Массив int64 с суммами в копейках
+    """
+    values = np.asarray(amounts, dtype="float64")
+    return np.rint(np.nan_to_num(values, nan=0.0) * KOPECKS_PER_RUBLE).astype(np.int64)
+
+
+def to_rubles(kopecks: IntLike):
+    """
+    Переводит копейки в рубли. Для целого числа возвращает float, для массива — массив float64.
+
+    Деление целого на 100 даёт ближайшее к точному значению число с плавающей точкой,
+    то есть ровно то, что получилось бы при разборе строки "123.45".
+    """
+    if np.ndim(kopecks) == 0:
+        return float(int(kopecks) / KOPECKS_PER_RUBLE)
+    return np.asarray(kopecks, dtype=np.int64) / KOPECKS_PER_RUBLE
+
+
+def amount_kopecks(transactions: pd.DataFrame) -> np.ndarray:
+    """
+    Суммы операций в копейках: готовая колонка типизированной таблицы или перевод "Сумма операции".
+
+    :param transactions: DataFrame с транзакциями
+    :return: Массив int64 по строкам таблицы
+    """
+    if KOPECKS_COLUMN in transactions.columns:
+        return transactions[KOPECKS_COLUMN].to_numpy(dtype=np.int64)
+    return to_kopecks(pd.to_numeric(transactions["Сумма операции"], errors="coerce"))
+
+
+def rate_units(rate: float) -> int:
+    """
+    Процентная ставка в миллионных долях (0.01 → 10 000), округлённая половиной вверх.
+
+    :param rate: Ставка, например 0.01 для 1%
+    :return: Целое число миллионных долей
+    :raises ValueError: Ставка отрицательная
+    """
+    units = float(rate) * RATE_SCALE
+    if units < 0:
+        raise ValueError(f"Ставка должна быть неотрицательной: {rate}")
+    return int(np.floor(units + 0.5))
+
+
+def apply_rate(kopecks: IntLike, rate: float):
+    """
+    Процент от модуля суммы в копейках, округлённый до копейки (половина — вверх).
+
+    Считается только в целых числах: |сумма| × миллионные доли / 1 000 000.
+
+    :param kopecks: Сумма или массив сумм в копейках
+    :param rate: Ставка, например 0.01 для 1%
+    :return: Результат в копейках (того же вида, что и вход)
+    """
+    units = rate_units(rate)
+    if np.ndim(kopecks) == 0:
+        # Целые Python не переполняются на больших итогах
+        return (abs(int(kopecks)) * units + RATE_SCALE // 2) // RATE_SCALE
+    return (np.abs(kopecks) * units + RATE_SCALE // 2) // RATE_SCALE
+
+
+def rounding_remainder(kopecks: IntLike, rounding_step: int):
+    """
+    Сколько копеек не хватает до округления траты вверх до шага в рублях ("Инвесткопилка").
+
+    Для траты -1712 руб. и шага 50 руб. это 38 руб. (3800 коп.): остаток -|сумма| по модулю шага.
+
+    :param kopecks: Сумма или массив сумм в копейках
+    :param rounding_step: Шаг округления в рублях (10, 50, 100)
+    :return: Остатки в копейках
+    :raises ValueError: Шаг не положительный
+    """
+    step = int(round(rounding_step * KOPECKS_PER_RUBLE))
+    if step <= 0:
+        raise ValueError(f"Шаг округления должен быть положительным: {rounding_step}")
+    return (-np.abs(kopecks)) % step
@@ -0,0 +1,224 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.money import amount_kopecks, apply_rate, rounding_remainder, to_rubles
+from src.profiling import traced
+from src.reports import TOP_COLUMNS
+from src.schema import is_typed, normalize_transactions
+from src.topn import top_n_positions
+
+PARTITIONS = ("card", "month")
+
+
+class SharedColumns:
+    """
+    Числовые колонки транзакций в разделяемой памяти (multiprocessing.shared_memory).
+
+    Процессы-исполнители подключаются к блокам по имени и читают массивы без
+    копирования и без pickle всей таблицы. Строки (категории, описания) в
+    разделяемую память не попадают: исполнители работают с кодами и позициями,
+    а текстовые значения подставляет основной процесс.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        :param arrays: Словарь {имя колонки: массив}
+        """
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedColumns":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _attach(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+    """
+    Подключается к разделяемым колонкам в процессе-исполнителе.
+
+    :return: Пара (открытые блоки, словарь массивов)
+    """
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def _aggregate_partition(arrays: Dict[str, np.ndarray], lo: int, hi: int, month_key: int, n_categories: int,
+                         rounding_step: int, top_n: int) -> Dict[str, Any]:
+    """
+    Частичные результаты по строкам [lo, hi): суммы в копейках и кандидаты в топ расходов.
+    """
+    kopecks = arrays["kopecks"][lo:hi]
+    categories = arrays["category"][lo:hi]
+    expense = arrays["expense"][lo:hi]
+    in_month = expense & (arrays["month"][lo:hi] == month_key)
+
+    def by_category(mask):
+        codes = categories[mask & (categories >= 0)]
+        totals = np.zeros(n_categories, dtype=np.int64)
+        np.add.at(totals, codes, kopecks[mask & (categories >= 0)])
+        return np.bincount(codes, minlength=n_categories), totals
+
+    expense_count, expense_total = by_category(expense)
+    month_count, month_total = by_category(in_month)
+
+    savings = rounding_remainder(kopecks[in_month], rounding_step)
+
+    # Кандидаты в топ: N самых больших трат части; при равных суммах — более ранние строки
+    # (внутри части строки идут в исходном порядке)
+    positions = arrays["position"][lo:hi][expense]
+    amounts = arrays["amount"][lo:hi][expense]
+    order = top_n_positions(amounts, top_n)
+
+    return {
+        "expense_count": expense_count,
+        "expense_total": expense_total,
+        "month_count": month_count,
+        "month_total": month_total,
+        "savings": int(savings.sum()),
+        "top_positions": positions[order],
+        "top_amounts": amounts[order],
+    }
+
+
+def _partition_task(spec, lo, hi, month_key, n_categories, rounding_step, top_n):
+    blocks, arrays = _attach(spec)
+    try:
+        return _aggregate_partition(arrays, lo, hi, month_key, n_categories, rounding_step, top_n)
+    finally:
+        # Блоком владеет основной процесс: исполнитель только отключается, unlink делает SharedColumns.close
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def _partition_bounds(keys: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Границы непрерывных отрезков с одинаковым ключом в отсортированном массиве.
+    """
+    if not len(keys):
+        return []
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+    ends = np.concatenate([starts[1:], [len(keys)]])
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+@traced()
+def parallel_analytics(
+        transactions: pd.DataFrame,
+        year: int,
+        month: int,
+        partition_by: str = "card",
+        max_workers: Optional[int] = None,
+        rounding_step: int = 50,
+        cashback_rate: float = 0.01,
+        top_n: int = 5
+) -> Dict[str, Any]:
+    """
+    Кешбэк, расходы по категориям, "Инвесткопилка" и топ расходов, посчитанные
+    параллельно по частям таблицы (по картам или по месяцам) в ProcessPoolExecutor.
+
+    Числовые колонки передаются исполнителям через разделяемую память, а частичные
+    результаты — суммы в копейках и кандидаты в топ — складываются в основном процессе,
+    поэтому ответ не зависит от разбиения и числа процессов и совпадает с
+    calculate_cashback, calculate_expenses_by_category, calculate_rounding_savings
+    и get_top_expenses.
+
+    :param transactions: DataFrame с транзакциями
+    :param year: Год для кешбэка и "Инвесткопилки"
+    :param month: Месяц для кешбэка и "Инвесткопилки"
+    :param partition_by: "card" — по номеру карты, "month" — по месяцу операции
+    :param max_workers: Количество процессов (1 — считать в текущем процессе)
+    :param rounding_step: Шаг округления для "Инвесткопилки"
+    :param cashback_rate: Процент кешбэка
+    :param top_n: Количество записей в топе расходов
+    :return: Словарь с ключами cashback, expenses_by_category, rounding_savings, top_expenses
+    """
+    if partition_by not in PARTITIONS:
+        raise ValueError(f"Неизвестное разбиение: {partition_by}. Допустимо: {', '.join(PARTITIONS)}")
+    if not is_typed(transactions):
+        transactions = normalize_transactions(transactions)
+
+    dates = transactions["Дата операции"]
+    amounts = transactions["Сумма операции"].to_numpy(dtype="float64")
+    months = np.where(dates.isna(), -1, dates.dt.year * 12 + dates.dt.month - 1).astype(np.int64)
+    categories = transactions["Категория"].astype("category").cat
+    if partition_by == "card":
+        keys = transactions["Номер карты"].astype("category").cat.codes.to_numpy().astype(np.int64)
+    else:
+        keys = months
+
+    # Строки одной части идут подряд; внутри части сохраняется исходный порядок
+    order = np.argsort(keys, kind="stable")
+    columns = {
+        "amount": amounts[order],
+        "kopecks": amount_kopecks(transactions)[order],
+        "expense": (amounts < 0)[order],
+        "month": months[order],
+        "category": categories.codes.to_numpy().astype(np.int64)[order],
+        "position": order.astype(np.int64),
+    }
+    bounds = _partition_bounds(keys[order])
+    n_categories = len(categories.categories)
+    args = (year * 12 + month - 1, n_categories, rounding_step, top_n)
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(bounds) <= 1:
+        parts = [_aggregate_partition(columns, lo, hi, *args) for lo, hi in bounds]
+    else:
+        with SharedColumns(columns) as shared, ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as pool:
+            futures = [pool.submit(_partition_task, shared.spec, lo, hi, *args) for lo, hi in bounds]
+            parts = [future.result() for future in futures]
+
+    return _merge(parts, transactions, categories.categories, cashback_rate, top_n)
+
+
+def _merge(parts: List[Dict[str, Any]], transactions: pd.DataFrame, categories: pd.Index, cashback_rate: float,
+           top_n: int) -> Dict[str, Any]:
+    """
+    Складывает частичные результаты частей в итоговый ответ.
+    """
+    n_categories = len(categories)
+    expense_count = sum((part["expense_count"] for part in parts), np.zeros(n_categories, dtype=np.int64))
+    expense_total = sum((part["expense_total"] for part in parts), np.zeros(n_categories, dtype=np.int64))
+    month_count = sum((part["month_count"] for part in parts), np.zeros(n_categories, dtype=np.int64))
+    month_total = sum((part["month_total"] for part in parts), np.zeros(n_categories, dtype=np.int64))
+
+    cashback = {categories[code]: to_rubles(apply_rate(month_total[code], cashback_rate))
+                for code in np.flatnonzero(month_count)}
+    expenses_by_category = {categories[code]: to_rubles(abs(expense_total[code]))
+                            for code in np.flatnonzero(expense_count)}
+    rounding_savings = to_rubles(sum(part["savings"] for part in parts))
+
+    positions = np.concatenate([part["top_positions"] for part in parts] or [np.empty(0, dtype=np.int64)])
+    amounts = np.concatenate([part["top_amounts"] for part in parts] or [np.empty(0)])
+    top_positions = positions[np.lexsort((positions, amounts))[:top_n]]
+    top_expenses = transactions.iloc[top_positions][TOP_COLUMNS]
+
+    return {
+        "cashback": cashback,
+        "expenses_by_category": expenses_by_category,
+        "rounding_savings": rounding_savings,
+        "top_expenses": top_expenses,
+    }
@@ -0,0 +1,234 @@
+import io
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_trace: Optional["Trace"] = None
+_trace_lock = threading.Lock()
+_local = threading.local()
+
+
+def _count_rows(value: Any) -> Optional[int]:
+    """
+    Количество строк в результате: длина таблицы, словаря или списка.
+    """
+    if isinstance(value, (list, tuple, dict)) or hasattr(value, "shape"):
+        try:
+            return len(value)
+        except TypeError:
+            return None
+    return None
+
+
+class Trace:
+    """
+    Набор замеров (span) одного запуска: имя этапа, начало, длительность, поток,
+    вложенность, количество строк и изменение памяти.
+    """
+
+    def __init__(self, memory: bool = False):
+        """
+        :param memory: Замерять изменение памяти в каждом этапе (через tracemalloc, заметно замедляет запуск)
+        """
+        self.memory = memory
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(record)
+
+    def timings(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Суммарное время этапов (в секундах) в порядке их начала.
+
+        :param names: Какие этапы учитывать (по умолчанию — все)
+        """
+        names = None if names is None else set(names)
+        result: Dict[str, float] = {}
+        for record in sorted(self.spans, key=lambda item: item["start"]):
+            if names is None or record["name"] in names:
+                result[record["name"]] = result.get(record["name"], 0.0) + record["duration"]
+        return result
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        Замеры в формате Chrome Trace Event (открываются в chrome://tracing или Perfetto).
+        """
+        events = []
+        for record in self.spans:
+            args = {key: value for key, value in record.items()
+                    if key not in ("name", "start", "duration", "thread", "depth")}
+            events.append({
+                "name": record["name"],
+                "ph": "X",
+                "ts": round(record["start"] * 1e6, 1),
+                "dur": round(record["duration"] * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": record["thread"],
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, chrome: bool = False) -> None:
+        """
+        Сохраняет замеры в JSON-файл.
+
+        :param path: Путь к файлу
+        :param chrome: Сохранить в формате Chrome Trace Event вместо списка замеров
+        """
+        data = self.to_chrome() if chrome else {"spans": sorted(self.spans, key=lambda item: item["start"])}
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=2, default=str)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace
+
+
+@contextmanager
+def tracing(memory: bool = False):
+    """
+    Включает сбор замеров на время блока. Если сбор уже включён, используется текущий Trace.
+
+    :param memory: Замерять изменение памяти в этапах
+    :return: Trace с замерами
+    """
+    global _trace
+    with _trace_lock:
+        outer = _trace
+        if outer is None:
+            _trace = Trace(memory=memory)
+    trace = _trace
+    started_tracemalloc = trace.memory and outer is None and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    try:
+        yield trace
+    finally:
+        if started_tracemalloc:
+            tracemalloc.stop()
+        if outer is None:
+            with _trace_lock:
+                _trace = None
+
+
+def _enabled() -> bool:
+    return _trace is not None or logger.isEnabledFor(logging.INFO)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Замеряет время блока кода.
+
+    Замер попадает в текущий Trace (см. `tracing`) и в лог (INFO, одна JSON-строка).
+    Внутри блока в словарь можно дописать свои поля, например количество строк:
+
+        with span("Фильтрация") as info:
+            info["rows"] = len(result)
+
+    :param name: Название этапа
+    :param attrs: Дополнительные поля замера
+    """
+    if not _enabled():
+        yield attrs
+        return
+
+    trace = _trace
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    measure_memory = trace is not None and trace.memory and tracemalloc.is_tracing()
+    memory_before = tracemalloc.get_traced_memory()[0] if measure_memory else 0
+    origin = trace.started if trace is not None else 0.0
+
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        record = {
+            "name": name,
+            "start": start - origin,
+            "duration": duration,
+            "thread": threading.get_ident(),
+            "depth": len(stack),
+            **{key: value for key, value in attrs.items() if value is not None},
+        }
+        if measure_memory:
+            record["memory_delta_mb"] = round((tracemalloc.get_traced_memory()[0] - memory_before) / 2**20, 3)
+        if trace is not None:
+            trace.add(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def traced(name: Optional[str] = None):
+    """
+    Декоратор: замеряет каждый вызов функции как span с количеством строк на входе и выходе.
+
+    Когда сбор замеров выключен и логирование ниже INFO, функция вызывается напрямую.
+
+    :param name: Название этапа (по умолчанию — имя функции)
+    """
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled():
+                return func(*args, **kwargs)
+            with span(label, rows_in=_count_rows(args[0]) if args else None) as info:
+                result = func(*args, **kwargs)
+                info["rows_out"] = _count_rows(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def profiled(path: Optional[str] = None, top: int = 25):
+    """
+    Запускает блок под cProfile, печатает самые затратные функции и при необходимости
+    сохраняет статистику в файл (открывается в snakeviz или `python -m pstats`).
+
+    :param path: Путь к файлу .prof (None — только вывод в консоль)
+    :param top: Сколько функций показать
+    """
+    # cProfile и pstats нужны только при профилировании — не замедляют импорт модуля
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            profiler.dump_stats(path)
+            print(f"Профиль сохранён: {path}")
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+        print(output.getvalue())
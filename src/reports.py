@@ -1,27 +1,56 @@
+import heapq
+import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+from src.cube import MonthlyCube
+from src.index import DateLike, TransactionIndex
+from src.money import amount_kopecks, to_rubles
+from src.profiling import traced
+from src.schema import TOP_COLUMNS, coerce_amounts, coerce_dates
+from src.store import TransactionStore
+from src.topn import top_n_by_group, top_n_positions
 
+# Периоды регулярных платежей (длина в днях) и сдвиг до следующего платежа
+RECURRING_PERIODS = {"week": 7.0, "month": 30.44, "quarter": 91.31, "year": 365.25}
+RECURRING_OFFSETS = {"week": pd.DateOffset(weeks=1), "month": pd.DateOffset(months=1),
+                     "quarter": pd.DateOffset(months=3), "year": pd.DateOffset(years=1)}
+DAYS_PER_MONTH = 30.44
+# Доля промежутков серии, которые должны быть близки к периоду
+REGULAR_SHARE = 0.75
 
-def calculate_expenses_by_category(transactions: pd.DataFrame) -> dict:
+
+@traced()
+def calculate_expenses_by_category(transactions: Union[pd.DataFrame, MonthlyCube, TransactionStore]) -> dict:
     """
     Считает общие расходы по каждой категории.
 
-    :param transactions: DataFrame с колонками ["Категория", "Сумма операции"]
+    :param transactions: DataFrame с колонками ["Категория", "Сумма операции"], готовый `MonthlyCube`
+        или `TransactionStore`
     :return: Словарь с суммой расходов по каждой категории
     """
+    if isinstance(transactions, (MonthlyCube, TransactionStore)):
+        return transactions.expenses_by_category()
+
     if "Категория" not in transactions.columns or "Сумма операции" not in transactions.columns:
         raise ValueError("Отсутствуют необходимые колонки: 'Категория' или 'Сумма операции'")
 
-    transactions["Сумма операции"] = pd.to_numeric(transactions["Сумма операции"], errors="coerce")
-    expenses = transactions[transactions["Сумма операции"] < 0]
+    return {category: to_rubles(abs(total)) for category, total in _expenses_kopecks(transactions).items()}
 
-    category_expenses = expenses.groupby("Категория")["Сумма операции"].sum().abs().to_dict()
 
-    return category_expenses
+def _expenses_kopecks(transactions: pd.DataFrame) -> Dict[str, int]:
+    """
+    Сумма расходов по категориям в копейках (отрицательная).
+    """
+    coerce_amounts(transactions)
+    expenses = transactions[transactions["Сумма операции"] < 0]
+    kopecks = pd.Series(amount_kopecks(expenses), index=expenses.index)
+    totals = kopecks.groupby(expenses["Категория"], observed=True).sum()
+    return {category: int(total) for category, total in totals.items()}
 
 
+@traced()
 def filter_transactions(
-        transactions: pd.DataFrame,
+        transactions: Union[pd.DataFrame, TransactionIndex, TransactionStore],
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         category: Optional[str] = None,
@@ -30,8 +59,19 @@ def filter_transactions(
 ) -> pd.DataFrame:
     """
     Фильтрует транзакции по дате, категории и сумме.
+
+    Если вместо DataFrame передан `TransactionIndex`, период и категория
+    выбираются бинарным поиском по индексу, а не полным просмотром таблицы.
+    Для `TransactionStore` все фильтры, включая суммы, выполняются запросом SQL к базе.
     """
-    transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], format="%Y-%m-%d", errors="coerce")
+    if isinstance(transactions, TransactionStore):
+        return transactions.query(start_date or None, end_date or None, category or None,
+                                  min_amount=min_amount, max_amount=max_amount)
+    if isinstance(transactions, TransactionIndex):
+        transactions = transactions.query(start_date, end_date, category)
+        start_date = end_date = category = None
+
+    coerce_dates(transactions, format="%Y-%m-%d")
 
     if start_date:
         transactions = transactions[transactions["Дата операции"] >= pd.to_datetime(start_date)]
@@ -41,7 +81,7 @@ def filter_transactions(
     if category:
         transactions = transactions[transactions["Категория"] == category]
 
-    transactions["Сумма операции"] = pd.to_numeric(transactions["Сумма операции"], errors="coerce")
+    coerce_amounts(transactions)
     if min_amount is not None:
         transactions = transactions[transactions["Сумма операции"] >= min_amount]
     if max_amount is not None:
@@ -50,21 +90,285 @@ def filter_transactions(
     return transactions
 
 
-def get_top_expenses(transactions: pd.DataFrame, top_n: int = 5) -> pd.DataFrame:
+@traced()
+def get_top_expenses(transactions: Union[pd.DataFrame, TransactionStore], top_n: int = 5) -> pd.DataFrame:
     """
     Возвращает топ-N самых больших трат.
 
     :param transactions: DataFrame с колонками ["Дата операции", "Сумма операции", "Категория", "Описание"]
+        или `TransactionStore` (топ выбирается запросом SQL)
     :param top_n: Количество записей в топе (по умолчанию 5)
     :return: DataFrame с топ-N тратами
     """
+    if isinstance(transactions, TransactionStore):
+        return transactions.top_expenses(top_n)
+
+    if "Сумма операции" not in transactions.columns:
+        raise ValueError("Отсутствует колонка 'Сумма операции'")
+
+    coerce_amounts(transactions)
+
+    # Частичный отбор только среди расходов (отрицательных сумм), без копии и полной сортировки таблицы;
+    # при равных суммах первой идёт более ранняя строка
+    positions = top_n_positions(_expense_amounts(transactions), top_n)
+
+    return transactions.iloc[positions][TOP_COLUMNS]
+
+
+def _expense_amounts(transactions: pd.DataFrame) -> np.ndarray:
+    """
+    Суммы расходов по строкам таблицы; у доходов и пропусков — NaN (не участвуют в отборе).
+    """
+    amounts = transactions["Сумма операции"].to_numpy(dtype="float64")
+    return np.where(amounts < 0, amounts, np.nan)
+
+
+def _group_codes(transactions: pd.DataFrame, grouping: str) -> Tuple[np.ndarray, Any]:
+    """
+    Номера групп строк (-1 — без группы) и значения групп для колонки или "month" ("YYYY-MM").
+    """
+    if grouping == "month":
+        coerce_dates(transactions)
+        dates = transactions["Дата операции"]
+        keys = np.where(dates.isna(), -1, dates.dt.year * 12 + dates.dt.month - 1).astype(np.int64)
+        codes, months = pd.factorize(keys, sort=True)
+        labels = [f"{key // 12:04d}-{key % 12 + 1:02d}" if key >= 0 else None for key in months]
+        return np.where(keys >= 0, codes, -1), labels
+    if grouping not in transactions.columns:
+        raise ValueError(f"Отсутствует колонка для группировки: '{grouping}'")
+    return pd.factorize(transactions[grouping], sort=True)
+
+
+@traced()
+def get_top_expenses_by(
+        transactions: pd.DataFrame,
+        by: Sequence[str] = ("Номер карты", "Категория", "month"),
+        top_n: int = 5
+) -> Dict[str, Dict[Any, pd.DataFrame]]:
+    """
+    Возвращает топ-N самых больших трат внутри каждой группы для нескольких группировок сразу.
+
+    Для каждой группировки все группы отбираются одной сортировкой (см. `src.topn.top_n_by_group`),
+    порядок внутри группы такой же, как у `get_top_expenses`.
+
+    :param transactions: DataFrame с колонками ["Дата операции", "Сумма операции", "Категория", "Описание"]
+    :param by: Колонки группировки; "month" — месяц операции в виде "YYYY-MM"
+    :param top_n: Количество записей в топе каждой группы (по умолчанию 5)
+    :return: Словарь {группировка: {значение группы: DataFrame с топ-N тратами}}
+    """
     if "Сумма операции" not in transactions.columns:
         raise ValueError("Отсутствует колонка 'Сумма операции'")
 
-    transactions["Сумма операции"] = pd.to_numeric(transactions["Сумма операции"], errors="coerce")
+    coerce_amounts(transactions)
+    amounts = _expense_amounts(transactions)
+
+    result = {}
+    for grouping in by:
+        codes, labels = _group_codes(transactions, grouping)
+        groups = top_n_by_group(amounts, codes, top_n)
+        result[grouping] = {labels[code]: transactions.iloc[positions][TOP_COLUMNS]
+                            for code, positions in groups.items()}
+    return result
+
+
+def _description_groups(descriptions: pd.Series) -> np.ndarray:
+    """
+    Номер группы для каждого описания после нормализации (регистр, цифры и знаки не учитываются,
+    "YANDEX*PLUS 1234" и "Yandex Plus" — одна группа); -1 — пустое описание.
+
+    Нормализуются только различные описания, группы находятся хешированием (`pd.factorize`).
+    """
+    codes, uniques = pd.factorize(descriptions)
+    normalized = pd.Series(uniques, dtype=object).str.lower().str.replace(r"[\W\d_]+", " ", regex=True).str.strip()
+    group_codes, _ = pd.factorize(normalized.replace("", np.nan))
+    # Код -1 (пустое описание) указывает на последний элемент
+    return np.append(group_codes, -1)[codes]
+
+
+class RecurringPayments:
+    """
+    Регулярные платежи и подписки, найденные один раз по всей истории транзакций.
+
+    Описания нормализуются и группируются хешированием, внутри группы операции
+    сортируются по дате и сравниваются только соседние — без попарного сравнения всех операций.
+    Период и сумма серии определяются в конструкторе; `as_of` только обрезает серии
+    по дате, поэтому главная страница на любую дату не просматривает историю заново.
+    """
+
+    def __init__(self, transactions: pd.DataFrame, min_occurrences: int = 3, amount_tolerance: float = 0.2,
+                 interval_tolerance: float = 0.2):
+        """
+        :param transactions: DataFrame с колонками ["Дата операции", "Сумма операции", "Описание"]
+            (суммы — в одной валюте, см. `src.currency.convert_transactions`)
+        :param min_occurrences: Минимальное количество платежей в серии
+        :param amount_tolerance: Допустимое отклонение суммы от медианной суммы серии (доля)
+        :param interval_tolerance: Допустимое отклонение промежутка от периода (доля)
+        :raises ValueError: Нет колонки "Описание" или "Сумма операции"
+        """
+        if "Описание" not in transactions.columns or "Сумма операции" not in transactions.columns:
+            raise ValueError("Отсутствуют необходимые колонки: 'Описание' или 'Сумма операции'")
+        coerce_dates(transactions)
+        coerce_amounts(transactions)
+        self.min_occurrences = min_occurrences
+
+        dates = transactions["Дата операции"]
+        self.last_date = dates.max()
+        expenses = transactions[(transactions["Сумма операции"] < 0) & dates.notna()]
+        payments = pd.DataFrame({
+            "group": _description_groups(expenses["Описание"]),
+            "date": expenses["Дата операции"].to_numpy(),
+            "kopecks": -amount_kopecks(expenses),
+            "merchant": expenses["Описание"].to_numpy(),
+        })
+        payments = payments[payments["group"] >= 0]
+
+        # Похожие суммы: не дальше amount_tolerance от медианы группы
+        median_amount = payments.groupby("group")["kopecks"].transform("median")
+        payments = payments[(payments["kopecks"] - median_amount).abs() <= amount_tolerance * median_amount]
+
+        # Несколько списаний за день считаются одним платежом; дальше — промежутки между соседними датами
+        payments = payments.assign(day=payments["date"].dt.normalize())
+        payments = payments.sort_values(["group", "date"], kind="stable").drop_duplicates(["group", "day"])
+        same_group = payments["group"].eq(payments["group"].shift())
+        payments["interval"] = payments["day"].diff().dt.days.where(same_group)
+
+        grouped = payments.groupby("group", sort=False)
+        series = pd.DataFrame({
+            "merchant": grouped["merchant"].last(),
+            "interval_days": grouped["interval"].median(),
+            "amount": grouped["kopecks"].median(),
+            "occurrences": grouped.size(),
+        })
+        series = series[series["occurrences"] >= min_occurrences]
+
+        # Период — ближайший из RECURRING_PERIODS, если медианный промежуток укладывается в допуск
+        lengths = np.array(list(RECURRING_PERIODS.values()))
+        distance = np.abs(series["interval_days"].to_numpy()[:, None] - lengths) / lengths
+        nearest = distance.argmin(axis=1) if len(series) else np.empty(0, dtype=np.intp)
+        matched = distance[np.arange(len(series)), nearest] <= interval_tolerance
+        series = series[matched].assign(period=np.array(list(RECURRING_PERIODS), dtype=object)[nearest[matched]])
+
+        # Серия регулярна, если почти все промежутки близки к периоду (пропуск одного платежа допустим)
+        period_days = series["period"].map(RECURRING_PERIODS)
+        intervals = payments[payments["group"].isin(series.index)]
+        expected = intervals["group"].map(period_days)
+        regular = ((intervals["interval"] - expected).abs() <= interval_tolerance * expected).where(
+            intervals["interval"].notna())
+        share = regular.groupby(intervals["group"]).mean()
+        self.series = series[share.reindex(series.index).to_numpy() >= REGULAR_SHARE]
+
+        # Даты платежей найденных серий подряд (серия за серией, внутри — по возрастанию) для обрезки по дате
+        kept = intervals[intervals["group"].isin(self.series.index)]
+        groups = kept["group"].to_numpy()
+        self._dates = kept["date"].to_numpy(dtype="datetime64[ns]")
+        self._starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.empty(0, np.intp)
+        self.series = self.series.loc[groups[self._starts]]
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def as_of(self, date: DateLike = None) -> pd.DataFrame:
+        """
+        Серии на дату: учитываются только платежи по день `date` включительно.
+
+        :param date: Дата, на которую проверяется, продолжается ли серия (по умолчанию — последняя операция)
+        :return: DataFrame с колонками merchant, period, interval_days, amount, monthly_cost, occurrences,
+            last_date, next_date, active — по убыванию monthly_cost
+        """
+        as_of = pd.Timestamp(date) if date is not None else self.last_date
+        if len(self._dates):
+            paid = self._dates < np.datetime64((as_of.normalize() + pd.Timedelta(days=1)).as_unit("ns"))
+        else:
+            paid = np.empty(0, dtype=bool)
+        counts = np.add.reduceat(paid, self._starts) if len(self._starts) else np.empty(0, dtype=np.intp)
+        visible = counts >= self.min_occurrences
+        series = self.series[visible]
+        occurrences = counts[visible]
+        last_date = pd.Series(self._dates[(self._starts + counts - 1)[visible]], index=series.index)
+        period_days = series["period"].map(RECURRING_PERIODS)
+
+        # Серий немного, поэтому календарный сдвиг считается по одной дате
+        next_date = pd.Series([date + RECURRING_OFFSETS[period] for date, period in zip(last_date, series["period"])],
+                              index=series.index, dtype="datetime64[ns]")
+        amount = series["amount"] / 100
+        result = pd.DataFrame({
+            "merchant": series["merchant"],
+            "period": series["period"],
+            "interval_days": series["interval_days"].round(1),
+            "amount": amount.round(2),
+            "monthly_cost": (amount * DAYS_PER_MONTH / period_days).round(2),
+            "occurrences": occurrences,
+            "last_date": last_date,
+            "next_date": next_date,
+            # Серия продолжается, если следующий платёж просрочен не больше чем на половину периода
+            "active": as_of <= last_date + pd.to_timedelta(1.5 * period_days, unit="D"),
+        })
+        return result.sort_values("monthly_cost", ascending=False, kind="stable").reset_index(drop=True)
+
+
+@traced()
+def find_recurring_payments(
+        transactions: pd.DataFrame,
+        min_occurrences: int = 3,
+        amount_tolerance: float = 0.2,
+        interval_tolerance: float = 0.2,
+        as_of: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Находит регулярные платежи и подписки: одно и то же описание с похожей суммой через равные промежутки.
+
+    Для запросов на много дат по одной истории удобнее один раз построить `RecurringPayments`.
+
+    :param transactions: DataFrame с колонками ["Дата операции", "Сумма операции", "Описание"]
+    :param min_occurrences: Минимальное количество платежей в серии
+    :param amount_tolerance: Допустимое отклонение суммы от медианной суммы серии (доля)
+    :param interval_tolerance: Допустимое отклонение промежутка от периода (доля)
+    :param as_of: Дата, на которую проверяется, продолжается ли серия (по умолчанию — последняя операция)
+    :return: DataFrame с колонками merchant, period, interval_days, amount, monthly_cost, occurrences,
+        last_date, next_date, active — по убыванию monthly_cost
+    """
+    return RecurringPayments(transactions, min_occurrences, amount_tolerance, interval_tolerance).as_of(as_of)
+
+
+def calculate_expenses_by_category_chunked(chunks: Iterable[pd.DataFrame]) -> dict:
+    """
+    Считает расходы по категориям по частям таблицы (см. `iter_transactions`).
+
+    :param chunks: Итератор по частям DataFrame с колонками ["Категория", "Сумма операции"]
+    :return: Словарь с суммой расходов по каждой категории
+    """
+    totals: Dict[str, int] = {}
+    for chunk in chunks:
+        for category, kopecks in _expenses_kopecks(chunk).items():
+            totals[category] = totals.get(category, 0) + kopecks
+    return {category: to_rubles(abs(totals[category])) for category in sorted(totals)}
+
+
+def get_top_expenses_chunked(chunks: Iterable[pd.DataFrame], top_n: int = 5) -> pd.DataFrame:
+    """
+    Возвращает топ-N самых больших трат по частям таблицы (см. `iter_transactions`).
+
+    Из каждой части берутся только её N самых больших трат, общий топ хранится
+    в куче ограниченного размера, поэтому память не зависит от размера файла.
+
+    :param chunks: Итератор по частям DataFrame с транзакциями
+    :param top_n: Количество записей в топе (по умолчанию 5)
+    :return: DataFrame с топ-N тратами
+    """
+    # (размер траты, -порядковый номер, строка) — минимальная куча: в корне самая маленькая трата,
+    # а среди равных — самая поздняя, поэтому при равенстве на границе топа остаются ранние строки,
+    # как в `get_top_expenses`
+    heap: list = []
+    counter = 0
 
-    # Оставляем только расходы (отрицательные суммы) и сортируем по убыванию
-    expenses = transactions[transactions["Сумма операции"] < 0].copy()
-    top_expenses = expenses.sort_values(by="Сумма операции", ascending=True).head(top_n)
+    for chunk in chunks:
+        for record in get_top_expenses(chunk, top_n).to_dict(orient="records"):
+            item = (-record["Сумма операции"], -counter, record)
+            counter += 1
+            if len(heap) < top_n:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
 
-    return top_expenses[["Дата операции", "Сумма операции", "Категория", "Описание"]]
+    records = [record for _, _, record in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+    return pd.DataFrame(records, columns=TOP_COLUMNS)
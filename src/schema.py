@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from src.money import KOPECKS_COLUMN, to_kopecks
+from src.profiling import traced
+
+REQUIRED_COLUMNS = ["Дата операции", "Сумма операции"]
+DATE_COLUMNS = ["Дата операции", "Дата платежа"]
+AMOUNT_COLUMNS = [
+    "Сумма операции",
+    "Сумма платежа",
+    "Кэшбэк",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+]
+CATEGORICAL_COLUMNS = ["Категория", "Номер карты", "Статус", "Валюта операции", "Валюта платежа"]
+# Колонки, которые normalize_transactions вычисляет сам, и исходные колонки, из которых они считаются
+DERIVED_COLUMNS = {"last_digits": "Номер карты", KOPECKS_COLUMN: "Сумма операции"}
+# Колонки, которые нужны главной странице и отчётам
+ANALYTICS_COLUMNS = ["Дата операции", "Сумма операции", "Валюта операции", "Категория", "Описание", "Номер карты",
+                     "last_digits", KOPECKS_COLUMN]
+# Колонки топа расходов — одинаковые у всех реализаций (reports, parallel, store, batch)
+TOP_COLUMNS = ["Дата операции", "Сумма операции", "Категория", "Описание"]
+
+# Форматы дат в выгрузке банка: дата операции со временем, дата платежа без него
+DATE_FORMATS = ["%d.%m.%Y %H:%M:%S", "%d.%m.%Y"]
+
+
+@traced()
+def parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Преобразует колонку с датами в datetime64.
+
+    Сначала пробуются форматы выгрузки банка (ДД.ММ.ГГГГ), оставшиеся значения
+    разбираются автоматически (например, ISO-формат ГГГГ-ММ-ДД).
+
+    :param values: Колонка с датами (строки или уже datetime64)
+    :return: Колонка datetime64, нераспознанные значения — NaT
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+
+    result = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    pending = values.notna()
+    for date_format in DATE_FORMATS:
+        if not pending.any():
+            break
+        result[pending] = pd.to_datetime(values[pending], format=date_format, errors="coerce")
+        pending &= result.isna()
+
+    if pending.any():
+        result[pending] = pd.to_datetime(values[pending], errors="coerce", format="mixed")
+    return result
+
+
+def _last_digits(cards: pd.Series) -> pd.Categorical:
+    """
+    Последние четыре цифры карты. Считаются по уникальным номерам карт,
+    а не по каждой строке; у операций без карты — пустая строка.
+    """
+    digits = [str(card)[-4:] for card in cards.cat.categories] + [""]
+    categories, mapping = np.unique(digits, return_inverse=True)
+    # Код -1 (нет карты) попадает на последний элемент mapping, то есть на ""
+    codes = mapping[cards.cat.codes.to_numpy()]
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def is_typed(transactions: pd.DataFrame) -> bool:
+    """
+    Проверяет, что даты и суммы операций уже приведены к нужным типам.
+    """
+    return (
+        all(column in transactions.columns for column in REQUIRED_COLUMNS)
+        and pd.api.types.is_datetime64_any_dtype(transactions["Дата операции"].dtype)
+        and pd.api.types.is_numeric_dtype(transactions["Сумма операции"].dtype)
+    )
+
+
+def coerce_dates(transactions: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """
+    Приводит "Дата операции" к datetime64, если это ещё не сделано.
+
+    :param transactions: DataFrame с транзакциями (изменяется на месте)
+    :param kwargs: Параметры pd.to_datetime для строковых дат
+    :return: Тот же DataFrame
+    """
+    if not pd.api.types.is_datetime64_any_dtype(transactions["Дата операции"].dtype):
+        transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], errors="coerce", **kwargs)
+    return transactions
+
+
+def coerce_amounts(transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Приводит "Сумма операции" к числам, если это ещё не сделано.
+
+    :param transactions: DataFrame с транзакциями (изменяется на месте)
+    :return: Тот же DataFrame
+    """
+    if not pd.api.types.is_numeric_dtype(transactions["Сумма операции"].dtype):
+        transactions["Сумма операции"] = pd.to_numeric(transactions["Сумма операции"], errors="coerce")
+    return transactions
+
+
+@traced()
+def normalize_transactions(transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Приводит сырые транзакции (все колонки — строки) к типизированной схеме:
+    даты — datetime64, суммы — float64, категория и карта — category,
+    плюс колонки "last_digits" с последними четырьмя цифрами карты и "amount_kopecks"
+    с суммой операции в целых копейках (int64, пропуски — 0) для точных расчётов.
+
+    :param transactions: DataFrame, загруженный как строки
+    :return: Новый DataFrame с типизированными колонками
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in transactions.columns]
+    if missing:
+        raise ValueError(f"Отсутствуют необходимые колонки: {', '.join(missing)}")
+
+    df = transactions.copy()
+
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = parse_dates(df[column])
+
+    for column in AMOUNT_COLUMNS:
+        if column in df.columns and not pd.api.types.is_numeric_dtype(df[column].dtype):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+
+    df[KOPECKS_COLUMN] = to_kopecks(df["Сумма операции"])
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+
+    if "Номер карты" in df.columns:
+        df["last_digits"] = _last_digits(df["Номер карты"])
+
+    invalid_dates = df["Дата операции"].isna().sum()
+    if invalid_dates:
+        print(f"Не удалось распознать дату у {invalid_dates} транзакций")
+
+    return df
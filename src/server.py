@@ -0,0 +1,178 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.categorizer import categorize_transactions
+from src.currency import convert_transactions
+from src.file_readers import load_transactions
+from src.index import TransactionIndex
+from src.json_export import dumps
+from src.reports import RecurringPayments
+from src.utils import configure_market_cache, load_json
+from src.views import generate_main_page_json
+
+
+# Подпись файла до первой проверки (None — файла нет)
+_UNCHECKED = object()
+
+
+class DashboardState:
+    """
+    Данные, которые сервер держит в памяти между запросами: типизированная таблица
+    транзакций, индекс по датам и регулярные платежи, найденные по всей истории.
+    Файл перечитывается, только если у него изменились размер или время изменения.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        :param file_path: Путь к файлу с транзакциями (относительно корня проекта или абсолютный)
+        """
+        self.file_path = file_path
+        # Индекс и регулярные платежи подменяются одной парой, так что запросы в других потоках
+        # видят либо старые, либо новые данные целиком
+        self._data: Tuple[Optional[TransactionIndex], Optional[RecurringPayments]] = (None, None)
+        self.loaded_at: Optional[float] = None
+        self._signature: Any = _UNCHECKED
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> Optional[TransactionIndex]:
+        return self._data[0]
+
+    @property
+    def recurring(self) -> Optional[RecurringPayments]:
+        return self._data[1]
+
+    def _absolute_path(self) -> str:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(base_dir, self.file_path)
+
+    def _current_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._absolute_path())
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """
+        Перечитывает файл, если он изменился с момента последней загрузки.
+
+        Отсутствие файла и неудачная загрузка тоже запоминаются: повторная попытка
+        будет только после того, как файл появится или изменится.
+
+        :return: True, если данные были перезагружены
+        """
+        signature = self._current_signature()
+        if signature == self._signature:
+            return False
+
+        with self._lock:
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            if signature is None:
+                print(f"Ошибка: файл с транзакциями не найден: {self.file_path}")
+                return False
+            transactions = load_transactions(self.file_path, typed=True)
+            if transactions.empty:
+                print(f"Ошибка: не удалось загрузить транзакции из {self.file_path}")
+                return False
+            index = TransactionIndex(categorize_transactions(convert_transactions(transactions)))
+            # Регулярные платежи ищутся один раз на загруженные данные, а не на каждый запрос
+            recurring = RecurringPayments(index.frame) if "Описание" in index.frame.columns else None
+            self._data = index, recurring
+            self.loaded_at = time.time()
+            print(f"Загружено {len(self.index)} транзакций из {self.file_path}")
+            return True
+
+    def main_page(self, date_str: str, stocks: List[str]) -> Dict[str, Any]:
+        """
+        Ответ для главной страницы на указанную дату (как generate_main_page_json).
+        """
+        self.refresh()
+        index, recurring = self._data
+        if index is None:
+            return {"error": "Транзакции не загружены"}
+        return generate_main_page_json(index, date_str, stocks=stocks, recurring=recurring)
+
+
+def make_handler(state: DashboardState, default_stocks: List[str]):
+    """
+    Создаёт класс обработчика HTTP-запросов, привязанный к состоянию сервера.
+    """
+
+    class DashboardHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, data: Dict[str, Any]) -> None:
+            payload = dumps(data)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            if url.path == "/health":
+                self._send_json(200, {"status": "ok", "transactions": len(state.index or []),
+                                      "loaded_at": state.loaded_at})
+            elif url.path == "/main_page":
+                date_str = query.get("date", [""])[0]
+                stocks = query["stocks"][0].split(",") if "stocks" in query else default_stocks
+                data = state.main_page(date_str, stocks)
+                self._send_json(400 if "error" in data else 200, data)
+            else:
+                self._send_json(404, {"error": f"Неизвестный адрес: {url.path}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return DashboardHandler
+
+
+def create_server(file_path: str, host: str = "127.0.0.1", port: int = 8000,
+                  stocks: Optional[List[str]] = None) -> ThreadingHTTPServer:
+    """
+    Создаёт HTTP-сервер главной страницы с загруженными в память транзакциями.
+
+    :param file_path: Путь к файлу с транзакциями
+    :param host: Адрес для прослушивания
+    :param port: Порт (0 — выбрать свободный)
+    :param stocks: Акции по умолчанию (если не заданы — из user_settings.json)
+    :return: Сервер (запуск — serve_forever())
+    """
+    if stocks is None:
+        stocks = load_json("user_settings.json").get("user_stocks", ["AAPL", "TSLA", "GOOGL"])
+    state = DashboardState(file_path)
+    state.refresh()
+    server = ThreadingHTTPServer((host, port), make_handler(state, stocks))
+    server.state = state
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m src.server",
+        description="Сервер главной страницы: GET /main_page?date=YYYY-MM-DD"
+    )
+    parser.add_argument("--file", default=os.path.join("data", "operations.xlsx"), help="Файл с транзакциями")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(sys.argv[1:])
+
+    configure_market_cache()
+    dashboard_server = create_server(args.file, args.host, args.port)
+    print(f"Сервер запущен: http://{args.host}:{dashboard_server.server_address[1]}/main_page?date=YYYY-MM-DD")
+    try:
+        dashboard_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard_server.server_close()
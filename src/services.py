@@ -1,19 +1,29 @@
 import pandas as pd
 import json
-import numpy as np
+from typing import Dict, Iterable, List, Union
+from src.cube import MonthlyCube
+from src.money import amount_kopecks, apply_rate, rounding_remainder, to_rubles
+from src.profiling import traced
+from src.schema import coerce_amounts, coerce_dates
+from src.store import TransactionStore
 
-def calculate_cashback(transactions: pd.DataFrame, year: int, month: int, cashback_rate: float = 0.01) -> dict:
+@traced()
+def calculate_cashback(transactions: Union[pd.DataFrame, MonthlyCube, TransactionStore], year: int, month: int,
+                       cashback_rate: float = 0.01) -> dict:
     """
     Вычисляет кешбэк по категориям за указанный месяц.
 
-    :param transactions: DataFrame с транзакциями
+    :param transactions: DataFrame с транзакциями, готовый `MonthlyCube` или `TransactionStore`
     :param year: Год для анализа
     :param month: Месяц для анализа
     :param cashback_rate: Процент кешбэка (по умолчанию 1%)
     :return: Словарь с кешбэком по категориям
     """
-    transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], errors="coerce")
-    transactions["Сумма операции"] = pd.to_numeric(transactions["Сумма операции"], errors="coerce")
+    if isinstance(transactions, (MonthlyCube, TransactionStore)):
+        return transactions.cashback(year, month, cashback_rate)
+
+    coerce_dates(transactions)
+    coerce_amounts(transactions)
 
     # Фильтруем только расходы за нужный месяц
     filtered = transactions[
@@ -22,38 +32,107 @@ def calculate_cashback(transactions: pd.DataFrame, year: int, month: int, cashba
         (transactions["Сумма операции"] < 0)
     ]
 
-    # Группируем по категориям и считаем кешбэк
-    cashback = (filtered.groupby("Категория")["Сумма операции"]
-                .sum()
-                .abs() * cashback_rate).round(2)
+    # Суммируем траты по категориям в копейках и считаем кешбэк в целых числах
+    totals = _spend_by_category(filtered)
+    return {category: to_rubles(apply_rate(total, cashback_rate)) for category, total in totals.items()}
 
-    return cashback.to_dict()  # Возвращаем обычный словарь
 
+def _spend_by_category(expenses: pd.DataFrame) -> Dict[str, int]:
+    """
+    Сумма расходов по категориям в копейках (отрицательная), категории по алфавиту.
+    """
+    kopecks = pd.Series(amount_kopecks(expenses), index=expenses.index)
+    totals = kopecks.groupby(expenses["Категория"], observed=True).sum()
+    return {category: int(total) for category, total in totals.items()}
 
 
-def calculate_rounding_savings(transactions: pd.DataFrame, year: int, month: int, rounding_step: int = 50) -> float:
+@traced()
+def calculate_rounding_savings(transactions: Union[pd.DataFrame, MonthlyCube, TransactionStore], year: int,
+                               month: int, rounding_step: int = 50) -> float:
     """
     Рассчитывает сумму, которая могла бы быть отложена в "Инвесткопилку"
     через округление расходов.
 
-    :param transactions: DataFrame с транзакциями (должен содержать 'Дата операции' и 'Сумма операции').
+    :param transactions: DataFrame с транзакциями (должен содержать 'Дата операции' и 'Сумма операции')
+        или готовый `MonthlyCube` / `TransactionStore`.
     :param year: Год для анализа.
     :param month: Месяц для анализа.
     :param rounding_step: Шаг округления (10, 50, 100).
     :return: Сумма, которую удалось бы отложить (float).
     """
-    transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], errors="coerce")
-    transactions["Сумма операции"] = pd.to_numeric(transactions["Сумма операции"], errors="coerce")
+    if isinstance(transactions, (MonthlyCube, TransactionStore)):
+        return transactions.rounding_savings(year, month, rounding_step)
 
-    # Фильтруем только расходы за нужный месяц
-    filtered = transactions[
+    return to_rubles(_rounding_kopecks(_month_expenses(transactions, year, month), rounding_step))
+
+
+def _rounding_kopecks(expenses: pd.DataFrame, rounding_step: int) -> int:
+    """
+    Сумма остатков округления трат вверх до `rounding_step` в копейках.
+    """
+    return int(rounding_remainder(amount_kopecks(expenses), rounding_step).sum())
+
+
+def summarize_cards(transactions: pd.DataFrame, card_column: str = "last_digits",
+                    cashback_rate: float = 0.01) -> List[dict]:
+    """
+    Сумма операций и кешбэк по каждой карте (для блока карт главной страницы).
+
+    Суммы складываются в копейках, кешбэк считается от модуля суммы в целых числах.
+
+    :param transactions: DataFrame с транзакциями за период
+    :param card_column: Колонка с картой ("last_digits" или "Номер карты")
+    :param cashback_rate: Процент кешбэка (по умолчанию 1%)
+    :return: Список записей {card_column: карта, "Сумма операции": сумма, "cashback": кешбэк}
+    """
+    kopecks = pd.Series(amount_kopecks(transactions), index=transactions.index)
+    totals = kopecks.groupby(transactions[card_column], observed=True).sum()
+    return [
+        {card_column: card, "Сумма операции": to_rubles(total),
+         "cashback": to_rubles(apply_rate(total, cashback_rate))}
+        for card, total in totals.items()
+    ]
+
+
+def _month_expenses(transactions: pd.DataFrame, year: int, month: int) -> pd.DataFrame:
+    coerce_dates(transactions)
+    coerce_amounts(transactions)
+    return transactions[
         (transactions["Дата операции"].dt.year == year) &
         (transactions["Дата операции"].dt.month == month) &
         (transactions["Сумма операции"] < 0)
-    ].copy()
+    ]
+
+
+def calculate_cashback_chunked(chunks: Iterable[pd.DataFrame], year: int, month: int,
+                               cashback_rate: float = 0.01) -> dict:
+    """
+    Вычисляет кешбэк по категориям за месяц по частям таблицы (см. `iter_transactions`).
+    В памяти держится только одна часть и суммы по категориям.
+
+    :param chunks: Итератор по частям DataFrame с транзакциями
+    :param year: Год для анализа
+    :param month: Месяц для анализа
+    :param cashback_rate: Процент кешбэка (по умолчанию 1%)
+    :return: Словарь с кешбэком по категориям
+    """
+    totals: Dict[str, int] = {}
+    for chunk in chunks:
+        for category, kopecks in _spend_by_category(_month_expenses(chunk, year, month)).items():
+            totals[category] = totals.get(category, 0) + kopecks
+
+    return {category: to_rubles(apply_rate(totals[category], cashback_rate)) for category in sorted(totals)}
 
-    # Округляем вверх до ближайшего `rounding_step`
-    filtered["Округлённая сумма"] = np.ceil(filtered["Сумма операции"].abs() / rounding_step) * rounding_step
-    filtered["В копилку"] = (filtered["Округлённая сумма"] - filtered["Сумма операции"].abs()).astype(float)
 
-    return filtered["В копилку"].sum()
+def calculate_rounding_savings_chunked(chunks: Iterable[pd.DataFrame], year: int, month: int,
+                                       rounding_step: int = 50) -> float:
+    """
+    Рассчитывает сумму для "Инвесткопилки" по частям таблицы (см. `iter_transactions`).
+
+    :param chunks: Итератор по частям DataFrame с транзакциями
+    :param year: Год для анализа.
+    :param month: Месяц для анализа.
+    :param rounding_step: Шаг округления (10, 50, 100).
+    :return: Сумма, которую удалось бы отложить (float).
+    """
+    return to_rubles(sum(_rounding_kopecks(_month_expenses(chunk, year, month), rounding_step) for chunk in chunks))
@@ -0,0 +1,420 @@
+import argparse
+import os
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.index import DateLike
+from src.money import amount_kopecks, apply_rate, rounding_remainder, to_rubles
+from src.profiling import traced
+from src.schema import TOP_COLUMNS, is_typed, normalize_transactions
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE_URL = "sqlite:///data/database.db"
+ROUNDING_STEPS = (10, 50, 100)
+
+# Колонка выгрузки -> колонка таблицы transactions
+COLUMNS = {
+    "Дата операции": "operation_date",
+    "Дата платежа": "payment_date",
+    "Номер карты": "card",
+    "Статус": "status",
+    "Сумма операции": "amount",
+    "Валюта операции": "currency",
+    "Сумма платежа": "payment_amount",
+    "Валюта платежа": "payment_currency",
+    "Кэшбэк": "cashback",
+    "Категория": "category",
+    "MCC": "mcc",
+    "Описание": "description",
+    "Бонусы (включая кэшбэк)": "bonuses",
+    "Округление на инвесткопилку": "rounding",
+    "Сумма операции с округлением": "amount_rounded",
+}
+REAL_COLUMNS = {"amount", "payment_amount", "cashback", "bonuses", "rounding", "amount_rounded"}
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+PAYMENT_DATE_FORMAT = "%Y-%m-%d"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    fingerprint INTEGER NOT NULL UNIQUE,
+    month INTEGER NOT NULL,
+    amount_kopecks INTEGER,
+    {", ".join(f"{name} {'REAL' if name in REAL_COLUMNS else 'TEXT'}" for name in COLUMNS.values())}
+);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (operation_date);
+CREATE INDEX IF NOT EXISTS transactions_category ON transactions (category, operation_date);
+CREATE INDEX IF NOT EXISTS transactions_amount ON transactions (amount);
+CREATE TABLE IF NOT EXISTS monthly_aggregates (
+    month INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    card TEXT NOT NULL,
+    spend_kopecks INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    {", ".join(f"round_{step} INTEGER NOT NULL" for step in ROUNDING_STEPS)},
+    PRIMARY KEY (month, category, card)
+);
+"""
+
+# Вклад новых строк прибавляется к уже посчитанным суммам месяца
+AGGREGATE_COLUMNS = ["month", "category", "card", "spend_kopecks", "count",
+                     *[f"round_{step}" for step in ROUNDING_STEPS]]
+UPSERT_AGGREGATES = f"""
+INSERT INTO monthly_aggregates ({", ".join(AGGREGATE_COLUMNS)})
+VALUES ({", ".join("?" * len(AGGREGATE_COLUMNS))})
+ON CONFLICT (month, category, card) DO UPDATE SET
+    {", ".join(f"{column} = {column} + excluded.{column}" for column in AGGREGATE_COLUMNS[3:])}
+"""
+
+
+def database_path(url: Optional[str] = None) -> str:
+    """
+    Путь к файлу SQLite из DATABASE_URL (по умолчанию sqlite:///data/database.db).
+
+    Относительный путь считается от корня проекта; "sqlite://" и "sqlite:///:memory:" — база в памяти.
+
+    :param url: Адрес базы (None — из переменной окружения DATABASE_URL)
+    :return: Путь к файлу или ":memory:"
+    """
+    url = url or os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+    if not url.startswith("sqlite://"):
+        raise ValueError(f"Поддерживается только SQLite: {url}")
+    path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else ""
+    if not path or path == ":memory:":
+        return ":memory:"
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+def row_fingerprints(transactions: pd.DataFrame) -> np.ndarray:
+    """
+    Отпечаток каждой строки: хеш значений всех колонок выгрузки и номера повтора.
+
+    Одинаковые строки (например, две одинаковые покупки в одну секунду) получают
+    разные отпечатки по порядку появления, поэтому не склеиваются при загрузке,
+    а повторная загрузка той же выгрузки не создаёт дублей.
+
+    :param transactions: Типизированные транзакции
+    :return: Массив int64
+    """
+    columns = [column for column in COLUMNS if column in transactions.columns]
+    hashes = pd.util.hash_pandas_object(transactions[columns], index=False).to_numpy()
+    occurrence = pd.Series(hashes).groupby(hashes, sort=False).cumcount().to_numpy(dtype=np.uint64)
+    combined = pd.util.hash_array(hashes ^ (occurrence * np.uint64(0x9E3779B97F4A7C15)))
+    return combined.view(np.int64)
+
+
+def _month_keys(dates: pd.Series) -> np.ndarray:
+    return np.where(dates.isna(), -1, dates.dt.year * 12 + dates.dt.month - 1).astype(np.int64)
+
+
+def _aggregate(delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Вклад новых строк в monthly_aggregates: расходы по (месяц, категория, карта) в копейках.
+    """
+    expenses = delta[delta["Сумма операции"] < 0]
+    kopecks = amount_kopecks(expenses)
+    columns = {
+        "month": _month_keys(expenses["Дата операции"]),
+        "category": expenses["Категория"].astype(object).fillna("").to_numpy() if "Категория" in expenses else "",
+        "card": expenses["Номер карты"].astype(object).fillna("").to_numpy() if "Номер карты" in expenses else "",
+        "spend_kopecks": kopecks,
+        "count": 1,
+    }
+    for step in ROUNDING_STEPS:
+        columns[f"round_{step}"] = rounding_remainder(kopecks, step)
+    aggregates = pd.DataFrame(columns).groupby(["month", "category", "card"], sort=False).sum().reset_index()
+    return aggregates[AGGREGATE_COLUMNS]
+
+
+class TransactionStore:
+    """
+    Хранилище транзакций в SQLite с догрузкой только новых строк.
+
+    Каждая строка выгрузки получает отпечаток (`row_fingerprints`); при очередной
+    загрузке выгрузки в базу попадают только строки с новыми отпечатками, а
+    помесячные суммы расходов (monthly_aggregates) увеличиваются на вклад этих строк.
+    Кешбэк, "Инвесткопилка" и расходы по категориям читаются из агрегатов;
+    фильтры, топ расходов и суммы за период выполняются запросами SQL по индексам
+    (дата, категория, сумма), и в Python попадают только строки результата.
+    """
+
+    def __init__(self, url: Optional[str] = None):
+        """
+        :param url: Адрес базы вида sqlite:///data/database.db (None — из DATABASE_URL)
+        """
+        self.path = database_path(url)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "TransactionStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def latest_date(self) -> Optional[pd.Timestamp]:
+        """
+        Дата последней операции в базе (None, если база пуста).
+        """
+        value = self.connection.execute("SELECT MAX(operation_date) FROM transactions").fetchone()[0]
+        return None if value is None else pd.Timestamp(value)
+
+    def _known_fingerprints(self, since: Optional[pd.Timestamp] = None) -> np.ndarray:
+        if since is None:
+            rows = self.connection.execute("SELECT fingerprint FROM transactions")
+        else:
+            rows = self.connection.execute("SELECT fingerprint FROM transactions WHERE operation_date >= ?",
+                                           (since.strftime(DATE_FORMAT),))
+        return np.fromiter((row[0] for row in rows), dtype=np.int64)
+
+    @traced()
+    def ingest(self, transactions: pd.DataFrame, since_latest: bool = False) -> int:
+        """
+        Добавляет в базу только новые транзакции и обновляет помесячные агрегаты.
+
+        :param transactions: Транзакции из выгрузки (строковые или типизированные)
+        :param since_latest: Рассматривать только операции не раньше последней даты в базе
+            (быстрее, если банк не добавляет операции задним числом)
+        :return: Количество добавленных строк
+        """
+        if not is_typed(transactions):
+            transactions = normalize_transactions(transactions)
+
+        since = self.latest_date() if since_latest else None
+        if since is not None:
+            transactions = transactions[transactions["Дата операции"] >= since]
+
+        fingerprints = row_fingerprints(transactions)
+        new = ~np.isin(fingerprints, self._known_fingerprints(since))
+        delta = transactions[new]
+        if delta.empty:
+            return 0
+
+        rows = self._rows(delta, fingerprints[new])
+        aggregates = _aggregate(delta)
+        with self.connection:
+            names = list(rows.columns)
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO transactions ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                rows.itertuples(index=False, name=None)
+            )
+            self.connection.executemany(UPSERT_AGGREGATES,
+                                        aggregates.astype(object).itertuples(index=False, name=None))
+        return len(delta)
+
+    @staticmethod
+    def _rows(delta: pd.DataFrame, fingerprints: np.ndarray) -> pd.DataFrame:
+        """
+        Строки для вставки в transactions: значения в типах SQLite, пропуски — None.
+        """
+        data = {
+            "fingerprint": fingerprints,
+            "month": _month_keys(delta["Дата операции"]),
+            "amount_kopecks": amount_kopecks(delta),
+        }
+        for column, name in COLUMNS.items():
+            if column not in delta.columns:
+                continue
+            values = delta[column]
+            if column == "Дата операции":
+                values = values.dt.strftime(DATE_FORMAT)
+            elif column == "Дата платежа" and pd.api.types.is_datetime64_any_dtype(values.dtype):
+                values = values.dt.strftime(PAYMENT_DATE_FORMAT)
+            data[name] = values.astype(object).to_numpy()
+        rows = pd.DataFrame(data).astype(object)
+        return rows.where(rows.notna(), None)
+
+    def _frame(self, sql: str, params: Tuple = ()) -> pd.DataFrame:
+        """
+        Результат запроса к transactions в виде типизированной таблицы, как у load_transactions(typed=True).
+        """
+        frame = pd.read_sql_query(sql, self.connection, params=params)
+        frame = frame.rename(columns={name: column for column, name in COLUMNS.items()})
+        frame["Дата операции"] = pd.to_datetime(frame["Дата операции"], format=DATE_FORMAT)
+        if "Дата платежа" in frame.columns:
+            frame["Дата платежа"] = pd.to_datetime(frame["Дата платежа"], format=PAYMENT_DATE_FORMAT)
+        frame["Сумма операции"] = frame["Сумма операции"].astype("float64")
+        return normalize_transactions(frame)
+
+    @staticmethod
+    def _where(start_date: DateLike = None, end_date: DateLike = None, category: Optional[str] = None,
+               card: Optional[str] = None, min_amount: Optional[float] = None,
+               max_amount: Optional[float] = None) -> Tuple[List[str], List]:
+        """
+        Условия WHERE и их параметры для фильтров как в `filter_transactions`.
+        """
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append("operation_date >= ?")
+            params.append(pd.Timestamp(start_date).strftime(DATE_FORMAT))
+        if end_date is not None:
+            conditions.append("operation_date <= ?")
+            params.append(pd.Timestamp(end_date).strftime(DATE_FORMAT))
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if card is not None:
+            conditions.append("(card = ? OR substr(card, -4) = ?)")
+            params.extend([card, card])
+        if min_amount is not None:
+            conditions.append("amount >= ?")
+            params.append(float(min_amount))
+        if max_amount is not None:
+            conditions.append("amount <= ?")
+            params.append(float(max_amount))
+        return conditions, params
+
+    @traced()
+    def query(self, start_date: DateLike = None, end_date: DateLike = None, category: Optional[str] = None,
+              card: Optional[str] = None, min_amount: Optional[float] = None,
+              max_amount: Optional[float] = None) -> pd.DataFrame:
+        """
+        Транзакции за период (границы включительно) с фильтром по категории, карте и сумме.
+
+        Фильтры выполняются в SQLite, в Python попадают только подходящие строки —
+        в порядке выгрузки, как у `filter_transactions` для таблицы.
+
+        :param card: Номер карты целиком ("*7197") или последние четыре цифры ("7197")
+        """
+        conditions, params = self._where(start_date, end_date, category, card, min_amount, max_amount)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = ", ".join(COLUMNS.values())
+        return self._frame(f"SELECT {columns} FROM transactions {where} ORDER BY id", tuple(params))
+
+    @traced()
+    def top_expenses(self, top_n: int = 5, start_date: DateLike = None, end_date: DateLike = None,
+                     category: Optional[str] = None, card: Optional[str] = None) -> pd.DataFrame:
+        """
+        Топ-N самых больших трат, как в `get_top_expenses`: при равных суммах
+        первой идёт более ранняя строка выгрузки.
+        """
+        conditions, params = self._where(start_date, end_date, category, card)
+        conditions.append("amount < 0")
+        names = [COLUMNS[column] for column in TOP_COLUMNS]
+        sql = f"""
+            SELECT {", ".join(names)} FROM transactions
+            WHERE {" AND ".join(conditions)} ORDER BY amount, id LIMIT ?
+        """
+        return self._frame(sql, (*params, top_n))[TOP_COLUMNS]
+
+    def category_expenses(self, start_date: DateLike = None, end_date: DateLike = None,
+                          card: Optional[str] = None) -> dict:
+        """
+        Расходы по категориям за произвольный период, как `calculate_expenses_by_category`
+        для отфильтрованной таблицы. Суммы считаются в копейках.
+        """
+        conditions, params = self._where(start_date, end_date, card=card)
+        conditions += ["amount < 0", "category IS NOT NULL"]
+        sql = f"""
+            SELECT category, SUM(amount_kopecks) FROM transactions
+            WHERE {" AND ".join(conditions)} GROUP BY category ORDER BY category
+        """
+        return {category: to_rubles(abs(kopecks)) for category, kopecks in self.connection.execute(sql, params)}
+
+    def card_totals(self, start_date: DateLike = None, end_date: DateLike = None) -> dict:
+        """
+        Сумма операций по последним четырём цифрам карты (как сводка по картам в main).
+        Операции без карты попадают под пустую строку.
+        """
+        conditions, params = self._where(start_date, end_date)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"""
+            SELECT COALESCE(substr(card, -4), '') AS last_digits, SUM(amount_kopecks) FROM transactions
+            {where} GROUP BY last_digits ORDER BY last_digits
+        """
+        return {digits: to_rubles(kopecks) for digits, kopecks in self.connection.execute(sql, params)}
+
+    def months(self) -> List[Tuple[int, int]]:
+        """
+        Месяцы, по которым в базе есть расходы, в виде пар (год, месяц).
+        """
+        rows = self.connection.execute("SELECT DISTINCT month FROM monthly_aggregates WHERE month >= 0 ORDER BY 1")
+        return [(key // 12, key % 12 + 1) for key, in rows]
+
+    def _spend_by_category(self, year: Optional[int] = None, month: Optional[int] = None) -> Dict[str, int]:
+        sql = "SELECT category, SUM(spend_kopecks) FROM monthly_aggregates WHERE category != ''"
+        params: Tuple = ()
+        if year is not None and month is not None:
+            sql += " AND month = ?"
+            params = (year * 12 + month - 1,)
+        return dict(self.connection.execute(sql + " GROUP BY category ORDER BY category", params).fetchall())
+
+    def cashback(self, year: int, month: int, cashback_rate: float = 0.01) -> dict:
+        """
+        Кешбэк по категориям за месяц, как в `calculate_cashback`.
+        """
+        return {category: to_rubles(apply_rate(kopecks, cashback_rate))
+                for category, kopecks in self._spend_by_category(year, month).items()}
+
+    def expenses_by_category(self, year: Optional[int] = None, month: Optional[int] = None) -> dict:
+        """
+        Расходы по категориям за месяц или за всё время, как в `calculate_expenses_by_category`.
+        """
+        spend = self._spend_by_category(year, month)
+        return {category: to_rubles(abs(kopecks)) for category, kopecks in spend.items()}
+
+    def rounding_savings(self, year: int, month: int, rounding_step: int = 50) -> float:
+        """
+        Сумма для "Инвесткопилки" за месяц, как в `calculate_rounding_savings`.
+
+        Для шагов 10/50/100 берётся из агрегатов, для остальных считается по строкам месяца.
+        """
+        key = year * 12 + month - 1
+        if rounding_step in ROUNDING_STEPS:
+            sql = f"SELECT SUM(round_{rounding_step}) FROM monthly_aggregates WHERE month = ?"
+            params: Tuple = (key,)
+        else:
+            # В SQLite остаток от деления отрицательного числа отрицательный, поэтому (x % s + s) % s
+            sql = "SELECT SUM((amount_kopecks % ? + ?) % ?) FROM transactions WHERE month = ? AND amount_kopecks < 0"
+            step = rounding_step * 100
+            params = (step, step, step, key)
+        total = self.connection.execute(sql, params).fetchone()[0]
+        return to_rubles(total or 0)
+
+
+def sync_store(file_path: str = os.path.join("data", "operations.xlsx"), url: Optional[str] = None,
+               since_latest: bool = False) -> int:
+    """
+    Загружает выгрузку из Excel и добавляет в базу только новые транзакции.
+
+    :return: Количество добавленных строк
+    """
+    from src.file_readers import load_transactions
+
+    transactions = load_transactions(file_path, typed=True)
+    if transactions.empty:
+        print(f"Ошибка: не удалось загрузить транзакции из {file_path}")
+        return 0
+    with TransactionStore(url) as store:
+        added = store.ingest(transactions, since_latest=since_latest)
+        print(f"Добавлено {added} новых транзакций, всего в базе {len(store)}")
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m src.store",
+        description="Добавляет новые транзакции из выгрузки в базу (DATABASE_URL)."
+    )
+    parser.add_argument("--file", default=os.path.join("data", "operations.xlsx"), help="Файл с транзакциями")
+    parser.add_argument("--url", help="Адрес базы (по умолчанию DATABASE_URL)")
+    parser.add_argument("--since-latest", action="store_true",
+                        help="Рассматривать только операции не раньше последней даты в базе")
+    args = parser.parse_args(sys.argv[1:])
+    sync_store(args.file, args.url, args.since_latest)
@@ -0,0 +1,168 @@
+import gzip
+import io
+import itertools
+import os
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Sequence, TextIO, Union
+
+import pandas as pd
+
+from src.json_export import DATE_FORMAT, atomic_write
+
+try:
+    import zstandard
+except ImportError:  # zstandard не обязателен: без него доступно только сжатие gzip
+    zstandard = None
+
+CHUNK_SIZE = 50_000
+# Строк на листе Excel, включая заголовок
+EXCEL_MAX_ROWS = 1_048_576
+COMPRESSIONS = ("gzip", "zstd")
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+DICT_COLUMNS = ("Категория", "Сумма")
+
+TableData = Union[Dict[str, Any], pd.DataFrame, Iterable[pd.DataFrame], Iterable[dict]]
+
+
+def iter_frames(data: TableData, chunk_size: int = CHUNK_SIZE,
+                dict_columns: Sequence[str] = DICT_COLUMNS) -> Iterator[pd.DataFrame]:
+    """
+    Приводит данные для выгрузки к последовательности таблиц ограниченного размера.
+
+    :param data: Словарь {ключ: значение} (две колонки `dict_columns`), DataFrame,
+        итератор по DataFrame (например, `iter_transactions`) или итератор по записям-словарям
+    :param chunk_size: Количество строк в одной таблице (для DataFrame и записей)
+    :param dict_columns: Названия колонок для словаря
+    :return: Итератор по DataFrame; у пустой таблицы — один пустой DataFrame с колонками
+    """
+    if isinstance(data, dict):
+        yield pd.DataFrame(list(data.items()), columns=list(dict_columns))
+        return
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+        return
+
+    items = iter(data)
+    first = next(items, None)
+    if first is None:
+        return
+    if isinstance(first, pd.DataFrame):
+        yield first
+        yield from items
+        return
+
+    records = itertools.chain([first], items)
+    while True:
+        batch = list(itertools.islice(records, chunk_size))
+        if not batch:
+            return
+        yield pd.DataFrame.from_records(batch)
+
+
+def resolve_compression(path: str, compression: Optional[str] = None) -> Optional[str]:
+    """
+    Сжатие файла: явно указанное или по расширению (.gz — gzip, .zst — zstd).
+
+    :raises ValueError: Неизвестный вид сжатия
+    :raises ImportError: Для zstd не установлен пакет zstandard
+    """
+    if compression is None:
+        compression = COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower())
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Неизвестное сжатие: {compression}. Допустимо: {', '.join(COMPRESSIONS)}")
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("Для сжатия zstd установите пакет zstandard")
+    return compression
+
+
+@contextmanager
+def _text_writer(raw: BinaryIO, compression: Optional[str]) -> Iterator[TextIO]:
+    if compression == "gzip":
+        stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    elif compression == "zstd":
+        stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    else:
+        stream = raw
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    yield text
+    text.flush()
+    text.detach()
+    if stream is not raw:
+        stream.close()
+
+
+def write_csv(data: TableData, path: str, compression: Optional[str] = None, chunk_size: int = CHUNK_SIZE,
+              dict_columns: Sequence[str] = DICT_COLUMNS) -> int:
+    """
+    Записывает данные в CSV (UTF-8) по блокам, при необходимости со сжатием.
+
+    В памяти держится один блок строк, файл заменяется атомарно (см. `atomic_write`).
+
+    :param data: Данные для выгрузки (см. `iter_frames`)
+    :param path: Путь к файлу
+    :param compression: None, "gzip" или "zstd" (по умолчанию — по расширению файла)
+    :param chunk_size: Количество строк в блоке
+    :param dict_columns: Названия колонок для словаря
+    :return: Количество записанных строк (без заголовка)
+    """
+    compression = resolve_compression(path, compression)
+    rows = 0
+    with atomic_write(path) as raw, _text_writer(raw, compression) as text:
+        for position, frame in enumerate(iter_frames(data, chunk_size, dict_columns)):
+            frame.to_csv(text, header=position == 0, index=False, date_format=DATE_FORMAT)
+            rows += len(frame)
+    return rows
+
+
+def _rows(frame: pd.DataFrame) -> Iterator[tuple]:
+    """
+    Строки таблицы в виде кортежей обычных значений Python; пропуски — пустые ячейки.
+    """
+    values = frame.astype(object)
+    return values.where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+def write_excel(data: TableData, path: str, sheet_name: str = "Sheet1", chunk_size: int = CHUNK_SIZE,
+                dict_columns: Sequence[str] = DICT_COLUMNS) -> int:
+    """
+    Записывает данные в Excel в потоковом режиме openpyxl (write_only).
+
+    Строки сразу уходят во временный файл листа, поэтому память не зависит от
+    количества строк. Если строки не помещаются на лист Excel, создаются листы
+    `<sheet_name>_2`, `<sheet_name>_3` и т. д. с тем же заголовком.
+
+    :param data: Данные для выгрузки (см. `iter_frames`)
+    :param path: Путь к файлу
+    :param sheet_name: Название первого листа
+    :param chunk_size: Количество строк в блоке
+    :param dict_columns: Названия колонок для словаря
+    :return: Количество записанных строк (без заголовка)
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, header, rows = None, 0, [], 0
+
+    def new_sheet():
+        name = sheet_name if not workbook.worksheets else f"{sheet_name}_{len(workbook.worksheets) + 1}"
+        created = workbook.create_sheet(name)
+        created.append(header)
+        return created
+
+    for frame in iter_frames(data, chunk_size, dict_columns):
+        if sheet is None:
+            header = [str(column) for column in frame.columns]
+            sheet, sheet_rows = new_sheet(), 1
+        for row in _rows(frame):
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                sheet, sheet_rows = new_sheet(), 1
+            sheet.append(row)
+            sheet_rows += 1
+        rows += len(frame)
+
+    if sheet is None:
+        new_sheet()
+    with atomic_write(path) as file:
+        workbook.save(file)
+    return rows
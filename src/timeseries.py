@@ -0,0 +1,135 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.index import DateLike
+from src.money import amount_kopecks
+from src.schema import coerce_amounts, coerce_dates
+
+# Частоты агрегации: день, неделя (с понедельника), месяц
+FREQUENCIES = {"D": "D", "W": "W-SUN", "M": "M"}
+WINDOWS = (7, 30, 90)
+TOTAL = "Всего"
+
+
+class SpendSeries:
+    """
+    Расходы по дням (группа × день), собранные за один проход по транзакциям.
+
+    Из таблицы строится матрица накопленных сумм по дням (в целых копейках), поэтому
+    сумма за любой период — это разность двух её столбцов: суммы по неделям и месяцам,
+    скользящие окна, расходы с начала месяца и сравнение с прошлым годом считаются
+    векторно, без повторных просмотров транзакций. Значения — расходы в рублях (положительные).
+    """
+
+    def __init__(self, transactions: pd.DataFrame, by: Optional[str] = None):
+        """
+        :param transactions: DataFrame с транзакциями
+        :param by: Колонка для группировки (например, "Категория" или "Номер карты"); None — общие расходы
+        """
+        coerce_dates(transactions)
+        coerce_amounts(transactions)
+        self.by = by
+
+        expenses = transactions[(transactions["Сумма операции"] < 0) & transactions["Дата операции"].notna()]
+        if by is None:
+            codes, groups = np.zeros(len(expenses), dtype=np.intp), [TOTAL]
+        else:
+            codes, uniques = pd.factorize(expenses[by].astype(object), sort=True)
+            groups = list(uniques)
+        days = expenses["Дата операции"].dt.normalize()
+        valid = codes >= 0
+        codes, days, spend = codes[valid], days[valid], -amount_kopecks(expenses)[valid]
+
+        self.groups: List = groups if len(days) else []
+        self.start = days.min() if len(days) else None
+        offsets = (days - self.start).dt.days.to_numpy() if len(days) else np.empty(0, dtype=np.intp)
+        n_days = int(offsets.max()) + 1 if len(offsets) else 0
+        self.days = pd.date_range(self.start, periods=n_days, freq="D") if n_days else pd.DatetimeIndex([])
+
+        # Один проход: bincount раскладывает копейки по ячейкам (группа, день), суммы копеек целые
+        daily = np.bincount(codes * n_days + offsets, weights=spend, minlength=len(self.groups) * n_days)
+        self._cumulative = np.zeros((len(self.groups), n_days + 1), dtype=np.int64)
+        np.cumsum(np.rint(daily).astype(np.int64).reshape(len(self.groups), n_days), axis=1,
+                  out=self._cumulative[:, 1:])
+
+    def _sums(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Суммы в копейках за дни [starts, ends) для каждой группы: матрица группа × период.
+        """
+        return self._cumulative[:, ends] - self._cumulative[:, starts]
+
+    def _frame(self, kopecks: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        return pd.DataFrame(kopecks.T / 100, index=index, columns=pd.Index(self.groups, name=self.by))
+
+    def _offset(self, date: DateLike) -> int:
+        """
+        Номер дня в матрице, ограниченный её границами.
+        """
+        return int(np.clip((pd.Timestamp(date).normalize() - self.start).days, -1, len(self.days) - 1))
+
+    def resample(self, freq: str = "D") -> pd.DataFrame:
+        """
+        Расходы по дням, неделям или месяцам.
+
+        :param freq: "D" — день, "W" — неделя (с понедельника), "M" — месяц
+        :return: DataFrame: индекс — первый день периода, колонки — группы
+        """
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Неизвестная частота: {freq}. Допустимо: {', '.join(FREQUENCIES)}")
+        if not len(self.days):
+            return self._frame(np.zeros((0, 0), dtype=np.int64), pd.DatetimeIndex([]))
+
+        periods = self.days.to_period(FREQUENCIES[freq])
+        starts = np.flatnonzero(np.concatenate([[True], periods[1:] != periods[:-1]]))
+        ends = np.append(starts[1:], len(self.days))
+        return self._frame(self._sums(starts, ends), periods[starts].start_time)
+
+    def rolling(self, window: int, mean: bool = False) -> pd.DataFrame:
+        """
+        Скользящая сумма (или среднее в день) расходов за последние `window` дней, включая текущий.
+
+        :param window: Длина окна в днях
+        :param mean: Вернуть среднее в день вместо суммы
+        :return: DataFrame: индекс — день, колонки — группы
+        """
+        if window <= 0:
+            raise ValueError("Длина окна должна быть положительной")
+        ends = np.arange(1, len(self.days) + 1)
+        frame = self._frame(self._sums(np.maximum(ends - window, 0), ends), self.days)
+        return frame / window if mean else frame
+
+    def run_rate(self, as_of: DateLike) -> pd.DataFrame:
+        """
+        Расходы с начала месяца по дату и прогноз на весь месяц при том же темпе.
+
+        :param as_of: Дата, на которую считается прогноз
+        :return: DataFrame: индекс — группы, колонки month_to_date и projected
+        """
+        as_of = pd.Timestamp(as_of)
+        month_start = as_of.normalize().replace(day=1)
+        if not len(self.days):
+            kopecks = np.zeros(len(self.groups), dtype=np.int64)
+        else:
+            start, end = self._offset(month_start - pd.Timedelta(days=1)) + 1, self._offset(as_of) + 1
+            kopecks = self._sums(np.array([start]), np.array([max(start, end)]))[:, 0]
+        # Прогноз в целых копейках с округлением половины вверх, как в `src.money`
+        projected = (2 * kopecks * as_of.days_in_month + as_of.day) // (2 * as_of.day)
+        return pd.DataFrame({"month_to_date": kopecks / 100, "projected": projected / 100},
+                            index=pd.Index(self.groups, name=self.by))
+
+    def year_over_year(self, relative: bool = False) -> pd.DataFrame:
+        """
+        Изменение расходов за месяц по сравнению с тем же месяцем прошлого года.
+
+        :param relative: Вернуть изменение в долях (0.1 — рост на 10%) вместо рублей
+        :return: DataFrame: индекс — первый день месяца, колонки — группы; NaN, если года назад данных нет
+        """
+        monthly = self.resample("M")
+        # Месяцы в матрице идут подряд, поэтому тот же месяц прошлого года — на 12 строк выше
+        previous = monthly.shift(12)
+        delta = (monthly - previous).round(2)
+        if relative:
+            return (delta / previous.where(previous != 0)).round(4)
+        return delta
@@ -0,0 +1,63 @@
+from typing import Dict
+
+import numpy as np
+
+
+def _prepare(values: np.ndarray, largest: bool) -> np.ndarray:
+    values = np.asarray(values, dtype="float64")
+    return -values if largest else values
+
+
+def top_n_positions(values: np.ndarray, n: int, largest: bool = False) -> np.ndarray:
+    """
+    Позиции N наименьших (или наибольших) значений по порядку.
+
+    При равных значениях первой идёт меньшая позиция — как при устойчивой сортировке
+    (`sort_values(kind="stable")`, `nlargest(keep="first")`), пропуски не учитываются.
+    Вместо полной сортировки порог N-го значения находится через `np.argpartition`
+    за линейное время, сортируются только строки не хуже порога.
+
+    :param values: Массив значений
+    :param n: Количество позиций
+    :param largest: Выбирать наибольшие значения вместо наименьших
+    :return: Массив позиций (не длиннее n)
+    """
+    values = _prepare(values, largest)
+    missing = np.isnan(values)
+    candidates = np.flatnonzero(~missing) if missing.any() else np.arange(len(values))
+    if n <= 0 or not len(candidates):
+        return np.empty(0, dtype=np.intp)
+
+    if n < len(candidates):
+        keys = values[candidates]
+        threshold = keys[np.argpartition(keys, n - 1)[n - 1]]
+        # Все строки не хуже N-го значения, включая равные ему, — чтобы сохранить порядок при равенстве
+        candidates = candidates[keys <= threshold]
+
+    order = np.lexsort((candidates, values[candidates]))
+    return candidates[order[:n]]
+
+
+def top_n_by_group(values: np.ndarray, codes: np.ndarray, n: int, largest: bool = False) -> Dict[int, np.ndarray]:
+    """
+    Позиции N наименьших (или наибольших) значений в каждой группе — одной сортировкой на все группы.
+
+    Порядок внутри группы такой же, как у `top_n_positions`.
+
+    :param values: Массив значений
+    :param codes: Номер группы каждой строки (-1 — строка не учитывается)
+    :param n: Количество позиций в группе
+    :param largest: Выбирать наибольшие значения вместо наименьших
+    :return: Словарь {номер группы: массив позиций}
+    """
+    values = _prepare(values, largest)
+    codes = np.asarray(codes)
+    valid = np.flatnonzero((codes >= 0) & ~np.isnan(values))
+    if n <= 0 or not len(valid):
+        return {}
+
+    order = valid[np.lexsort((valid, values[valid], codes[valid]))]
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_codes[1:] != sorted_codes[:-1]]))
+    ends = np.concatenate([starts[1:], [len(order)]])
+    return {int(sorted_codes[start]): order[start:min(end, start + n)] for start, end in zip(starts, ends)}
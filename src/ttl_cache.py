@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Кеш с временем жизни записей, вытеснением по LRU и хранением на диске (JSON).
+
+    Запись считается свежей `ttl` секунд. Устаревшая запись ещё `stale_ttl` секунд
+    отдаётся сразу, а обновляется в фоне (stale-while-revalidate). Если API
+    недоступен или вернул ошибку, возвращается последнее удачное значение.
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            ttl: float = 3600,
+            stale_ttl: float = 24 * 3600,
+            max_entries: int = 256,
+            clock: Callable[[], float] = time.time
+    ):
+        """
+        :param path: Путь к JSON-файлу для хранения кеша (None — только в памяти)
+        :param ttl: Сколько секунд запись считается свежей
+        :param stale_ttl: Сколько секунд после ttl устаревшая запись отдаётся с фоновым обновлением
+        :param max_entries: Максимальное количество записей (старые по LRU вытесняются)
+        :param clock: Источник текущего времени (для тестов)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._refreshing: Dict[str, threading.Thread] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Не удалось прочитать кеш {self.path}: {e}")
+            return
+        for key, entry in sorted(entries.items(), key=lambda item: item[1].get("time", 0)):
+            if isinstance(entry, dict) and "value" in entry and "time" in entry:
+                self._entries[key] = entry
+        self._evict()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self._entries, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Не удалось сохранить кеш {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Значение записи независимо от её возраста.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def age(self, key: str) -> Optional[float]:
+        """
+        Возраст записи в секундах (None, если записи нет).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else self._clock() - entry["time"]
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Сохраняет значение и записывает кеш на диск.
+        """
+        with self._lock:
+            self._entries[key] = {"value": value, "time": self._clock()}
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def _fetch(self, key: str, fetch: Callable[[], Any], is_valid: Callable[[Any], bool]) -> Tuple[Any, bool]:
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"Ошибка обновления кеша {key}: {e}")
+            return None, False
+        if not is_valid(value):
+            return value, False
+        self.set(key, value)
+        return value, True
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Any], is_valid: Callable[[Any], bool]) -> None:
+        def refresh():
+            try:
+                self._fetch(key, fetch, is_valid)
+            finally:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+
+        with self._lock:
+            if key in self._refreshing:
+                return
+            thread = threading.Thread(target=refresh, name=f"refresh-{key}", daemon=True)
+            self._refreshing[key] = thread
+        thread.start()
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any],
+                     is_valid: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        """
+        Возвращает значение из кеша или запрашивает его через `fetch`.
+
+        :param key: Ключ записи
+        :param fetch: Функция, которая получает свежее значение (например, запрос к API)
+        :param is_valid: Проверка ответа; неудачные ответы в кеш не попадают
+        :return: Значение
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = self._clock() - entry["time"]
+                if age < self.ttl:
+                    return entry["value"]
+                if age < self.ttl + self.stale_ttl:
+                    self._refresh_in_background(key, fetch, is_valid)
+                    return entry["value"]
+
+        value, ok = self._fetch(key, fetch, is_valid)
+        if not ok and entry is not None:
+            print(f"Используем последнее сохранённое значение {key}")
+            return entry["value"]
+        return value
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждёт завершения фоновых обновлений, чтобы они успели сохраниться до выхода процесса.
+
+        :param timeout: Сколько секунд ждать все обновления вместе (None — без ограничения)
+        :return: True, если все обновления завершились
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            threads: List[threading.Thread] = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        with self._lock:
+            return not self._refreshing
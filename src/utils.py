@@ -1,14 +1,35 @@
 import json
 import logging
 import os
+import threading
+import time
 import requests
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
-from typing import TextIO
+from requests.adapters import HTTPAdapter
+from typing import List, Optional, TextIO
+from src.ttl_cache import TTLCache
+from src.profiling import span, traced
 
 # Загружаем переменные окружения из файла .env
 load_dotenv()
 
+CURRENCY_API_URL = os.getenv("CURRENCY_API_URL", "https://api.exchangerate-api.com/v4/latest/USD")
+STOCK_API_URL = os.getenv("STOCK_API_URL", "https://www.alphavantage.co/query")
+REQUEST_TIMEOUT = 10  # Таймаут одного запроса к API, секунды
+MAX_WORKERS = 4  # Сколько запросов к API выполняется одновременно
+
+# Кеш рыночных данных: курсы и котировки меняются несколько раз в день
+MARKET_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+                                 "market_cache.json")
+MARKET_CACHE_TTL = float(os.getenv("MARKET_CACHE_TTL", 3600))
+MARKET_CACHE_STALE_TTL = float(os.getenv("MARKET_CACHE_STALE_TTL", 24 * 3600))
+
+_session = None
+_session_lock = threading.Lock()
+_market_cache = None
+
 def load_json(filename: str):
     """
     Загружает JSON-файл и возвращает данные.
@@ -59,22 +80,87 @@ def request_stocks():
     return [stock.strip() for stock in stocks.split(",")]
 
 
-def get_currency_rates(currency_list=None):
+def get_session() -> requests.Session:
+    """
+    Возвращает общий requests.Session с пулом соединений (keep-alive).
+    Сессия создаётся один раз и переиспользуется всеми запросами к API.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def configure_market_cache(path=MARKET_CACHE_PATH, ttl=MARKET_CACHE_TTL, stale_ttl=MARKET_CACHE_STALE_TTL,
+                           max_entries=256):
+    """
+    Включает кеш курсов валют и цен акций (с хранением в JSON-файле).
+    После этого get_currency_rates и get_stock_prices сначала смотрят в кеш.
+
+    :param path: Путь к файлу кеша (None — только в памяти, False — выключить кеш)
+    :param ttl: Сколько секунд данные считаются свежими
+    :param stale_ttl: Сколько секунд после ttl устаревшие данные отдаются с фоновым обновлением
+    :param max_entries: Максимальное количество записей в кеше
+    :return: Объект кеша или None, если кеш выключен
+    """
+    global _market_cache
+    _market_cache = None if path is False else TTLCache(path, ttl, stale_ttl, max_entries)
+    return _market_cache
+
+
+def get_market_cache():
+    """
+    Возвращает текущий кеш рыночных данных (None, если он не включён).
+    """
+    return _market_cache
+
+
+def wait_for_market_cache(timeout=REQUEST_TIMEOUT):
+    """
+    Ждёт фоновые обновления кеша рыночных данных. Вызывается в конце запуска из командной
+    строки: потоки обновления фоновые и иначе обрываются вместе с процессом, не сохранив ответ.
+
+    :param timeout: Сколько секунд ждать все обновления вместе
+    """
+    if _market_cache is not None and not _market_cache.join(timeout):
+        print("Фоновое обновление кеша рыночных данных не завершилось, используем старые значения")
+
+
+def _cached(key, fetch, is_valid):
+    if _market_cache is None:
+        return fetch()
+    return _market_cache.get_or_fetch(key, fetch, is_valid)
+
+
+def _fetch_rates_table(api_url, timeout):
+    with span("HTTP GET", url=api_url) as info:
+        response = get_session().get(api_url, timeout=timeout)
+        info["status"] = response.status_code
+    return response.json().get("rates")
+
+
+@traced()
+def get_currency_rates(currency_list=None, api_url=None, timeout=REQUEST_TIMEOUT):
     """ Получение курсов валют через API """
     if currency_list is None:
         currency_list = ["USD", "EUR", "RUB"]  # Валюты по умолчанию
     print(f"Запрашиваем курсы валют для: {currency_list}")
 
-    api_url = "https://api.exchangerate-api.com/v4/latest/USD"  # API для валют
+    api_url = api_url or CURRENCY_API_URL  # API для валют
     rates = {}
 
     try:
-        response = requests.get(api_url, timeout=10)
-        data = response.json()
+        table = _cached(f"rates:{api_url}", lambda: _fetch_rates_table(api_url, timeout),
+                        is_valid=lambda value: isinstance(value, dict) and bool(value))
 
-        if "rates" in data:
+        if table:
             for currency in currency_list:
-                rates[currency] = data["rates"].get(currency, "N/A")  # Если нет валюты, ставим "N/A"
+                rates[currency] = table.get(currency, "N/A")  # Если нет валюты, ставим "N/A"
         else:
             print("Ошибка: Нет данных о курсах валют")
             rates = {cur: "N/A" for cur in currency_list}
@@ -86,35 +172,125 @@ def get_currency_rates(currency_list=None):
     return rates
 
 
-def get_stock_prices(stocks):
+def _retry_after(response, default: float) -> float:
+    try:
+        return float(response.headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _fetch_stock_price(stock, api_key, base_url, timeout, retries, retry_delay):
     """
-    Получает текущие цены акций из Alpha Vantage API.
+    Запрашивает цену закрытия одной акции. При превышении лимита запросов
+    (HTTP 429 или сообщение "Note"/"Information" от Alpha Vantage) ждёт и повторяет запрос.
     """
-    api_key = os.getenv("ALPHA_VANTAGE_KEY", "55S27TWDBK01EW51")  # API-ключ
-    base_url = "https://www.alphavantage.co/query"
-    stock_data = {}
-
-    for stock in stocks:
-        params = {
-            "function": "TIME_SERIES_DAILY",
-            "symbol": stock,
-            "apikey": api_key
-        }
+    params = {
+        "function": "TIME_SERIES_DAILY",
+        "symbol": stock,
+        "apikey": api_key
+    }
+    for attempt in range(retries + 1):
+        delay = retry_delay * 2 ** attempt
         try:
-            response = requests.get(base_url, params=params)
+            with span("HTTP GET", url=base_url, symbol=stock, attempt=attempt) as info:
+                response = get_session().get(base_url, params=params, timeout=timeout)
+                info["status"] = response.status_code
+            if response.status_code == 429:
+                if attempt < retries:
+                    time.sleep(_retry_after(response, delay))
+                continue
             response.raise_for_status()
             data = response.json()
 
             if "Time Series (Daily)" in data:
                 last_date = sorted(data["Time Series (Daily)"].keys())[-1]
-                stock_data[stock] = float(data["Time Series (Daily)"][last_date]["4. close"])
-            else:
-                stock_data[stock] = "Ошибка при запросе"
+                return float(data["Time Series (Daily)"][last_date]["4. close"])
+            if ("Note" in data or "Information" in data) and attempt < retries:
+                time.sleep(delay)
+                continue
+            return "Ошибка при запросе"
         except requests.RequestException as e:
-            stock_data[stock] = "Ошибка при запросе"
             print(f"Ошибка запроса к API для {stock}: {e}")
+            return "Ошибка при запросе"
 
-    return stock_data
+    print(f"Превышен лимит запросов к API для {stock}")
+    return "Ошибка при запросе"
+
+
+@traced()
+def get_stock_prices(stocks, max_workers=MAX_WORKERS, base_url=None, timeout=REQUEST_TIMEOUT, retries=2,
+                     retry_delay=1.0):
+    """
+    Получает текущие цены акций из Alpha Vantage API.
+
+    Акции запрашиваются параллельно (не больше `max_workers` запросов одновременно)
+    через общую сессию с пулом соединений; у каждого запроса есть таймаут.
+    Если включён кеш (см. configure_market_cache), свежие цены берутся из него.
+    """
+    api_key = os.getenv("ALPHA_VANTAGE_KEY", "55S27TWDBK01EW51")  # API-ключ
+    base_url = base_url or STOCK_API_URL
+    stocks = list(stocks)
+    if not stocks:
+        return {}
+
+    def fetch(stock):
+        return _cached(
+            f"stock:{stock}",
+            lambda: _fetch_stock_price(stock, api_key, base_url, timeout, retries, retry_delay),
+            is_valid=lambda value: isinstance(value, float)
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(stocks)))) as executor:
+        return dict(zip(stocks, executor.map(fetch, stocks)))
+
+
+def fetch_market_data(stocks, currency_list=None):
+    """
+    Запрашивает курсы валют и цены акций одновременно.
+
+    :param stocks: Список акций
+    :param currency_list: Список валют (по умолчанию как в get_currency_rates)
+    :return: Пара (курсы валют, цены акций)
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rates_future = executor.submit(get_currency_rates, currency_list)
+        stocks_future = executor.submit(get_stock_prices, stocks)
+        return rates_future.result(), stocks_future.result()
+
+
+def fetch_market_data_timed(stock_symbols: List[str]):
+    """
+    `fetch_market_data` внутри этапа "Запросы к API" (для печати времени этапов).
+    """
+    with span("Запросы к API", stocks=len(stock_symbols)):
+        return fetch_market_data(stock_symbols)
+
+
+def collect_market_data(market_future: Optional[Future], stock_symbols: List[str]):
+    """
+    Дожидается рыночных данных (или запрашивает их, если конвейер выключен)
+    и подставляет значения по умолчанию при ошибках.
+    """
+    try:
+        if market_future is not None:
+            currency_rates, stock_prices = market_future.result()
+        else:
+            currency_rates, stock_prices = fetch_market_data_timed(stock_symbols)
+    except Exception as e:
+        print(f"Ошибка получения рыночных данных: {e}")
+        currency_rates, stock_prices = None, None
+
+    if not isinstance(currency_rates, dict):
+        print("Ошибка получения курсов валют: некорректный формат данных")
+        currency_rates = {"USD": 1, "EUR": 0.96842}
+
+    if isinstance(stock_prices, dict):
+        print(f"Ответ API: {stock_prices}")
+    else:
+        print("Ошибка получения цен на акции: некорректный формат данных")
+        stock_prices = {symbol: "Ошибка при запросе" for symbol in stock_symbols}
+
+    return currency_rates, stock_prices
 
 
 def get_greeting():
@@ -132,12 +308,14 @@ def get_greeting():
         return "Доброй ночи"
 
 
-def setup_logging():
+def setup_logging(filename="app.log", level=logging.INFO):
     """
     Настроивает логирование для проекта.
+
+    Замеры этапов (src.profiling) пишутся в этот же лог строками JSON на уровне INFO.
     """
     logging.basicConfig(
-        filename="app.log",
-        level=logging.INFO,
+        filename=filename,
+        level=level,
         format="%(asctime)s - %(levelname)s - %(message)s"
     )
@@ -1,18 +1,33 @@
 import os
-import json
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence, Union
+from src.index import TransactionIndex
+from src.json_export import write_json
+from src.profiling import traced
+from src.currency import convert_transactions
+from src.reports import TOP_COLUMNS, RecurringPayments, get_top_expenses_by
+from src.schema import coerce_amounts, coerce_dates
+from src.services import summarize_cards
+from src.table_export import TableData, write_csv, write_excel
+from src.timeseries import WINDOWS, SpendSeries
+from src.topn import top_n_positions
 from src.utils import get_currency_rates, get_stock_prices, get_greeting
 
 
-def generate_main_page_json(transactions: pd.DataFrame, date_str: str, stocks: List[str] = None) -> Dict[str, Any]:
+@traced()
+def generate_main_page_json(transactions: Union[pd.DataFrame, TransactionIndex], date_str: str,
+                            stocks: List[str] = None,
+                            recurring: Optional[RecurringPayments] = None) -> Dict[str, Any]:
     """
     Генерирует JSON-ответ для главной страницы.
 
-    :param transactions: DataFrame с транзакциями.
+    :param transactions: DataFrame с транзакциями или построенный по ним `TransactionIndex`.
     :param date_str: Строка с датой в формате 'YYYY-MM-DD'.
     :param stocks: Список акций для отслеживания
+    :param recurring: Регулярные платежи, найденные один раз по всей истории (в рублях);
+        если заданы, в ответ добавляется "recurring_payments" на дату
     :return: Словарь с JSON-ответом.
     """
     if stocks is None:
@@ -25,36 +40,32 @@ def generate_main_page_json(transactions: pd.DataFrame, date_str: str, stocks: L
 
     start_date = current_date.replace(day=1)
 
-    transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], format="%Y-%m-%d", errors="coerce")
+    if isinstance(transactions, TransactionIndex):
+        filtered_transactions = transactions.query(start_date, current_date)
+    else:
+        coerce_dates(transactions, format="%Y-%m-%d")
+        coerce_amounts(transactions)
 
-    filtered_transactions = transactions[
-        (transactions["Дата операции"] >= start_date) & (transactions["Дата операции"] <= current_date)
-    ]
+        filtered_transactions = transactions[
+            (transactions["Дата операции"] >= start_date) & (transactions["Дата операции"] <= current_date)
+        ]
 
-    cards_summary = (
-        filtered_transactions.groupby("Номер карты")["Сумма операции"]
-        .sum()
-        .reset_index()
-    )
-    cards_summary["cashback"] = (cards_summary["Сумма операции"].abs() * 0.01).round(2)
+    cards_info = summarize_cards(filtered_transactions, card_column="Номер карты")
 
-    cards_info = cards_summary.to_dict(orient="records")
+    top_positions = top_n_positions(filtered_transactions["Сумма операции"].to_numpy(dtype="float64"), 5,
+                                    largest=True)
+    top_transactions = filtered_transactions.iloc[top_positions][TOP_COLUMNS].to_dict(orient="records")
 
-    filtered_transactions["Сумма операции"] = pd.to_numeric(filtered_transactions["Сумма операции"], errors="coerce")
-    top_transactions = (
-        filtered_transactions.nlargest(5, "Сумма операции")
-        [["Дата операции", "Сумма операции", "Категория", "Описание"]]
-        .to_dict(orient="records")
-    )
+    # Курсы валют и цены акций запрашиваем одновременно
+    print(f"Запрашиваем цены акций для: {stocks}")  # Отладочный вывод
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rates_future = executor.submit(get_currency_rates)
+        stocks_future = executor.submit(get_stock_prices, stocks=stocks)
+        currency_rates = rates_future.result()
+        stock_prices = stocks_future.result()
 
-    # Получаем курсы валют
-    currency_rates = get_currency_rates()
     if currency_rates is None:
         currency_rates = {}
-
-    # Получаем цены акций
-    print(f"Запрашиваем цены акций для: {stocks}")  # Отладочный вывод
-    stock_prices = get_stock_prices(stocks=stocks)
     if stock_prices is None:
         stock_prices = {}
 
@@ -63,34 +74,183 @@ def generate_main_page_json(transactions: pd.DataFrame, date_str: str, stocks: L
         "cards": cards_info,
         "top_transactions": top_transactions,
         "currency_rates": [{"currency": k, "rate": v} for k, v in currency_rates.items()],
-        "stock_prices": [{"stock": k, "price": v} for k, v in stock_prices.items()]
+        "stock_prices": [{"stock": k, "price": v} for k, v in stock_prices.items()],
     }
+    if recurring is not None:
+        response["recurring_payments"] = recurring_payments_json(recurring, current_date)
 
     return response
 
 
-def save_to_json(data: Dict[str, Any], filename: str, folder: str = "export") -> None:
+@traced()
+def generate_top_expenses_json(transactions: pd.DataFrame, by: Sequence[str] = ("Номер карты", "Категория", "month"),
+                               top_n: int = 5) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Формирует JSON с топ-N тратами внутри каждой карты, категории и месяца (см. `get_top_expenses_by`).
+
+    :param transactions: DataFrame с транзакциями
+    :param by: Группировки: колонки таблицы и/или "month"
+    :param top_n: Количество записей в топе каждой группы
+    :return: Словарь {группировка: {значение группы: список трат}}
+    """
+    tops = get_top_expenses_by(transactions, by=by, top_n=top_n)
+    return {
+        grouping: {str(key): frame.to_dict(orient="records") for key, frame in groups.items()}
+        for grouping, groups in tops.items()
+    }
+
+
+def recurring_payments_json(transactions: Union[pd.DataFrame, RecurringPayments], as_of: Optional[datetime] = None,
+                            active_only: bool = True) -> List[Dict[str, Any]]:
+    """
+    Регулярные платежи и подписки для JSON (см. `src.reports.RecurringPayments`).
+
+    :param transactions: DataFrame с историей транзакций (суммы в одной валюте) или готовый `RecurringPayments`
+    :param as_of: Дата, на которую серия должна продолжаться (по умолчанию — последняя операция)
+    :param active_only: Только продолжающиеся серии
+    :return: Список записей merchant, period, amount, monthly_cost, next_date и др.; даты — 'YYYY-MM-DD'
+    """
+    if isinstance(transactions, pd.DataFrame):
+        if transactions.empty or "Описание" not in transactions.columns:
+            return []
+        transactions = RecurringPayments(transactions)
+    recurring = transactions.as_of(as_of)
+    if active_only:
+        recurring = recurring[recurring["active"]]
+    recurring = recurring.assign(last_date=recurring["last_date"].dt.strftime("%Y-%m-%d"),
+                                 next_date=recurring["next_date"].dt.strftime("%Y-%m-%d"))
+    return recurring.to_dict(orient="records")
+
+
+@traced()
+def generate_recurring_payments_json(transactions: pd.DataFrame, date_str: str,
+                                     active_only: bool = False) -> Dict[str, Any]:
+    """
+    Формирует JSON с регулярными платежами по истории до указанной даты.
+
+    Суммы в иностранной валюте сначала пересчитываются в рубли (см. `src.currency.convert_transactions`),
+    поэтому стоимость в месяц складывается в одной валюте.
+
+    :param transactions: DataFrame с транзакциями
+    :param date_str: Строка с датой в формате 'YYYY-MM-DD'
+    :param active_only: Только продолжающиеся серии (по умолчанию — все найденные)
+    :return: Словарь с регулярными платежами и суммой в месяц по продолжающимся сериям
+    """
+    try:
+        current_date = datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return {"error": "Неверный формат даты. Используйте YYYY-MM-DD."}
+
+    coerce_dates(transactions, format="%Y-%m-%d")
+    history = convert_transactions(transactions[transactions["Дата операции"] < current_date + pd.Timedelta(days=1)])
+    payments = recurring_payments_json(history, current_date, active_only=active_only)
+    monthly_total = sum(payment["monthly_cost"] for payment in payments if payment["active"])
+    return {"recurring_payments": payments, "monthly_total": round(monthly_total, 2)}
+
+
+def _series_json(frame: pd.DataFrame, since: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Ряды в колоночном виде для графиков: общий список дат и значения каждой группы (пропуск — null).
+    """
+    if since is not None:
+        frame = frame[frame.index >= since]
+    values = frame.astype(object).where(frame.notna(), None)
+    return {
+        "dates": frame.index.strftime("%Y-%m-%d").tolist(),
+        "values": {str(group): column.tolist() for group, column in values.items()},
+    }
+
+
+@traced()
+def generate_trends_json(transactions: pd.DataFrame, date_str: str,
+                         groupings: Sequence[Optional[str]] = (None, "Категория", "Номер карты"),
+                         freqs: Sequence[str] = ("D", "W", "M"), windows: Sequence[int] = WINDOWS,
+                         since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Формирует JSON с рядами расходов для графиков трендов по указанную дату.
+
+    Для каждой группировки транзакции просматриваются один раз (см. `src.timeseries.SpendSeries`),
+    все ряды считаются из накопленных сумм.
+
+    :param transactions: DataFrame с транзакциями
+    :param date_str: Строка с датой в формате 'YYYY-MM-DD' — последний день рядов
+    :param groupings: Колонки для группировки; None — общие расходы (ключ "total")
+    :param freqs: Частоты рядов расходов: "D", "W", "M"
+    :param windows: Длины скользящих окон в днях (среднее в день)
+    :param since: Первая дата рядов 'YYYY-MM-DD' (окна и сравнение с прошлым годом учитывают и более ранние данные)
+    :return: Словарь {группировка: {"spend", "rolling_mean", "run_rate", "year_over_year"}}
+    """
+    try:
+        current_date = datetime.strptime(date_str, "%Y-%m-%d")
+        first_date = datetime.strptime(since, "%Y-%m-%d") if since else None
+    except ValueError:
+        return {"error": "Неверный формат даты. Используйте YYYY-MM-DD."}
+
+    coerce_dates(transactions, format="%Y-%m-%d")
+    transactions = transactions[transactions["Дата операции"] < current_date + pd.Timedelta(days=1)]
+
+    response = {}
+    for by in groupings:
+        series = SpendSeries(transactions, by=by)
+        run_rate = series.run_rate(current_date)
+        response[by or "total"] = {
+            "spend": {freq: _series_json(series.resample(freq), first_date) for freq in freqs},
+            "rolling_mean": {str(window): _series_json(series.rolling(window, mean=True).round(2), first_date)
+                             for window in windows},
+            "run_rate": {str(group): row for group, row in run_rate.to_dict(orient="index").items()},
+            "year_over_year": _series_json(series.year_over_year(), first_date),
+        }
+    return response
+
+
+@traced()
+def save_to_json(data: Union[Dict[str, Any], pd.DataFrame], filename: str, folder: str = "export",
+                 pretty: bool = False) -> None:
+    """
+    Сохраняет данные в JSON за один проход (см. `src.json_export`).
+
+    Таблицы внутри данных (например, полный список транзакций) пишутся блоками,
+    файл заменяется атомарно.
+
+    :param data: Словарь или DataFrame; даты записываются как 'YYYY-MM-DD HH:MM:SS'
+    :param filename: Имя файла
+    :param folder: Папка для сохранения
+    :param pretty: Записать с отступами
+    """
     os.makedirs(folder, exist_ok=True)
     file_path = os.path.join(folder, filename)
 
-    with open(file_path, "w", encoding="utf-8") as file:
-        # noinspection PyTypeChecker
-        json.dump(data, file, ensure_ascii=False, indent=4)
+    write_json(data, file_path, pretty=pretty)
 
 
-def save_to_excel(data: Dict[str, Any], filename: str, folder: str = "export") -> None:
+@traced()
+def save_to_excel(data: TableData, filename: str, folder: str = "export") -> None:
+    """
+    Сохраняет данные в Excel потоково (см. `src.table_export.write_excel`).
+
+    :param data: Словарь {категория: сумма}, DataFrame, итератор по DataFrame или по записям
+    :param filename: Имя файла
+    :param folder: Папка для сохранения
+    """
     os.makedirs(folder, exist_ok=True)
     file_path = os.path.join(folder, filename)
 
-    df = pd.DataFrame(list(data.items()), columns=["Категория", "Сумма"])
-    df.to_excel(file_path, index=False)
+    write_excel(data, file_path)
     print(f"Данные сохранены в {file_path}")
 
 
-def save_to_csv(data: Dict[str, Any], filename: str, folder: str = "export") -> None:
+@traced()
+def save_to_csv(data: TableData, filename: str, folder: str = "export", compression: Optional[str] = None) -> None:
+    """
+    Сохраняет данные в CSV по блокам (см. `src.table_export.write_csv`).
+
+    :param data: Словарь {категория: сумма}, DataFrame, итератор по DataFrame или по записям
+    :param filename: Имя файла (.csv.gz и .csv.zst сжимаются автоматически)
+    :param folder: Папка для сохранения
+    :param compression: None, "gzip" или "zstd" (по умолчанию — по расширению файла)
+    """
     os.makedirs(folder, exist_ok=True)
     file_path = os.path.join(folder, filename)
 
-    df = pd.DataFrame(list(data.items()), columns=["Категория", "Сумма"])
-    df.to_csv(file_path, index=False, encoding="utf-8")
+    write_csv(data, file_path, compression=compression)
     print(f"Данные сохранены в {file_path}")
@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from benchmarks.synthetic import generate_transactions
+from src.batch import _PrefixSums, build_snapshots, parse_snapshot_dates, run_batch
+from src.index import TransactionIndex
+from src.reports import RecurringPayments, get_top_expenses
+from src.schema import normalize_transactions
+from src.services import calculate_cashback, calculate_rounding_savings, summarize_cards
+from src.views import recurring_payments_json
+
+
+@pytest.fixture
+def transactions():
+    return normalize_transactions(generate_transactions(3000, start="2021-01-01", end="2021-04-30"))
+
+
+def test_parse_snapshot_dates():
+    """Даты задаются списком и диапазоном"""
+    dates = parse_snapshot_dates("2021-03-30..2021-04-01,2021-01-15 12:00:00")
+
+    assert dates == [datetime(2021, 1, 15, 12), datetime(2021, 3, 30), datetime(2021, 3, 31), datetime(2021, 4, 1)]
+    with pytest.raises(ValueError):
+        parse_snapshot_dates("")
+
+
+def test_snapshots_match_single_date_calculation(transactions):
+    """Снимки совпадают с расчётом main на каждую дату"""
+    index = TransactionIndex(transactions)
+    dates = parse_snapshot_dates("2021-01-01..2021-04-30") + [datetime(2021, 2, 14, 15, 30)]
+    snapshots = build_snapshots(index, dates, {"USD": 90.0}, {"AAPL": 150.0})
+
+    for date in dates[::9]:
+        window = index.query(date.replace(day=1), date).copy()
+        snapshot = snapshots[date]
+        cards = window.groupby("last_digits", observed=True)["Сумма операции"].sum()
+
+        if cards.empty:
+            assert snapshot["cards"] == "Нет данных"
+        else:
+            assert [card["last_digits"] for card in snapshot["cards"]] == list(cards.index)
+            assert [card["Сумма операции"] for card in snapshot["cards"]] == pytest.approx(list(cards))
+        assert snapshot["cashback"] == calculate_cashback(window, date.year, date.month)
+        assert snapshot["investment_savings"] == calculate_rounding_savings(window, date.year, date.month)
+        top = get_top_expenses(window).to_dict(orient="records")
+        assert snapshot["top_transactions"] == (top if top else "Нет транзакций")
+        assert snapshot["stock_prices"] == [{"stock": "AAPL", "price": 150.0}]
+
+
+def test_window_sums_are_exact_kopecks():
+    """Копейки в окнах суммируются целыми числами, без потерь float64"""
+    sums = _PrefixSums(np.array([[0, 3]]), 3)
+    kopecks = np.array([2 ** 53, 1, 1], dtype=np.int64)
+    totals = sums.window_sums(np.zeros(3, dtype=np.intp), 1, kopecks)
+
+    assert totals.dtype == np.int64
+    assert int(totals[0, 0]) == 2 ** 53 + 2
+
+
+def test_snapshots_use_cashback_rate(transactions):
+    """Ставка кешбэка применяется и к категориям, и к картам"""
+    index = TransactionIndex(transactions)
+    date = datetime(2021, 3, 31)
+    snapshot = build_snapshots(index, [date], {}, {}, cashback_rate=0.05)[date]
+    window = index.query(date.replace(day=1), date)
+
+    assert snapshot["cards"] == summarize_cards(window, cashback_rate=0.05)
+    assert snapshot["cashback"] == calculate_cashback(window, date.year, date.month, cashback_rate=0.05)
+
+
+def test_snapshots_recurring_payments():
+    """Регулярные платежи ищутся один раз и на каждую дату совпадают с поиском по истории до даты"""
+    raw = generate_transactions(3000, start="2021-01-01", end="2021-06-30")
+    subscription = raw.iloc[:6].copy()
+    subscription["Дата операции"] = [f"05.{month:02d}.2021 10:00:00" for month in range(1, 7)]
+    subscription["Сумма операции"] = -299
+    subscription["Описание"] = "Кинопоиск"
+    index = TransactionIndex(normalize_transactions(pd.concat([raw, subscription], ignore_index=True)))
+    dates = [datetime(2021, 2, 20), datetime(2021, 4, 20), datetime(2021, 6, 30)]
+
+    snapshots = build_snapshots(index, dates, {}, {}, recurring=RecurringPayments(index.frame))
+
+    assert snapshots[dates[0]]["recurring_payments"] == "Нет регулярных платежей"
+    for date in dates[1:]:
+        assert snapshots[date]["recurring_payments"] == recurring_payments_json(index.query(None, date), date)
+    assert snapshots[dates[-1]]["recurring_payments"][0]["occurrences"] == 6
+    assert "recurring_payments" not in build_snapshots(index, dates, {}, {})[dates[0]]
+
+
+@patch("src.batch.configure_market_cache")
+def test_run_batch_loads_once_and_fetches_once(mock_cache, transactions, tmp_path):
+    """Каждый файл загружается один раз, рыночные данные запрашиваются один раз"""
+    settings = {"a.json": {"user_stocks": ["AAPL"]}, "b.json": {"user_stocks": ["TSLA", "AAPL"]}}
+
+    with patch("src.batch.load_transactions", return_value=transactions) as mock_load, \
+         patch("src.batch.load_json", side_effect=settings.get), \
+         patch("src.utils.fetch_market_data", return_value=({"USD": 90.0}, {"AAPL": 1.0, "TSLA": 2.0})) as mock_fetch:
+        saved = run_batch(parse_snapshot_dates("2021-03-01..2021-03-03"), files=["ops.xlsx"],
+                          settings_files=list(settings), folder=str(tmp_path))
+
+    assert mock_load.call_count == 1
+    mock_fetch.assert_called_once_with(["AAPL", "TSLA"])
+    assert len(saved) == 6
+    data = json.loads((tmp_path / "ops_b" / "main_page_2021-03-02.json").read_text(encoding="utf-8"))
+    assert data["stock_prices"] == [{"stock": "TSLA", "price": 2.0}, {"stock": "AAPL", "price": 1.0}]
+    assert isinstance(pd.Timestamp(data["top_transactions"][0]["Дата операции"]), pd.Timestamp)
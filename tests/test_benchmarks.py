@@ -0,0 +1,34 @@
+import pandas as pd
+from benchmarks.run import compare, parse_size
+from benchmarks.synthetic import COLUMNS, generate_transactions
+from src.schema import normalize_transactions
+
+
+def test_generate_transactions_is_deterministic():
+    """Одинаковое зерно даёт одинаковые данные в схеме operations.xlsx"""
+    first = generate_transactions(500, seed=1)
+    second = generate_transactions(500, seed=1)
+
+    assert list(first.columns) == COLUMNS
+    assert len(first) == 500
+    pd.testing.assert_frame_equal(first, second)
+    assert not first.equals(generate_transactions(500, seed=2))
+
+
+def test_generated_transactions_normalize():
+    """Сгенерированные строки разбираются так же, как выгрузка банка"""
+    typed = normalize_transactions(generate_transactions(1000))
+
+    assert typed["Дата операции"].notna().all()
+    assert typed["Сумма операции"].dtype == "float64"
+    assert (typed["Сумма операции"] < 0).any()
+
+
+def test_compare_reports_regressions():
+    """Сравнение с эталоном находит замедление и изменившийся результат"""
+    baseline = {"results": {"10k": {"op": {"seconds": 0.1, "peak_mb": 10, "result": 5.0}}}}
+
+    assert parse_size("10k") == 10_000 and parse_size("1M") == 1_000_000
+    assert compare({"10k": {"op": {"seconds": 0.11, "peak_mb": 10, "result": 5.0}}}, baseline, 0.5, 0.005) == []
+    problems = compare({"10k": {"op": {"seconds": 0.3, "peak_mb": 10, "result": 6.0}}}, baseline, 0.5, 0.005)
+    assert len(problems) == 2
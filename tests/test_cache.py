@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.cache import LazyFrame, cache_dir_for, is_fresh, load_cached, load_frame, save_frame
+
+
+@pytest.fixture
+def sample_frame():
+    """Таблица со всеми поддерживаемыми типами колонок"""
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-01 10:00:00", "2024-01-02 12:30:00", None]),
+        "Сумма операции": [-100.5, 200.0, np.nan],
+        "Категория": pd.Categorical(["Супермаркеты", "ЖКХ", "Супермаркеты"]),
+        "Описание": ["Магнит", np.nan, "Колхоз"],  # пропуски в тексте читаются из Excel как NaN
+    })
+
+
+def test_save_and_load_frame(tmp_path, sample_frame):
+    """Кеш возвращает ту же таблицу с теми же типами"""
+    cache_dir = str(tmp_path / "cache")
+    save_frame(sample_frame, cache_dir, {"source": "test"})
+
+    loaded = load_frame(cache_dir)
+
+    pd.testing.assert_frame_equal(loaded, sample_frame)
+
+
+def test_load_cached_rebuilds_on_change(tmp_path):
+    """Кеш используется повторно и перестраивается при изменении файла"""
+    source = tmp_path / "operations.csv"
+    source.write_text("a\n1\n", encoding="utf-8")
+    calls = []
+
+    def builder(path):
+        calls.append(path)
+        return pd.read_csv(path, dtype=str)
+
+    first = load_cached(str(source), builder)
+    second = load_cached(str(source), builder)
+    assert len(calls) == 1
+    assert second["a"].tolist() == first["a"].tolist() == ["1"]
+
+    source.write_text("a\n1\n2\n", encoding="utf-8")
+    third = load_cached(str(source), builder)
+    assert len(calls) == 2
+    assert third["a"].tolist() == ["1", "2"]
+
+
+def test_is_fresh_checks_content_hash(tmp_path):
+    """Изменение только времени файла не сбрасывает кеш"""
+    source = tmp_path / "operations.csv"
+    source.write_text("a\n1\n", encoding="utf-8")
+    load_cached(str(source), lambda path: pd.read_csv(path, dtype=str))
+
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert is_fresh(str(source), cache_dir_for(str(source)))
+
+    source.write_text("a\n7\n", encoding="utf-8")
+    assert not is_fresh(str(source), cache_dir_for(str(source)))
+
+
+def test_load_frame_projection(tmp_path, sample_frame):
+    """Из кеша читаются только запрошенные колонки и строки"""
+    cache_dir = str(tmp_path / "cache")
+    save_frame(sample_frame, cache_dir, {"source": "test"})
+
+    loaded = load_frame(cache_dir, columns=["Описание", "Сумма операции"], rows=[0, 2])
+
+    expected = sample_frame.loc[[0, 2], ["Описание", "Сумма операции"]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(loaded, expected)
+    with pytest.raises(ValueError):
+        load_frame(cache_dir, columns=["Нет такой"])
+
+
+def test_load_cached_where(tmp_path):
+    """Условие на строки применяется до чтения остальных колонок"""
+    source = tmp_path / "operations.csv"
+    source.write_text("a,b\n1,x\n2,y\n3,z\n", encoding="utf-8")
+    builder = lambda path: pd.read_csv(path)  # noqa: E731
+
+    df = load_cached(str(source), builder, columns=["b"], where=("a", lambda values: values >= 2))
+
+    assert df.columns.tolist() == ["b"]
+    assert df["b"].tolist() == ["y", "z"]
+
+
+def test_lazy_frame_loads_on_access(tmp_path, sample_frame):
+    """LazyFrame читает колонку только при обращении к ней"""
+    cache_dir = str(tmp_path / "cache")
+    save_frame(sample_frame, cache_dir, {"source": "test"})
+
+    frame = LazyFrame(cache_dir)
+    assert len(frame) == 3
+    assert frame.columns == sample_frame.columns.tolist()
+    assert frame.loaded == []
+
+    pd.testing.assert_series_equal(frame["Категория"], sample_frame["Категория"])
+    assert frame.loaded == ["Категория"]
+    pd.testing.assert_frame_equal(frame.to_frame(), sample_frame)
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+from src.categorizer import MEMO_SIZE, Categorizer, categorize_transactions
+
+RULES = [
+    ("prefix", "Перевод с карты", "Пополнения"),
+    ("prefix", "Перевод", "Переводы"),
+    ("keyword", "такси", "Такси"),
+    ("regex", r"^[А-ЯЁ][а-яё]+ [А-ЯЁ]\.$", "Переводы"),
+]
+
+
+def test_categorizer_rules_priority():
+    """Срабатывает первое подходящее правило, регистр не учитывается"""
+    categorizer = Categorizer(RULES)
+
+    assert categorizer.categorize_one("Перевод с карты") == "Пополнения"
+    assert categorizer.categorize_one("перевод на карту") == "Переводы"
+    assert categorizer.categorize_one("Яндекс Такси") == "Такси"
+    assert categorizer.categorize_one("Дмитрий Л.") == "Переводы"
+    assert categorizer.categorize_one("Магнит") is None
+    assert categorizer.categorize_one(None) is None
+
+    categories = categorizer.categorize(pd.Series(["Яндекс Такси", None, "Магнит", "Яндекс Такси"]))
+    assert categories[0] == categories[3] == "Такси"
+    assert pd.isna(categories[1]) and pd.isna(categories[2])
+
+    with pytest.raises(ValueError):
+        Categorizer([("glob", "*", "Прочее")])
+    with pytest.raises(ValueError):
+        Categorizer([("regex", "(", "Прочее")])
+
+
+def test_categorizer_overlapping_rules():
+    """Совпадения разных правил перекрываются: побеждает правило с меньшим номером, память ограничена"""
+    categorizer = Categorizer([("prefix", "Перевод", "Переводы"), ("keyword", "вод с", "Вода"),
+                               ("keyword", "перевод на", "Переводы людям"), ("regex", "карт", "Карты")])
+
+    assert categorizer.categorize_one("Перевод с карты") == "Переводы"
+    assert categorizer.categorize_one("Оплата: перевод на карту") == "Переводы людям"
+    assert categorizer.categorize_one("Завод с карты") == "Вода"
+    assert categorizer.categorize_one("Оплата картой") == "Карты"
+    assert categorizer._lookup.cache_info().maxsize == MEMO_SIZE
+
+
+def test_categorize_transactions_fills_only_missing_and_generic():
+    """Категории банка сохраняются, пустые и общие заполняются по описанию"""
+    transactions = pd.DataFrame({
+        "Описание": ["Яндекс Такси", "Яндекс Такси", "Перевод на карту", "Магнит", "Яндекс Такси"],
+        "Категория": pd.Categorical([None, "Каршеринг", "Различные товары", None, "Другое"]),
+        "Сумма операции": [-100.0, -200.0, -300.0, -400.0, -500.0],
+    })
+
+    result = categorize_transactions(transactions, Categorizer(RULES))
+
+    assert result["Категория"].tolist()[:3] == ["Такси", "Каршеринг", "Переводы"]
+    assert pd.isna(result["Категория"].iloc[3])
+    assert result["Категория"].iloc[4] == "Такси"
+    assert isinstance(result["Категория"].dtype, pd.CategoricalDtype)
+    assert pd.isna(transactions["Категория"].iloc[0])  # Исходная таблица не меняется
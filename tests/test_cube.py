@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+from src.cube import MonthlyCube
+from src.reports import calculate_expenses_by_category
+from src.services import calculate_cashback, calculate_rounding_savings
+
+
+@pytest.fixture
+def sample_transactions():
+    """Транзакции за два месяца по двум картам"""
+    data = {
+        "Дата операции": pd.to_datetime(["2024-01-05", "2024-01-10", "2024-01-15", "2024-02-01", "2024-02-03"]),
+        "Номер карты": ["*1234", "*5678", "*1234", "*1234", "*5678"],
+        "Категория": ["Супермаркеты", "ЖКХ", "Супермаркеты", "Переводы", "Супермаркеты"],
+        "Сумма операции": [-1712, -457, -982, -3000, 500]
+    }
+    return pd.DataFrame(data)
+
+
+def test_cube_matches_services(sample_transactions):
+    """Ответы куба совпадают с расчётом по таблице"""
+    cube = MonthlyCube(sample_transactions.copy())
+
+    assert cube.months() == [(2024, 1), (2024, 2)]
+    assert calculate_cashback(cube, 2024, 1) == calculate_cashback(sample_transactions.copy(), 2024, 1)
+    for step in (10, 50, 100):
+        assert calculate_rounding_savings(cube, 2024, 1, step) == \
+            calculate_rounding_savings(sample_transactions.copy(), 2024, 1, step)
+    assert calculate_expenses_by_category(cube) == calculate_expenses_by_category(sample_transactions.copy())
+
+
+def test_cube_append(sample_transactions):
+    """Добавление транзакций по частям даёт тот же куб"""
+    cube = MonthlyCube(sample_transactions.iloc[:2].copy())
+    cube.append(sample_transactions.iloc[2:].copy())
+
+    assert cube.cashback(2024, 1) == {"ЖКХ": 4.57, "Супермаркеты": 26.94}
+    assert cube.rounding_savings(2024, 1, 50) == 99.0
+    assert cube.spend_by("Номер карты", 2024, 2).to_dict() == {"*1234": -3000}
+
+
+def test_cube_unknown_month_and_step(sample_transactions):
+    """Пустой месяц и неподдерживаемый шаг округления"""
+    cube = MonthlyCube(sample_transactions.copy())
+
+    assert cube.cashback(2023, 12) == {}
+    assert cube.rounding_savings(2023, 12) == 0.0
+    with pytest.raises(ValueError):
+        cube.rounding_savings(2024, 1, 25)
@@ -0,0 +1,84 @@
+from datetime import date
+import pandas as pd
+import pytest
+from src.currency import ORIGINAL_AMOUNT_COLUMN, RateHistory, convert_transactions
+from src.money import KOPECKS_COLUMN
+from src.services import calculate_cashback
+
+
+@pytest.fixture
+def fetcher():
+    """Курсы ЦБ только по рабочим дням: USD = 70 + номер дня, EUR = 80"""
+    calls = []
+
+    def fetch(currency, start, end):
+        calls.append((currency, start, end))
+        days = pd.bdate_range(start, end)
+        rates = 70.0 + days.day if currency == "USD" else [80.0] * len(days)
+        return pd.DataFrame({"date": days, "rate": rates})
+
+    fetch.calls = calls
+    return fetch
+
+
+def test_rate_history_refreshes_incrementally(tmp_path, fetcher):
+    """Запрашиваются только дни, которых ещё нет в таблице; таблица сохраняется в файл"""
+    path = str(tmp_path / "rates.csv")
+    history = RateHistory(path, fetcher)
+
+    history.rates(["USD", "RUB"], date(2021, 12, 1), date(2021, 12, 10))
+    history.rates(["USD"], date(2021, 12, 3), date(2021, 12, 10))
+    assert fetcher.calls == [("USD", date(2021, 11, 21), date(2021, 12, 10))]
+
+    rates = history.rates(["USD"], date(2021, 12, 1), date(2021, 12, 20))
+    assert fetcher.calls[1] == ("USD", date(2021, 12, 11), date(2021, 12, 20))
+    assert rates["date"].is_monotonic_increasing
+
+    reloaded = RateHistory(path, fetcher)
+    pd.testing.assert_frame_equal(reloaded.rates(["USD"], date(2021, 12, 1), date(2021, 12, 17)), rates)
+    assert len(fetcher.calls) == 2
+
+
+def test_rate_history_remembers_empty_and_failed_ranges(tmp_path, fetcher):
+    """Дни без курсов (выходные) и ошибки запроса не запрашиваются повторно при каждом вызове"""
+    path = str(tmp_path / "rates.csv")
+    history = RateHistory(path, fetcher)
+
+    # 11 и 12.12.2021 — выходные: курсов нет, но период проверен
+    history.rates(["USD"], date(2021, 12, 1), date(2021, 12, 12))
+    history.rates(["USD"], date(2021, 12, 1), date(2021, 12, 12))
+    RateHistory(path, fetcher).rates(["USD"], date(2021, 12, 1), date(2021, 12, 12))
+    assert len(fetcher.calls) == 1
+
+    def failing(currency, start, end):
+        fetcher.calls.append((currency, start, end))
+        raise ConnectionError("нет сети")
+
+    history = RateHistory(path, failing)
+    # Источник недоступен: возвращаются сохранённые курсы, USD и EUR запрашиваются по разу
+    assert set(history.rates(["USD", "EUR"], date(2021, 12, 1), date(2021, 12, 20))["currency"]) == {"USD"}
+    history.rates(["USD", "EUR"], date(2021, 12, 1), date(2021, 12, 20))
+    assert len(fetcher.calls) == 3
+
+
+def test_convert_transactions(fetcher):
+    """Суммы пересчитываются по последнему курсу не позже даты операции"""
+    transactions = pd.DataFrame({
+        # 11.12.2021 — суббота: берётся курс пятницы 10.12
+        "Дата операции": pd.to_datetime(["2021-12-11 10:00:00", "2021-12-13 10:00:00", "2021-12-13 11:00:00",
+                                         "2021-12-14 12:00:00"]),
+        "Сумма операции": [-10.0, -1.5, -100.0, -5.0],
+        "Валюта операции": pd.Categorical(["USD", "EUR", "RUB", "XXX"]),
+        "Категория": pd.Categorical(["Путешествия", "Путешествия", "Супермаркеты", "Прочее"]),
+    })
+    transactions[KOPECKS_COLUMN] = (transactions["Сумма операции"] * 100).astype("int64")
+
+    converted = convert_transactions(transactions, history=RateHistory(None, fetcher))
+
+    assert converted["Сумма операции"].tolist() == [-800.0, -120.0, -100.0, -5.0]
+    assert converted[KOPECKS_COLUMN].tolist() == [-80000, -12000, -10000, -500]
+    assert converted[ORIGINAL_AMOUNT_COLUMN].tolist() == [-10.0, -1.5, -100.0, -5.0]
+    assert calculate_cashback(converted, 2021, 12) == {"Путешествия": 9.2, "Супермаркеты": 1.0, "Прочее": 0.05}
+
+    in_usd = convert_transactions(transactions, base="USD", history=RateHistory(None, fetcher))
+    assert in_usd["Сумма операции"].tolist()[:3] == [-10.0, round(-120 / 83, 2), round(-100 / 83, 2)]
@@ -1,6 +1,6 @@
 import pandas as pd
 import pytest
-from src.file_readers import load_transactions
+from src.file_readers import iter_transactions, load_transactions, open_transactions
 
 
 @pytest.fixture
@@ -23,3 +23,60 @@ def test_load_transactions(sample_excel):
     assert len(df) == 2  # В тестовом файле 2 строки
     assert "Дата операции" in df.columns  # Проверяем, есть ли нужные колонки
     assert "Сумма операции" in df.columns
+
+
+def test_load_transactions_typed(sample_excel):
+    """Тестируем загрузку типизированной таблицы"""
+    df = load_transactions(str(sample_excel), typed=True)
+
+    assert pd.api.types.is_datetime64_any_dtype(df["Дата операции"])
+    assert df["Сумма операции"].tolist() == [100, 200]
+
+
+def test_load_transactions_columns_and_dates(tmp_path):
+    """Загрузка только нужных колонок и строк периода — из кеша и без него"""
+    test_file = tmp_path / "operations.xlsx"
+    pd.DataFrame({
+        "Дата операции": ["01.01.2024 10:00:00", "15.01.2024 10:00:00", "01.02.2024 10:00:00"],
+        "Сумма операции": ["-100", "-200", "-300"],
+        "Описание": ["Магнит", "Колхоз", "Лента"],
+        "Номер карты": ["*1234", "*5678", "*1234"],
+    }).to_excel(test_file, index=False)
+
+    for use_cache in (False, True, True):
+        df = load_transactions(str(test_file), use_cache=use_cache, typed=True,
+                               columns=["Описание", "last_digits"], date_range=("2024-01-10", "2024-02-01 10:00:00"))
+        assert df.columns.tolist() == ["Описание", "last_digits"]
+        assert df["Описание"].tolist() == ["Колхоз", "Лента"]
+        assert df["last_digits"].tolist() == ["5678", "1234"]
+
+    with pytest.raises(ValueError):
+        load_transactions(str(test_file), date_range=("2024-01-01", None))
+
+    frame = open_transactions(str(test_file))
+    assert len(frame) == 3
+    assert frame["Описание"].tolist() == ["Магнит", "Колхоз", "Лента"]
+    assert frame.loaded == ["Описание"]
+
+
+def test_iter_transactions_excel(sample_excel):
+    """Тестируем чтение Excel-файла по частям"""
+    chunks = list(iter_transactions(str(sample_excel), chunk_size=1))
+
+    assert len(chunks) == 2
+    assert chunks[0]["Сумма операции"].tolist() == [100]
+    assert pd.api.types.is_datetime64_any_dtype(chunks[1]["Дата операции"])
+
+
+def test_iter_transactions_csv(tmp_path):
+    """Тестируем чтение CSV-файла по частям"""
+    test_file = tmp_path / "test.csv"
+    pd.DataFrame({
+        "Дата операции": ["01.01.2024 10:00:00", "02.01.2024 11:00:00", "03.01.2024 12:00:00"],
+        "Сумма операции": ["-100", "-200.5", "300"]
+    }).to_csv(test_file, index=False)
+
+    chunks = list(iter_transactions(str(test_file), chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0]["Сумма операции"].tolist() == [-100.0, -200.5]
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+from src.index import TransactionIndex
+from src.reports import filter_transactions
+
+
+@pytest.fixture
+def sample_index():
+    """Индекс по транзакциям, записанным не по порядку дат"""
+    data = {
+        "Дата операции": ["10.01.2024 12:00:00", "01.01.2024 09:00:00", "05.01.2024 18:30:00",
+                          "01.02.2024 10:00:00", None],
+        "Номер карты": ["*1234", "*5678", "*1234", "*5678", "*1234"],
+        "Категория": ["Супермаркеты", "Супермаркеты", "ЖКХ", "Переводы", "ЖКХ"],
+        "Сумма операции": ["-2000", "-1000", "-5000", "-3000", "-700"],
+    }
+    return TransactionIndex(pd.DataFrame(data))
+
+
+def test_index_sorted_by_date(sample_index):
+    """Строки индекса отсортированы по дате, строки без даты — в начале"""
+    dates = sample_index.frame["Дата операции"]
+
+    assert len(sample_index) == 5
+    assert dates.iloc[1:].is_monotonic_increasing
+    assert pd.isna(dates.iloc[0])
+
+
+def test_index_query_by_dates(sample_index):
+    """Период выбирается срезом, границы включительно, без строк без даты"""
+    result = sample_index.query("2024-01-01 09:00:00", "2024-01-10 12:00:00")
+    assert result["Сумма операции"].tolist() == [-1000, -5000, -2000]
+
+    assert len(sample_index.query()) == 4
+
+
+def test_index_query_by_category_and_card(sample_index):
+    """Фильтр по категории и карте сочетается с периодом"""
+    assert sample_index.query(category="Супермаркеты")["Сумма операции"].tolist() == [-1000, -2000]
+    assert sample_index.query("2024-01-02", category="Супермаркеты")["Сумма операции"].tolist() == [-2000]
+    assert sample_index.query(card="1234")["Сумма операции"].tolist() == [-5000, -2000]
+    assert sample_index.query(card="*1234", category="ЖКХ")["Сумма операции"].tolist() == [-5000]
+    assert sample_index.query(category="Такси").empty
+
+
+def test_filter_transactions_with_index(sample_index):
+    """filter_transactions принимает индекс вместо DataFrame"""
+    filtered = filter_transactions(sample_index, start_date="2024-01-02", end_date="2024-02-01",
+                                   max_amount=-2500)
+    assert filtered["Сумма операции"].tolist() == [-5000]
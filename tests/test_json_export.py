@@ -0,0 +1,59 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src import json_export
+from src.json_export import dumps, iter_json, write_json
+
+
+@pytest.fixture
+def payload():
+    frame = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-02-01 10:00:00", "2024-02-02 00:00:00", None]),
+        "Сумма операции": [-500.25, -200.0, np.nan],
+        "Категория": pd.Categorical(["Продукты", "Кино", "Продукты"]),
+    })
+    return {"greeting": "Добрый день", "total": np.int64(3), "average": np.float64("nan"), "change": [float("nan")],
+            "transactions": frame}
+
+
+def _expected(payload):
+    return {
+        "greeting": "Добрый день",
+        "total": 3,
+        "average": None,
+        "change": [None],
+        "transactions": [
+            {"Дата операции": "2024-02-01 10:00:00", "Сумма операции": -500.25, "Категория": "Продукты"},
+            {"Дата операции": "2024-02-02 00:00:00", "Сумма операции": -200.0, "Категория": "Кино"},
+            {"Дата операции": "NaT", "Сумма операции": None, "Категория": "Продукты"},
+        ],
+    }
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_and_stream_match(payload, use_orjson):
+    """Потоковая запись по блокам и кодирование целиком дают одинаковый JSON (с orjson и без), NaN — null"""
+    encoder = json_export.orjson if use_orjson else None
+    if use_orjson and encoder is None:
+        pytest.skip("orjson не установлен")
+    with patch.object(json_export, "orjson", encoder):
+        streamed = b"".join(iter_json(payload, chunk_size=2))
+        assert json.loads(streamed) == _expected(payload)
+        assert json.loads(dumps(payload)) == _expected(payload)
+        assert b"NaN" not in streamed
+        assert b"\n" in dumps(payload, pretty=True)
+
+
+def test_write_json_is_atomic(tmp_path, payload):
+    """При ошибке кодирования старый файл остаётся целым, временный удаляется"""
+    path = tmp_path / "data.json"
+    write_json({"old": True}, str(path))
+
+    with patch.object(json_export, "dumps", side_effect=RuntimeError):
+        with pytest.raises(RuntimeError):
+            write_json(payload, str(path))
+
+    assert json.loads(path.read_bytes()) == {"old": True}
+    assert [item.name for item in tmp_path.iterdir()] == ["data.json"]
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+import threading
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.currency import RateHistory
+from src.main import cli, main, show_cached
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Зависимости, которых не должно быть при импорте src.main
+HEAVY_MODULES = {"pandas", "numpy", "requests", "dotenv", "openpyxl", "src.file_readers", "src.views"}
+
+
+def imported_modules(code: str) -> set:
+    """Модули, загруженные при выполнении `code`, по отчёту `python -X importtime`"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == ""  # Импорт ничего не читает и не печатает
+    return {line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+@pytest.fixture
+def sample_transactions():
+    """Типизированные транзакции за февраль 2024"""
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-02-02 10:00:00", "2024-02-05 12:00:00"]),
+        "Номер карты": pd.Categorical(["*1234", "*5678"]),
+        "last_digits": pd.Categorical(["1234", "5678"]),
+        "Сумма операции": [-500.0, -200.0],
+        "Категория": pd.Categorical(["Продукты", "Развлечения"]),
+        "Описание": ["Магазин", "Кино"],
+    })
+
+
+@patch("src.views.save_to_json")
+@patch("src.utils.configure_market_cache")
+@patch("src.utils.load_json", return_value={"user_stocks": ["AAPL"]})
+def test_main_fetches_market_data_while_loading(mock_settings, mock_cache, mock_save, sample_transactions):
+    """Запросы к API идут одновременно с загрузкой транзакций"""
+    api_started = threading.Event()
+
+    def fetch_market_data(stocks):
+        api_started.set()
+        return {"USD": 90.0}, {"AAPL": 150.0}
+
+    def load_transactions(*args, **kwargs):
+        # Загрузка завершается только после того, как стартовали запросы к API
+        assert api_started.wait(timeout=5)
+        return sample_transactions
+
+    with patch("src.utils.fetch_market_data", side_effect=fetch_market_data), \
+         patch("src.file_readers.load_transactions", side_effect=load_transactions):
+        main("2024-02-10 12:00:00")
+        data = mock_save.call_args[0][0]
+        # Регулярные платежи — только по запросу
+        assert "recurring_payments" not in data
+        main("2024-02-10 12:00:00", recurring=True)
+
+    assert data["currency_rates"] == [{"currency": "USD", "rate": 90.0}]
+    assert data["stock_prices"] == [{"stock": "AAPL", "price": 150.0}]
+    assert data["cashback"] == {"Продукты": 5.0, "Развлечения": 2.0}
+    assert mock_save.call_args[0][0]["recurring_payments"] == "Нет регулярных платежей"
+
+
+@patch("src.views.save_to_json")
+@patch("src.utils.configure_market_cache")
+@patch("src.utils.load_json", return_value={"user_stocks": ["AAPL"]})
+def test_main_fetches_currency_rates_in_background(mock_settings, mock_cache, mock_save, sample_transactions):
+    """Курсы ЦБ запрашиваются в фоновом потоке, суммы пересчитываются в рубли"""
+    sample_transactions["Валюта операции"] = pd.Categorical(["USD", "RUB"])
+    fetch_threads = []
+
+    def fetch_rates(currency, start, end):
+        fetch_threads.append(threading.current_thread())
+        return pd.DataFrame({"date": pd.date_range(start, end), "rate": 90.0})
+
+    with patch("src.utils.fetch_market_data", return_value=({"USD": 90.0}, {"AAPL": 150.0})), \
+         patch("src.file_readers.load_transactions", return_value=sample_transactions), \
+         patch("src.currency.get_rate_history", return_value=RateHistory(None, fetch_rates)):
+        main("2024-02-10 12:00:00")
+
+    assert fetch_threads and threading.main_thread() not in fetch_threads
+    assert mock_save.call_args[0][0]["cashback"] == {"Продукты": 450.0, "Развлечения": 2.0}
+
+
+def test_import_is_lightweight():
+    """Импорт точки входа не тянет pandas, requests и модули аналитики"""
+    assert not imported_modules("import src.main") & HEAVY_MODULES
+    # Импорт модуля загрузки не читает Excel-файл
+    assert "src.file_readers" in imported_modules("import src.file_readers")
+
+
+def test_cli_cached(tmp_path, capsys):
+    """--cached печатает сохранённый JSON без пересчёта"""
+    page = tmp_path / "main_page.json"
+    assert not show_cached(str(page))
+
+    page.write_text('{"greeting": "Добрый день"}', encoding="utf-8")
+    with patch("src.main.CACHED_PAGE_PATH", str(page)):
+        assert cli(["--cached"]) == 0
+    assert '"greeting"' in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        cli([])
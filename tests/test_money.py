@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.money import apply_rate, rate_units, rounding_remainder, to_kopecks, to_rubles
+from src.services import calculate_cashback, calculate_rounding_savings
+
+
+def test_kopecks_round_trip():
+    """Суммы переводятся в копейки без накопления ошибки"""
+    kopecks = to_kopecks([0.1, 0.2, -1712.35, np.nan])
+
+    assert kopecks.dtype == np.int64
+    assert kopecks.tolist() == [10, 20, -171235, 0]
+    assert to_rubles(kopecks[:2].sum()) == 0.3
+    assert to_rubles(kopecks).tolist() == [0.1, 0.2, -1712.35, 0.0]
+
+
+def test_apply_rate_and_rounding_remainder():
+    """Кешбэк округляется половиной вверх, остаток округления считается в копейках"""
+    assert apply_rate(-5198_50, 0.01) == 5199  # 51.985 → 51.99
+    assert apply_rate(np.array([-100, -149, -150]), 0.01).tolist() == [1, 1, 2]
+    assert rounding_remainder(np.array([-171200, -45700, -5000, -45650]), 50).tolist() == [3800, 4300, 0, 4350]
+    assert rate_units(0.015) == 15000
+    # Ставки не кратные 0,01% тоже допустимы
+    assert apply_rate(-10000_00, 0.0125) == 12500
+    assert apply_rate(-10000_00, 1 / 300) == 3333
+    with pytest.raises(ValueError):
+        rate_units(-0.01)
+    with pytest.raises(ValueError):
+        rounding_remainder(-100, 0)
+
+
+def test_services_exact_on_many_rows():
+    """Сумма миллиона копеечных трат не накапливает ошибку"""
+    df = pd.DataFrame({
+        "Дата операции": pd.Timestamp("2024-01-15"),
+        "Категория": "Супермаркеты",
+        "Сумма операции": np.full(1_000_000, -0.1)
+    })
+
+    assert calculate_cashback(df, 2024, 1) == {"Супермаркеты": 1000.0}
+    assert calculate_rounding_savings(df, 2024, 1, rounding_step=10) == 9_900_000.0
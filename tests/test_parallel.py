@@ -0,0 +1,29 @@
+import pytest
+from benchmarks.synthetic import generate_transactions
+from src.parallel import parallel_analytics
+from src.reports import calculate_expenses_by_category, get_top_expenses
+from src.schema import normalize_transactions
+from src.services import calculate_cashback, calculate_rounding_savings
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return normalize_transactions(generate_transactions(5000, start="2021-01-01", end="2021-06-30"))
+
+
+@pytest.mark.parametrize("partition_by", ["card", "month"])
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parallel_matches_single_process(transactions, partition_by, max_workers):
+    """Результат по частям совпадает с расчётом по всей таблице"""
+    result = parallel_analytics(transactions, 2021, 3, partition_by=partition_by, max_workers=max_workers)
+
+    assert result["cashback"] == calculate_cashback(transactions, 2021, 3)
+    assert result["expenses_by_category"] == calculate_expenses_by_category(transactions)
+    assert result["rounding_savings"] == calculate_rounding_savings(transactions, 2021, 3)
+    assert result["top_expenses"].equals(get_top_expenses(transactions))
+
+
+def test_parallel_unknown_partition(transactions):
+    """Неизвестное разбиение — ошибка"""
+    with pytest.raises(ValueError):
+        parallel_analytics(transactions, 2021, 3, partition_by="category")
@@ -0,0 +1,43 @@
+import json
+import pandas as pd
+from src.profiling import span, traced, tracing
+
+
+@traced()
+def double(transactions):
+    return pd.concat([transactions, transactions])
+
+
+def test_spans_are_collected_with_rows():
+    """Вложенные замеры попадают в трассу с количеством строк"""
+    df = pd.DataFrame({"a": [1, 2, 3]})
+
+    with tracing() as trace:
+        with span("Этап") as info:
+            result = double(df)
+            info["rows"] = len(result)
+
+    names = [(record["name"], record["depth"]) for record in trace.spans]
+    assert ("double", 1) in names and ("Этап", 0) in names
+    inner = next(record for record in trace.spans if record["name"] == "double")
+    assert inner["rows_in"] == 3 and inner["rows_out"] == 6
+    assert set(trace.timings(["Этап"])) == {"Этап"}
+
+
+def test_trace_written_in_chrome_format(tmp_path):
+    """Трасса сохраняется в формате Chrome Trace Event"""
+    with tracing(memory=True) as trace:
+        double(pd.DataFrame({"a": [1]}))
+
+    path = tmp_path / "trace.json"
+    trace.write(str(path), chrome=True)
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+
+    assert events[0]["name"] == "double"
+    assert events[0]["ph"] == "X"
+    assert "memory_delta_mb" in events[0]["args"]
+
+
+def test_traced_is_transparent_without_tracing():
+    """Без трассы декоратор просто вызывает функцию"""
+    assert len(double(pd.DataFrame({"a": [1, 2]}))) == 4
@@ -1,6 +1,7 @@
 import pandas as pd
 import pytest
-from src.reports import calculate_expenses_by_category, filter_transactions, get_top_expenses
+from src.reports import (calculate_expenses_by_category, calculate_expenses_by_category_chunked, filter_transactions,
+                         find_recurring_payments, get_top_expenses, get_top_expenses_by, get_top_expenses_chunked)
 
 
 def test_calculate_expenses_by_category():
@@ -51,3 +52,88 @@ def test_get_top_expenses():
     assert len(result) == 5
     assert result.iloc[0]["Сумма операции"] == -12000  # Самая большая трата
     assert result.iloc[-1]["Сумма операции"] == -2000  # Последний элемент в топе (меньшая трата)
+
+
+def test_calculate_expenses_by_category_chunked():
+    """Тестируем подсчёт расходов по категориям по частям"""
+    chunks = [
+        pd.DataFrame({"Категория": ["Супермаркеты", "ЖКХ"], "Сумма операции": [-1000, -5000]}),
+        pd.DataFrame({"Категория": ["Супермаркеты", "Переводы"], "Сумма операции": [-2000, 3000]}),
+    ]
+
+    result = calculate_expenses_by_category_chunked(chunks)
+
+    assert result == {"Супермаркеты": 3000, "ЖКХ": 5000}
+
+
+def test_get_top_expenses_chunked():
+    """Тестируем выбор Топ-3 трат по частям"""
+    data = {
+        "Дата операции": ["2024-01-01", "2024-01-05", "2024-01-10", "2024-01-15", "2024-01-20", "2024-01-25"],
+        "Сумма операции": [-1000, -5000, -2000, -3000, -8000, -12000],
+        "Категория": ["Супермаркеты", "ЖКХ", "Супермаркеты", "Переводы", "Одежда", "Рестораны"],
+        "Описание": ["Покупка продуктов", "Оплата коммуналки", "Закупка еды", "Перевод другу", "Новая куртка",
+                     "Ужин в ресторане"]
+    }
+    df = pd.DataFrame(data)
+    chunks = [df.iloc[i:i + 2].copy() for i in range(0, len(df), 2)]
+
+    result = get_top_expenses_chunked(chunks, top_n=3)
+
+    assert result["Сумма операции"].tolist() == [-12000, -8000, -5000]
+
+
+def test_get_top_expenses_chunked_ties():
+    """Равные суммы на границе топа: остаются ранние строки, как без деления на части"""
+    df = pd.DataFrame({
+        "Дата операции": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+        "Сумма операции": [-500, -500, -900, -100],
+        "Категория": ["Супермаркеты"] * 4,
+        "Описание": ["a", "b", "c", "d"]
+    })
+    chunks = [df.iloc[i:i + 2].copy() for i in range(0, len(df), 2)]
+
+    result = get_top_expenses_chunked(chunks, top_n=2)
+
+    assert result["Описание"].tolist() == get_top_expenses(df, top_n=2)["Описание"].tolist() == ["c", "a"]
+
+
+def test_get_top_expenses_by():
+    """Топ трат по картам, категориям и месяцам за один вызов"""
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-05", "2024-01-10", "2024-02-15", "2024-02-20", "2024-02-21"]),
+        "Номер карты": ["*1234", "*5678", "*1234", "*1234", None],
+        "Сумма операции": [-100.0, -300.0, -200.0, 50.0, -300.0],
+        "Категория": ["Супермаркеты", "ЖКХ", "Супермаркеты", "Переводы", "ЖКХ"],
+        "Описание": ["Магазин", "Квартплата", "Магазин", "Перевод", "Свет"]
+    })
+
+    result = get_top_expenses_by(df, top_n=1)
+
+    assert {key: frame.index.tolist() for key, frame in result["Номер карты"].items()} == {"*1234": [2], "*5678": [1]}
+    assert {key: frame.index.tolist() for key, frame in result["Категория"].items()} == {"ЖКХ": [1],
+                                                                                         "Супермаркеты": [2]}
+    assert {key: frame.index.tolist() for key, frame in result["month"].items()} == {"2024-01": [1], "2024-02": [4]}
+
+
+def test_find_recurring_payments():
+    """Находим подписки: одно описание, похожая сумма, равные промежутки"""
+    monthly = pd.date_range("2021-01-01 10:00:00", periods=6, freq="MS") + pd.Timedelta(days=14)
+    data = pd.DataFrame({
+        "Дата операции": [*monthly, *pd.date_range("2021-03-01", periods=4, freq="7D"),
+                          *pd.to_datetime(["2021-01-03", "2021-02-20", "2021-02-21", "2021-06-01"])],
+        "Сумма операции": [-299.0, -299.0, -329.0, -299.0, -299.0, -299.0, -150.0, -150.0, -155.0, -150.0,
+                           -500.0, -120.0, -3400.0, -80.0],
+        "Описание": ["YANDEX*PLUS 1234", "Yandex Plus", "YANDEX.PLUS", "Yandex Plus", "Yandex Plus", "Yandex Plus",
+                     "Фитнес", "Фитнес", "Фитнес", "Фитнес", "Магнит", "Магнит", "Магнит", "Магнит"],
+    })
+
+    result = find_recurring_payments(data, as_of="2021-07-01")
+
+    assert result["merchant"].tolist() == ["Фитнес", "Yandex Plus"]  # По убыванию стоимости в месяц
+    fitness, plus = result.to_dict(orient="records")
+    assert (plus["period"], plus["amount"], plus["monthly_cost"], plus["occurrences"]) == ("month", 299.0, 299.0, 6)
+    assert plus["next_date"] == pd.Timestamp("2021-07-15 10:00:00")
+    assert plus["active"]
+    assert (fitness["period"], fitness["monthly_cost"]) == ("week", round(150 * 30.44 / 7, 2))
+    assert not fitness["active"]  # Последний платёж 22.03, следующий ждали 29.03
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.schema import coerce_amounts, is_typed, normalize_transactions, parse_dates
+
+
+@pytest.fixture
+def raw_transactions():
+    """Транзакции в том виде, в котором их читает pd.read_excel(dtype=str)"""
+    return pd.DataFrame({
+        "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00", "2021-12-29"],
+        "Дата платежа": ["31.12.2021", "30.12.2021", None],
+        "Номер карты": ["*7197", None, "*4556"],
+        "Сумма операции": ["-160.89", "-64", "1000"],
+        "Категория": ["Супермаркеты", "Фастфуд", "Пополнения"],
+        "Описание": ["Колхоз", "KFC", "Пополнение"],
+    })
+
+
+def test_parse_dates():
+    """Даты из выгрузки банка и ISO-даты разбираются одинаково"""
+    result = parse_dates(pd.Series(["31.12.2021 16:44:00", "31.12.2021", "2021-12-31", None, "мусор"]))
+
+    assert result.iloc[0] == pd.Timestamp("2021-12-31 16:44:00")
+    assert result.iloc[1] == result.iloc[2] == pd.Timestamp("2021-12-31")
+    assert result.iloc[3:].isna().all()
+
+
+def test_normalize_transactions(raw_transactions):
+    """Нормализация приводит колонки к типам схемы"""
+    df = normalize_transactions(raw_transactions)
+
+    assert is_typed(df)
+    assert not is_typed(raw_transactions)
+    assert df["Сумма операции"].dtype == "float64"
+    assert isinstance(df["Категория"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["Номер карты"].dtype, pd.CategoricalDtype)
+    assert df["last_digits"].tolist() == ["7197", "", "4556"]
+
+
+def test_normalize_transactions_missing_columns():
+    """Без обязательных колонок нормализация невозможна"""
+    with pytest.raises(ValueError):
+        normalize_transactions(pd.DataFrame({"Категория": ["ЖКХ"]}))
+
+
+def test_coerce_amounts_skips_typed_frame(raw_transactions):
+    """Для типизированной таблицы колонка сумм не пересоздаётся"""
+    df = normalize_transactions(raw_transactions)
+    amounts = df["Сумма операции"].to_numpy()
+
+    coerce_amounts(df)
+
+    assert np.shares_memory(df["Сумма операции"].to_numpy(), amounts)
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from src.file_readers import load_transactions
+from src.server import DashboardState, create_server
+
+
+def write_transactions(path, amounts):
+    pd.DataFrame({
+        "Дата операции": ["01.02.2024 10:00:00", "05.02.2024 12:00:00"],
+        "Номер карты": ["*1234", "*5678"],
+        "Сумма операции": amounts,
+        "Категория": ["Продукты", "Развлечения"],
+        "Описание": ["Магазин", "Кино"],
+    }).to_excel(path, index=False)
+
+
+@pytest.fixture
+def dashboard(tmp_path):
+    """Сервер главной страницы на свободном порту с заглушками API"""
+    source = tmp_path / "operations.xlsx"
+    write_transactions(source, [-500, -200])
+
+    with patch("src.views.get_currency_rates", return_value={"USD": 90.0}), \
+         patch("src.views.get_stock_prices", return_value={"AAPL": 150.0}):
+        server = create_server(str(source), port=0, stocks=["AAPL"])
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server, source, f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+
+def get_json(url):
+    try:
+        with urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_main_page(dashboard):
+    """Сервер отдаёт JSON главной страницы из данных в памяти"""
+    server, source, url = dashboard
+
+    status, data = get_json(f"{url}/main_page?date=2024-02-10")
+
+    assert status == 200
+    assert data["stock_prices"] == [{"stock": "AAPL", "price": 150.0}]
+    assert {card["Номер карты"]: card["Сумма операции"] for card in data["cards"]} == {"*1234": -500, "*5678": -200}
+    assert data["recurring_payments"] == []
+
+
+def test_main_page_bad_date(dashboard):
+    """Некорректная дата — ошибка 400"""
+    server, source, url = dashboard
+
+    status, data = get_json(f"{url}/main_page?date=10.02.2024")
+
+    assert status == 400
+    assert "error" in data
+
+
+def test_reload_on_file_change(dashboard):
+    """Данные перечитываются только после изменения файла"""
+    server, source, url = dashboard
+    index = server.state.index
+
+    get_json(f"{url}/main_page?date=2024-02-10")
+    assert server.state.index is index
+
+    write_transactions(source, [-700, -200])
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    status, data = get_json(f"{url}/main_page?date=2024-02-10")
+
+    assert server.state.index is not index
+    assert {card["Номер карты"]: card["Сумма операции"] for card in data["cards"]}["*1234"] == -700
+
+
+def test_missing_file_is_not_reloaded_on_every_request(tmp_path):
+    """Отсутствующий файл не перечитывается на каждый запрос, а появившийся — загружается"""
+    source = tmp_path / "operations.xlsx"
+    state = DashboardState(str(source))
+
+    with patch("src.server.load_transactions", wraps=load_transactions) as load:
+        assert state.refresh() is False
+        assert state.refresh() is False
+        assert load.call_count == 0
+
+        write_transactions(source, [-500, -200])
+        assert state.refresh() is True
+        assert state.refresh() is False
+        assert load.call_count == 1
@@ -1,5 +1,6 @@
 import pandas as pd
-from src.services import calculate_cashback, calculate_rounding_savings
+from src.services import (calculate_cashback, calculate_cashback_chunked, calculate_rounding_savings,
+                          calculate_rounding_savings_chunked)
 
 
 def test_calculate_cashback():
@@ -37,3 +38,26 @@ def test_calculate_rounding_savings():
     expected = 99.0  # (38 + 43 + 8)
 
     assert result == expected
+
+
+def test_calculate_cashback_chunked():
+    """Кешбэк по частям совпадает с расчётом по всей таблице"""
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-05", "2024-01-10", "2024-01-15", "2024-02-01"]),
+        "Категория": ["Супермаркеты", "ЖКХ", "Супермаркеты", "Переводы"],
+        "Сумма операции": [-1000, -5000, -2000, -3000]
+    })
+    chunks = [df.iloc[:2].copy(), df.iloc[2:].copy()]
+
+    assert calculate_cashback_chunked(chunks, 2024, 1) == calculate_cashback(df, 2024, 1)
+
+
+def test_calculate_rounding_savings_chunked():
+    """Накопления по частям совпадают с расчётом по всей таблице"""
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-05", "2024-01-10", "2024-01-15"]),
+        "Сумма операции": [-1712, -457, -982]
+    })
+    chunks = [df.iloc[:1].copy(), df.iloc[1:].copy()]
+
+    assert calculate_rounding_savings_chunked(chunks, 2024, 1, rounding_step=50) == 99.0
@@ -0,0 +1,71 @@
+import pytest
+from benchmarks.synthetic import generate_transactions
+from src.reports import calculate_expenses_by_category, filter_transactions, get_top_expenses
+from src.schema import normalize_transactions
+from src.services import summarize_cards
+from src.store import TransactionStore
+
+FILTERS = [
+    {},
+    {"start_date": "2021-02-01", "end_date": "2021-02-28"},
+    {"start_date": "2021-03-15 12:00:00"},
+    {"end_date": "2021-01-10"},
+    {"category": "Супермаркеты"},
+    {"category": "Нет такой категории"},
+    {"min_amount": -500, "max_amount": -100},
+    {"max_amount": 0},
+    {"min_amount": 1000},
+    {"start_date": "2021-01-01", "end_date": "2021-03-31", "category": "Фастфуд", "max_amount": -200},
+]
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return normalize_transactions(generate_transactions(4000, start="2021-01-01", end="2021-04-30"))
+
+
+@pytest.fixture(scope="module")
+def store(transactions):
+    with TransactionStore("sqlite:///:memory:") as store:
+        store.ingest(transactions)
+        yield store
+
+
+def _records(frame):
+    return frame[["Дата операции", "Сумма операции", "Категория", "Описание"]].to_dict(orient="records")
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_filter_parity(transactions, store, filters):
+    """SQL-фильтр возвращает те же строки в том же порядке"""
+    expected = filter_transactions(transactions.copy(), **filters)
+    result = filter_transactions(store, **filters)
+
+    assert _records(result) == _records(expected)
+    assert list(result.columns) == list(expected.columns)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_category_expenses_parity(transactions, store, filters):
+    """Расходы по категориям за отфильтрованный период совпадают точно"""
+    period = {key: filters[key] for key in ("start_date", "end_date") if key in filters}
+    expected = calculate_expenses_by_category(filter_transactions(transactions.copy(), **period))
+
+    result = store.category_expenses(**period)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize("top_n", [1, 5, 20])
+def test_top_expenses_parity(transactions, store, top_n):
+    """Топ расходов совпадает, включая порядок при равных суммах"""
+    assert _records(get_top_expenses(store, top_n)) == _records(get_top_expenses(transactions.copy(), top_n))
+
+
+@pytest.mark.parametrize("period", [{}, {"start_date": "2021-04-01", "end_date": "2021-04-20 12:00:00"}])
+def test_card_totals_parity(transactions, store, period):
+    """Суммы по картам совпадают со сводкой по картам в main"""
+    window = filter_transactions(transactions.copy(), **period)
+    expected = {card["last_digits"]: card["Сумма операции"] for card in summarize_cards(window)}
+
+    assert store.card_totals(**period) == expected
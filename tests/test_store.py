@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_transactions
+from src.reports import calculate_expenses_by_category, filter_transactions
+from src.schema import normalize_transactions
+from src.services import calculate_cashback, calculate_rounding_savings
+from src.store import TransactionStore, database_path, row_fingerprints
+
+
+@pytest.fixture
+def transactions():
+    return normalize_transactions(generate_transactions(2000, start="2021-01-01", end="2021-04-30"))
+
+
+@pytest.fixture
+def store():
+    with TransactionStore("sqlite:///:memory:") as store:
+        yield store
+
+
+def test_database_path():
+    """Путь к базе берётся из DATABASE_URL относительно корня проекта"""
+    assert database_path("sqlite:///data/database.db").endswith("data/database.db")
+    assert database_path("sqlite://") == ":memory:"
+    with pytest.raises(ValueError):
+        database_path("postgresql://localhost/db")
+
+
+def test_duplicate_rows_get_distinct_fingerprints(transactions):
+    """Одинаковые строки не склеиваются, повторная выгрузка даёт те же отпечатки"""
+    doubled = pd.concat([transactions.head(3), transactions.head(1)], ignore_index=True)
+    fingerprints = row_fingerprints(doubled)
+
+    assert len(set(fingerprints)) == 4
+    assert list(row_fingerprints(doubled)) == list(fingerprints)
+
+
+def test_ingest_adds_only_new_rows(store, transactions):
+    """Повторная загрузка выгрузки добавляет только новые строки"""
+    old = transactions[transactions["Дата операции"] < "2021-03-01"]
+
+    assert store.ingest(old) == len(old)
+    assert store.ingest(transactions) == len(transactions) - len(old)
+    assert store.ingest(transactions) == 0
+    assert store.ingest(transactions, since_latest=True) == 0
+    assert len(store) == len(transactions)
+
+
+def test_store_matches_pandas(store, transactions):
+    """Агрегаты базы, обновлённые по частям, совпадают с расчётом по таблице"""
+    store.ingest(transactions[transactions["Дата операции"] < "2021-02-15"])
+    store.ingest(transactions)
+
+    for year, month in store.months():
+        assert calculate_cashback(store, year, month) == calculate_cashback(transactions, year, month)
+        for step in (10, 50, 30):
+            assert calculate_rounding_savings(store, year, month, step) == \
+                calculate_rounding_savings(transactions, year, month, step)
+    assert calculate_expenses_by_category(store) == calculate_expenses_by_category(transactions)
+
+    result = filter_transactions(store, start_date="2021-02-01", end_date="2021-02-28", category="Супермаркеты")
+    expected = filter_transactions(transactions.copy(), start_date="2021-02-01", end_date="2021-02-28",
+                                   category="Супермаркеты")
+    assert sorted(result["Сумма операции"]) == sorted(expected["Сумма операции"])
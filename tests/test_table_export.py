@@ -0,0 +1,61 @@
+import gzip
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from unittest.mock import patch
+from src import table_export
+from src.table_export import iter_frames, write_csv, write_excel
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-02-01 10:00:00", "2024-02-02 11:30:00", None]),
+        "Сумма операции": [-500.25, -200.0, None],
+        "Категория": pd.Categorical(["Продукты", "Кино", "Продукты"]),
+    })
+
+
+def test_iter_frames_inputs(transactions):
+    """Словарь, таблица, итератор таблиц и итератор записей приводятся к блокам"""
+    assert [len(frame) for frame in iter_frames(transactions, chunk_size=2)] == [2, 1]
+    assert [len(frame) for frame in iter_frames(iter([transactions, transactions]))] == [3, 3]
+    records = ({"a": i, "b": -i} for i in range(5))
+    assert [frame.to_dict("list") for frame in iter_frames(records, chunk_size=3)] == [
+        {"a": [0, 1, 2], "b": [0, -1, -2]}, {"a": [3, 4], "b": [-3, -4]}
+    ]
+    assert list(next(iter_frames({"Продукты": 10})).columns) == ["Категория", "Сумма"]
+
+
+@pytest.mark.parametrize("filename", ["out.csv", "out.csv.gz"])
+def test_write_csv_chunks(tmp_path, transactions, filename):
+    """CSV по блокам совпадает с записью таблицы целиком, .gz сжимается"""
+    path = tmp_path / filename
+
+    assert write_csv(transactions, str(path), chunk_size=2) == 3
+
+    raw = path.read_bytes()
+    text = (gzip.decompress(raw) if filename.endswith(".gz") else raw).decode("utf-8")
+    expected = transactions.to_csv(index=False, date_format=table_export.DATE_FORMAT)
+    assert text == expected
+
+
+def test_write_csv_unknown_compression(tmp_path, transactions):
+    with pytest.raises(ValueError):
+        write_csv(transactions, str(tmp_path / "out.csv"), compression="rar")
+
+
+def test_write_excel_splits_sheets(tmp_path, transactions):
+    """Строки, не помещающиеся на лист, переносятся на следующий лист с заголовком"""
+    path = tmp_path / "out.xlsx"
+
+    with patch.object(table_export, "EXCEL_MAX_ROWS", 3):
+        assert write_excel(iter([transactions, transactions]), str(path), chunk_size=2) == 6
+
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Sheet1", "Sheet1_2", "Sheet1_3"]
+    sheets = [list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets]
+    assert all(rows[0] == ("Дата операции", "Сумма операции", "Категория") for rows in sheets)
+    assert [len(rows) - 1 for rows in sheets] == [2, 2, 2]
+    assert sheets[0][1][1:] == (-500.25, "Продукты")
+    assert sheets[1][1] == (None, None, "Продукты")
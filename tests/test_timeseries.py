@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+from src.timeseries import TOTAL, SpendSeries
+
+
+@pytest.fixture
+def transactions():
+    """Расходы за декабрь 2020 и декабрь 2021 и одно поступление"""
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2020-12-05 10:00:00", "2021-12-01 09:00:00", "2021-12-01 18:00:00",
+                                         "2021-12-06 12:00:00", "2021-12-10 12:00:00", "2021-12-10 13:00:00"]),
+        "Сумма операции": [-100.0, -50.25, -20.0, -30.0, 1000.0, -10.0],
+        "Категория": ["Супермаркеты", "Супермаркеты", "Кафе", "Кафе", "Пополнения", "Супермаркеты"],
+    })
+
+
+def test_resample_and_rolling(transactions):
+    """Суммы по дням, неделям и месяцам и скользящее окно считаются из накопленных сумм"""
+    series = SpendSeries(transactions, by="Категория")
+
+    assert series.groups == ["Кафе", "Супермаркеты"]
+    weekly = series.resample("W")
+    assert weekly.loc["2021-11-29"].tolist() == [20.0, 50.25]  # Неделя с понедельника 29.11
+    assert weekly.loc["2021-12-06"].tolist() == [30.0, 10.0]
+    monthly = series.resample("M")
+    assert len(monthly) == 13
+    assert monthly.loc["2021-12-01"].tolist() == [50.0, 60.25]
+
+    rolling = series.rolling(7)
+    assert rolling.loc["2021-12-07"].tolist() == [50.0, 50.25]
+    assert rolling.loc["2021-12-10"].tolist() == [30.0, 10.0]
+    assert series.rolling(2, mean=True).loc["2021-12-02", "Супермаркеты"] == 25.125
+
+    with pytest.raises(ValueError):
+        series.resample("Q")
+
+
+def test_run_rate_and_year_over_year(transactions):
+    """Прогноз на месяц по темпу с начала месяца и сравнение с тем же месяцем прошлого года"""
+    series = SpendSeries(transactions)
+
+    run_rate = series.run_rate("2021-12-10 12:00:00")
+    assert run_rate.loc[TOTAL, "month_to_date"] == 110.25
+    assert run_rate.loc[TOTAL, "projected"] == 341.78  # 110.25 / 10 дней × 31 день
+
+    delta = series.year_over_year()
+    assert delta.loc["2021-12-01", TOTAL] == 10.25
+    assert pd.isna(delta.loc["2021-11-01", TOTAL])
+    assert series.year_over_year(relative=True).loc["2021-12-01", TOTAL] == 0.1025
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.topn import top_n_by_group, top_n_positions
+
+
+@pytest.fixture(scope="module")
+def values():
+    # Много равных значений и пропусков, чтобы проверить порядок при равенстве
+    rng = np.random.default_rng(7)
+    result = rng.integers(-50, 50, size=2000).astype("float64")
+    result[rng.choice(2000, size=100, replace=False)] = np.nan
+    return result
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 100, 5000])
+def test_top_n_matches_stable_sort(values, n):
+    """Частичный отбор совпадает с устойчивой сортировкой по возрастанию и по убыванию"""
+    series = pd.Series(values).dropna()
+
+    assert top_n_positions(values, n).tolist() == series.sort_values(kind="stable").index[:n].tolist()
+    descending = series.sort_values(ascending=False, kind="stable")
+    assert top_n_positions(values, n, largest=True).tolist() == descending.index[:n].tolist()
+
+
+def test_top_n_by_group(values):
+    """Топ в каждой группе совпадает с отбором по группе отдельно"""
+    codes = np.arange(len(values)) % 7 - 1  # группа -1 не учитывается
+
+    groups = top_n_by_group(values, codes, 3)
+
+    assert sorted(groups) == list(range(6))
+    for code, positions in groups.items():
+        members = np.flatnonzero(codes == code)
+        assert positions.tolist() == members[top_n_positions(values[members], 3)].tolist()
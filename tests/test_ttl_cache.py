@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+from src.ttl_cache import TTLCache
+
+
+class FakeClock:
+    """Управляемые часы для проверки времени жизни записей"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_fresh_value_served_from_cache(clock):
+    """Свежая запись не запрашивается повторно"""
+    cache = TTLCache(ttl=60, clock=clock)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return 73.21
+
+    assert cache.get_or_fetch("rates", fetch) == 73.21
+    clock.now += 30
+    assert cache.get_or_fetch("rates", fetch) == 73.21
+    assert len(calls) == 1
+
+
+def test_stale_value_revalidated_in_background(clock):
+    """Устаревшая запись отдаётся сразу и обновляется в фоне"""
+    cache = TTLCache(ttl=60, stale_ttl=600, clock=clock)
+    cache.set("rates", 1.0)
+    clock.now += 120
+
+    assert cache.get_or_fetch("rates", lambda: 2.0) == 1.0
+    cache.join(timeout=5)
+    assert cache.get("rates") == 2.0
+
+
+def test_join_waits_for_all_refreshes_within_timeout(clock):
+    """join ограничивает общее ожидание и сообщает, остались ли незавершённые обновления"""
+    cache = TTLCache(ttl=60, stale_ttl=600, clock=clock)
+    release = threading.Event()
+    for key in ("a", "b", "c"):
+        cache.set(key, 1.0)
+    clock.now += 120
+    for key in ("a", "b", "c"):
+        cache.get_or_fetch(key, lambda: release.wait(5) and 2.0)
+
+    started = time.monotonic()
+    assert cache.join(timeout=0.2) is False
+    assert time.monotonic() - started < 0.5
+
+    release.set()
+    assert cache.join(timeout=5) is True
+    assert [cache.get(key) for key in ("a", "b", "c")] == [2.0, 2.0, 2.0]
+
+
+def test_last_good_value_when_api_fails(clock):
+    """При ошибке API возвращается последнее удачное значение"""
+    cache = TTLCache(ttl=60, stale_ttl=0, clock=clock)
+    cache.set("stock:AAPL", 150.0)
+    clock.now += 120
+
+    def broken():
+        raise ConnectionError("API недоступен")
+
+    assert cache.get_or_fetch("stock:AAPL", broken) == 150.0
+    assert cache.get_or_fetch("stock:AAPL", lambda: "Ошибка при запросе",
+                              is_valid=lambda value: isinstance(value, float)) == 150.0
+    assert cache.get_or_fetch("stock:TSLA", lambda: "Ошибка при запросе",
+                              is_valid=lambda value: isinstance(value, float)) == "Ошибка при запросе"
+    assert "stock:TSLA" not in cache
+
+
+def test_lru_eviction(clock):
+    """При переполнении вытесняется давно не используемая запись"""
+    cache = TTLCache(max_entries=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+def test_persistent_storage(tmp_path, clock):
+    """Кеш сохраняется на диск и читается при следующем запуске"""
+    path = str(tmp_path / "market_cache.json")
+    TTLCache(path, ttl=60, clock=clock).set("rates", {"USD": 1})
+
+    restored = TTLCache(path, ttl=60, clock=clock)
+
+    assert restored.get_or_fetch("rates", lambda: {"USD": 2}) == {"USD": 1}
@@ -1,8 +1,12 @@
 import json
+import threading
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 from unittest.mock import patch, mock_open
 from datetime import datetime
-from src.utils import load_json, save_json, get_currency_rates, get_stock_prices, get_greeting
+from src.utils import (load_json, save_json, get_currency_rates, get_stock_prices, get_greeting, fetch_market_data,
+                       configure_market_cache, wait_for_market_cache)
 
 
 @pytest.fixture
@@ -31,7 +35,7 @@ def test_save_json(sample_json):
         mocked_file().write.assert_called()
 
 
-@patch("requests.get")  # Сначала мокируем requests.get
+@patch("requests.Session.get")  # Сначала мокируем запрос через общую сессию
 @patch("os.getenv", return_value="test_api_key")  # Потом os.getenv
 def test_get_currency_rates(mock_getenv, mock_get):  # Порядок аргументов должен совпадать!
     mock_response = {"rates": {"USD": 73.21, "EUR": 87.08, "RUB": 97.04}}
@@ -41,7 +45,7 @@ def test_get_currency_rates(mock_getenv, mock_get):  # Порядок аргум
     assert rates == {"USD": 73.21, "EUR": 87.08, "RUB": 97.04}
 
 
-@patch("requests.get")  # Сначала requests.get
+@patch("requests.Session.get")  # Сначала запрос через общую сессию
 @patch("os.getenv", return_value="test_api_key")  # Потом os.getenv
 def test_get_stock_prices(mock_getenv, mock_get):  # Порядок аргументов исправлен
     mock_response = {"AAPL": 150.12, "TSLA": 900.00}
@@ -69,4 +73,95 @@ def test_get_greeting(mock_datetime, hour, expected_greeting):
     mock_datetime.now.return_value = mock_now
 
     # Проверяем, что get_greeting() вернет правильное приветствие
-    assert get_greeting() == expected_greeting
\ No newline at end of file
+    assert get_greeting() == expected_greeting
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Локальная заглушка API курсов валют и Alpha Vantage"""
+
+    rate_limited = set()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        symbol = parse_qs(url.query).get("symbol", [""])[0]
+
+        if url.path == "/rates":
+            body = {"rates": {"USD": 1, "EUR": 0.9, "RUB": 90.5}}
+        elif symbol == "SLOW":
+            threading.Event().wait(0.5)
+            body = {}
+        elif symbol in self.rate_limited:
+            # Первый запрос по акции упирается в лимит, повторный проходит
+            self.rate_limited.discard(symbol)
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        else:
+            body = {"Time Series (Daily)": {"2024-01-01": {"4. close": "10.5"}, "2024-01-02": {"4. close": "11"}}}
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_stock_prices_stub_server(stub_api):
+    """Цены акций запрашиваются параллельно, лимит запросов обрабатывается повтором"""
+    StubApiHandler.rate_limited = {"TSLA"}
+
+    prices = get_stock_prices(["AAPL", "TSLA", "SLOW"], base_url=f"{stub_api}/query", timeout=0.2,
+                              retry_delay=0)
+
+    assert prices == {"AAPL": 11.0, "TSLA": 11.0, "SLOW": "Ошибка при запросе"}
+
+
+def test_fetch_market_data_stub_server(stub_api):
+    """Курсы валют и цены акций запрашиваются одновременно"""
+    with patch("src.utils.CURRENCY_API_URL", f"{stub_api}/rates"), \
+         patch("src.utils.STOCK_API_URL", f"{stub_api}/query"):
+        rates, prices = fetch_market_data(["AAPL"], ["USD", "RUB"])
+
+    assert rates == {"USD": 1, "RUB": 90.5}
+    assert prices == {"AAPL": 11.0}
+
+
+def test_get_stock_prices_market_cache(stub_api):
+    """С включённым кешем повторный запрос цен не идёт в API"""
+    configure_market_cache(path=None, ttl=60)
+    try:
+        first = get_stock_prices(["AAPL"], base_url=f"{stub_api}/query")
+        second = get_stock_prices(["AAPL"], base_url="http://127.0.0.1:9/query", timeout=0.2)
+    finally:
+        configure_market_cache(path=False)
+
+    assert first == second == {"AAPL": 11.0}
+
+
+def test_wait_for_market_cache_saves_background_refresh(stub_api, tmp_path):
+    """Фоновое обновление устаревшей цены успевает сохраниться в файл до выхода"""
+    path = tmp_path / "market_cache.json"
+    cache = configure_market_cache(path=str(path), ttl=0)
+    try:
+        cache.set("stock:AAPL", 10.0)
+        assert get_stock_prices(["AAPL"], base_url=f"{stub_api}/query") == {"AAPL": 10.0}
+        wait_for_market_cache()
+    finally:
+        configure_market_cache(path=False)
+
+    assert json.loads(path.read_text(encoding="utf-8"))["stock:AAPL"]["value"] == 11.0
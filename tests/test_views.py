@@ -2,9 +2,12 @@ import os
 import json
 import pandas as pd
 import pytest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 from datetime import datetime
-from src.views import generate_main_page_json, save_to_json, save_to_excel, save_to_csv
+from src.currency import RateHistory
+from src.reports import RecurringPayments
+from src.views import (generate_main_page_json, generate_recurring_payments_json, generate_trends_json, save_to_json,
+                       save_to_excel, save_to_csv)
 
 
 @pytest.fixture
@@ -41,7 +44,8 @@ def test_generate_main_page_json(mock_greeting, mock_currency, mock_stocks, samp
     }
 
     # Вызываем функцию с передачей списка акций
-    result = generate_main_page_json(transactions=sample_transactions, date_str=test_date, stocks=test_stocks)
+    result = generate_main_page_json(transactions=sample_transactions, date_str=test_date, stocks=test_stocks,
+                                     recurring=RecurringPayments(sample_transactions))
 
     # Проверяем, что mock_stocks был вызван с правильными параметрами
     mock_stocks.assert_called_once_with(stocks=test_stocks)
@@ -52,6 +56,9 @@ def test_generate_main_page_json(mock_greeting, mock_currency, mock_stocks, samp
     assert isinstance(result["top_transactions"], list)
     assert isinstance(result["currency_rates"], list)
     assert isinstance(result["stock_prices"], list)
+    assert result["recurring_payments"] == []
+    # Без найденных заранее регулярных платежей история не просматривается
+    assert "recurring_payments" not in generate_main_page_json(sample_transactions, test_date, stocks=test_stocks)
 
     # Проверяем данные об акциях
     stock_prices = {item["stock"]: item["price"] for item in result["stock_prices"]}
@@ -64,18 +71,58 @@ def test_generate_main_page_json(mock_greeting, mock_currency, mock_stocks, samp
     assert currency_rates["USD"] == 73.21
     assert currency_rates["EUR"] == 87.08
 
+
+def test_generate_trends_json(sample_transactions):
+    """Тест рядов расходов для графиков трендов."""
+    result = generate_trends_json(sample_transactions, "2024-02-05", groupings=(None, "Категория"), windows=(7,))
+
+    assert set(result) == {"total", "Категория"}
+    daily = result["total"]["spend"]["D"]
+    assert daily["dates"] == ["2024-02-01", "2024-02-02", "2024-02-03", "2024-02-04", "2024-02-05"]
+    assert daily["values"]["Всего"] == [500.0, 0.0, 0.0, 0.0, 200.0]
+    assert result["total"]["rolling_mean"]["7"]["values"]["Всего"][-1] == 100.0
+    assert result["Категория"]["run_rate"]["Развлечения"] == {"month_to_date": 200.0, "projected": 1160.0}
+    assert result["total"]["year_over_year"]["values"]["Всего"] == [None]
+    assert "error" in generate_trends_json(sample_transactions, "05.02.2024")
+
+
+def test_generate_recurring_payments_json():
+    """Тест JSON с регулярными платежами: подписка в долларах пересчитывается в рубли."""
+    transactions = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-10", "2024-02-10", "2024-03-10", "2024-04-10",
+                                         "2024-01-21", "2024-02-21", "2024-03-21"]),
+        "Сумма операции": [-199.0, -199.0, -199.0, -199.0, -5.0, -5.0, -5.0],
+        "Валюта операции": ["RUB", "RUB", "RUB", "RUB", "USD", "USD", "USD"],
+        "Описание": ["Кинопоиск", "Кинопоиск", "Кинопоиск", "Кинопоиск", "Subscribe Star", "Subscribe Star",
+                     "Subscribe Star"],
+    })
+
+    def fetch_rates(currency, start, end):
+        return pd.DataFrame({"date": pd.date_range(start, end), "rate": 90.0})
+
+    with patch("src.currency.get_rate_history", return_value=RateHistory(None, fetch_rates)):
+        result = generate_recurring_payments_json(transactions, "2024-03-21")
+
+    star, kinopoisk = result["recurring_payments"]
+    assert (star["merchant"], star["amount"], star["monthly_cost"]) == ("Subscribe Star", 450.0, 450.0)
+    assert kinopoisk["merchant"] == "Кинопоиск"
+    assert (kinopoisk["last_date"], kinopoisk["next_date"]) == ("2024-03-10", "2024-04-10")
+    assert kinopoisk["occurrences"] == 3
+    assert result["monthly_total"] == 649.0
+    assert "error" in generate_recurring_payments_json(transactions, "20.03.2024")
+
 # Пример теста для сохранения в JSON
-@patch("builtins.open", new_callable=mock_open)
-def test_save_to_json(mock_file):
+def test_save_to_json(tmp_path):
     """Тест сохранения данных в JSON."""
-    data = {"test": "value"}
+    data = {"test": "значение", "date": pd.Timestamp("2024-02-01 10:00:00")}
     filename = "test.json"
 
-    save_to_json(data, filename, folder="test_export")
+    save_to_json(data, filename, folder=str(tmp_path))
 
-    mock_file.assert_called_once_with(os.path.join("test_export", filename), "w", encoding="utf-8")
-    handle = mock_file()
-    handle.write.assert_called()
+    with open(tmp_path / filename, encoding="utf-8") as file:
+        assert json.load(file) == {"test": "значение", "date": "2024-02-01 10:00:00"}
+    # Временный файл атомарной записи не остаётся
+    assert os.listdir(tmp_path) == [filename]
 
 # Пример теста для сохранения в Excel
 def test_save_to_excel():